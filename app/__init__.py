@@ -1,6 +1,7 @@
 """
 Factory pour créer l'application Flask
 """
+import click
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
@@ -48,8 +49,35 @@ def create_app(config_name=None):
     # Importer les modèles
     from app import models
 
+    # Pragmas SQLite (WAL, busy_timeout...) avant toute connexion
+    from app import pragmas
+    pragmas.init_app(app)
+
+    # Compter les requêtes SQL de chaque requête HTTP (à brancher en premier)
+    from app import instrumentation
+    instrumentation.init_app(app)
+
+    # Synchroniser le cache des unités entre les workers
+    models.UnitConverter.init_app(app)
+
+    # Index plein texte des recettes (FTS5)
+    from app import recherche
+    recherche.init_app(app)
+
+    # Cache des fragments HTML publics (cartes de recettes, carrousel de l'accueil)
+    from app import fragments
+    fragments.init_app(app)
+
+    # File de tâches de fond (worker : flask taches-worker)
+    from app import taches
+
+    # Cache disque des PDF et pré-rendu après modification des recettes
+    from app import pdf_cache
+    pdf_cache.init_app(app)
+
     # Enregistrer les blueprints
     from app.routes import auth, menus, recettes, courses, main, ingredients, stock, inventaires, unites
+    from app.routes import taches as taches_routes
 
     app.register_blueprint(main.bp)
     app.register_blueprint(auth.bp)
@@ -60,6 +88,7 @@ def create_app(config_name=None):
     app.register_blueprint(stock.bp)
     app.register_blueprint(inventaires.bp)
     app.register_blueprint(unites.bp)
+    app.register_blueprint(taches_routes.bp)
 
     # Gestionnaires d'erreurs
     @app.errorhandler(403)
@@ -68,6 +97,83 @@ def create_app(config_name=None):
         from flask import render_template
         return render_template('errors/403.html'), 403
 
+    # Commandes de maintenance
+    @app.cli.command('reparer-compteurs')
+    def reparer_compteurs():
+        """Recalcule tous les compteurs dénormalisés (recettes, listes de courses)"""
+        connexion = db.session.connection()
+        models.Recette.recalculer_compteurs(connexion)
+        models.ListeCourse.recalculer_compteurs(connexion)
+        db.session.commit()
+        click.echo('Compteurs des recettes et listes de courses recalculés')
+
+    @app.cli.command('vider-fragments')
+    def vider_fragments():
+        """Vide le cache des fragments HTML (après restauration de la base)"""
+        if fragments.vider():
+            click.echo('Cache des fragments vidé')
+        else:
+            click.echo('Cache des fragments désactivé')
+
+    @app.cli.command('taches-worker')
+    @click.option('--une-fois', is_flag=True, help='Vider la file puis s\'arrêter')
+    def taches_worker(une_fois):
+        """Exécute les tâches de fond (à lancer à côté de Gunicorn)"""
+        click.echo(f'Worker de tâches démarré (PID {os.getpid()})')
+        taches.travailler(app, une_fois=une_fois)
+        click.echo('Worker de tâches arrêté')
+
+    @app.cli.command('export')
+    @click.argument('email')
+    @click.option('-o', '--sortie', type=click.File('w', encoding='utf-8'), default='-',
+                  help='Fichier NDJSON (sortie standard par défaut)')
+    def exporter(email, sortie):
+        """Exporte toutes les données d'un utilisateur en NDJSON"""
+        from app import sauvegarde
+
+        user = models.User.query.filter_by(email=email).first()
+        if user is None:
+            raise click.ClickException(f'Utilisateur introuvable : {email}')
+        sortie.writelines(sauvegarde.exporter(user.id))
+
+    @app.cli.command('restaurer')
+    @click.argument('fichier', type=click.File('rb'))
+    @click.option('--email', required=True, help='Compte (sans données) dans lequel restaurer')
+    def restaurer(fichier, email):
+        """Restaure un export NDJSON dans le compte d'un utilisateur"""
+        from app import sauvegarde
+
+        user = models.User.query.filter_by(email=email).first()
+        if user is None:
+            raise click.ClickException(f'Utilisateur introuvable : {email}')
+
+        restauration = sauvegarde.Restauration(user)
+        try:
+            restauration.restaurer(sauvegarde.lire(fichier))
+        except sauvegarde.RestaurationImpossible as e:
+            raise click.ClickException(str(e))
+
+        for type_section, nombre in restauration.inserees.items():
+            if nombre:
+                click.echo(f'{type_section} : {nombre}')
+        click.echo(f'{restauration.ingredients_crees} ingrédients créés, '
+                   f'{restauration.recettes_introuvables} recettes externes introuvables, '
+                   f'{restauration.ignorees} lignes ignorées')
+
+    @app.cli.command('pragmas')
+    def afficher_pragmas():
+        """Affiche les pragmas SQLite effectifs et les écarts avec la configuration"""
+        attendus = app.config.get('SQLITE_PRAGMAS') or {}
+        if db.engine.dialect.name != 'sqlite':
+            click.echo(f'Base {db.engine.dialect.name} : pas de pragmas SQLite')
+            return
+
+        effectifs = pragmas.lire_pragmas(db.engine, attendus)
+        ecarts = pragmas.ecarts_pragmas(attendus, effectifs)
+        for nom, valeur in effectifs.items():
+            marque = f'  (demandé : {attendus[nom]})' if nom in ecarts else ''
+            click.echo(f'{nom} = {valeur}{marque}')
+
     # Contexte du processeur de template
     @app.context_processor
     def utility_processor():
@@ -1,9 +1,11 @@
 """
 Décorateurs personnalisés pour l'application
 """
+import hashlib
 from functools import wraps
-from flask import flash, redirect, url_for, abort
+from flask import flash, redirect, url_for, abort, current_app, make_response, request, session
 from flask_login import current_user
+from werkzeug.http import is_resource_modified
 
 
 def admin_required(f):
@@ -21,3 +23,43 @@ def admin_required(f):
             abort(403)
         return f(*args, **kwargs)
     return decorated_function
+
+
+def conditionnel(revision):
+    """
+    Décorateur pour les pages servies avec un ETag faible et Last-Modified
+    Usage: @conditionnel(lambda id: Recette.revision(id, current_user.id)) après @login_required
+
+    `revision` reçoit les paramètres de la route et renvoie (composants de l'ETag,
+    date de dernière modification), ou None pour rendre la page normalement (404...).
+    Si le navigateur a déjà cette révision, la réponse est un 304 sans chargement
+    ni rendu du template.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            resultat = revision(**kwargs)
+            # Messages flash en attente : la page les affiche, elle ne doit pas être revalidée
+            if resultat is None or session.get('_flashes'):
+                return f(*args, **kwargs)
+
+            composants, derniere_modification = resultat
+            # La barre de navigation dépend de l'utilisateur connecté
+            composants += (current_user.id, current_user.username, current_user.is_admin)
+            etag = hashlib.sha1(repr(composants).encode('utf-8')).hexdigest()
+
+            if is_resource_modified(request.environ, etag=etag, last_modified=derniere_modification):
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            else:
+                response = current_app.response_class(status=304)
+
+            response.set_etag(etag, weak=True)
+            if derniere_modification is not None:
+                response.last_modified = derniere_modification
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return decorated_function
+    return decorator
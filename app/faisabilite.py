@@ -0,0 +1,152 @@
+"""
+Calcul des recettes réalisables avec le stock d'un utilisateur
+"""
+import math
+from app import db
+from app.models import Recette, RecetteIngredient, Ingredient, Stock, UnitConverter
+
+
+# Cache des résultats par utilisateur : user_id -> (signature, resultats)
+_cache = {}
+
+
+def _signature(user_id):
+    """
+    Empreinte bon marché (une requête) de tout ce qui influence le calcul :
+    stock de l'utilisateur, ses recettes et leurs lignes d'ingrédients
+    """
+    stock = db.select(
+        db.func.count(Stock.id), db.func.max(Stock.updated_at), db.func.sum(Stock.quantite)
+    ).where(Stock.user_id == user_id)
+
+    # La version d'une recette change aussi avec ses lignes : les lignes
+    # supprimées puis recréées par l'édition réutilisent les mêmes IDs
+    recettes = db.select(
+        db.func.count(Recette.id), db.func.max(Recette.id), db.func.sum(Recette.portions),
+        db.func.sum(Recette.version), db.func.max(Recette.updated_at)
+    ).where(Recette.created_by == user_id)
+
+    lignes = db.select(
+        db.func.count(RecetteIngredient.id), db.func.max(RecetteIngredient.id),
+        db.func.sum(RecetteIngredient.quantite), db.func.sum(RecetteIngredient.ingredient_id),
+        db.func.total(db.func.length(RecetteIngredient.unite))
+    ).join(Recette, Recette.id == RecetteIngredient.recette_id)\
+        .where(Recette.created_by == user_id)
+
+    sous_requetes = [requete.subquery() for requete in (stock, recettes, lignes)]
+    ligne = db.session.execute(db.select(
+        *[colonne for sous_requete in sous_requetes for colonne in sous_requete.c]
+    ).select_from(
+        sous_requetes[0].join(sous_requetes[1], db.true()).join(sous_requetes[2], db.true())
+    )).one()
+
+    return tuple(ligne) + (UnitConverter.generation(),)
+
+
+def _calculer(user_id):
+    """
+    Calcule en une passe le ratio maximal réalisable pour toutes les recettes
+
+    Returns:
+        dict {recette_id: (ratio, tous_ingredients, ingredients_manquants)}
+    """
+    # Stock de l'utilisateur normalisé, indexé par ingrédient (une requête)
+    stock_normalise = {}
+    lignes_stock = db.session.query(
+        Stock.ingredient_id, Stock.quantite, Stock.unite, Ingredient.poids_estime_g
+    ).join(Ingredient, Ingredient.id == Stock.ingredient_id)\
+        .filter(Stock.user_id == user_id)\
+        .order_by(Stock.id)\
+        .all()
+
+    for ligne in lignes_stock:
+        if ligne.ingredient_id in stock_normalise:
+            continue
+        if ligne.quantite <= 0:
+            stock_normalise[ligne.ingredient_id] = None
+            continue
+        facteur, unite_base = UnitConverter.facteur_base(
+            ligne.unite, ligne.ingredient_id, ligne.poids_estime_g
+        )
+        stock_normalise[ligne.ingredient_id] = (ligne.quantite * facteur, unite_base)
+
+    # Toutes les lignes d'ingrédients des recettes de l'utilisateur (une requête)
+    lignes = db.session.query(
+        RecetteIngredient.recette_id, RecetteIngredient.quantite, RecetteIngredient.unite,
+        Ingredient.id.label('ingredient_id'), Ingredient.nom, Ingredient.poids_estime_g
+    ).join(Recette, Recette.id == RecetteIngredient.recette_id)\
+        .join(Ingredient, Ingredient.id == RecetteIngredient.ingredient_id)\
+        .filter(Recette.created_by == user_id)\
+        .all()
+
+    resultats = {}
+    for ligne in lignes:
+        ratio_min, tous, manquants = resultats.get(ligne.recette_id, (math.inf, True, []))
+        disponible = stock_normalise.get(ligne.ingredient_id)
+
+        if disponible is None:
+            manquants.append(ligne.nom)
+            ratio_min, tous = 0, False
+        else:
+            facteur, unite_base = UnitConverter.facteur_base(
+                ligne.unite, ligne.ingredient_id, ligne.poids_estime_g
+            )
+            quantite_stock, unite_stock = disponible
+            if unite_stock != unite_base:
+                # Unités incompatibles
+                manquants.append(ligne.nom)
+                ratio_min, tous = 0, False
+            elif ligne.quantite * facteur > 0:
+                # Combien de fois on peut faire la recette avec cet ingrédient
+                ratio_min = min(ratio_min, quantite_stock / (ligne.quantite * facteur))
+
+        resultats[ligne.recette_id] = (ratio_min, tous, manquants)
+
+    return resultats
+
+
+def get_recettes_possibles(user_id):
+    """
+    Liste des recettes réalisables avec le stock actuel de l'utilisateur
+    Le calcul est mis en cache jusqu'à modification du stock ou des recettes
+
+    Returns:
+        Liste de dicts {'recette', 'portions_max', 'ratio', 'tous_ingredients',
+        'ingredients_manquants'} triée par portions_max décroissant
+    """
+    signature = _signature(user_id)
+    entree = _cache.get(user_id)
+    if entree and entree[0] == signature:
+        ratios = entree[1]
+    else:
+        ratios = _calculer(user_id)
+        _cache[user_id] = (signature, ratios)
+
+    # Ne charger que les recettes réalisables au moins en partie
+    ids_realisables = [
+        recette_id for recette_id, (ratio_min, _, _) in ratios.items()
+        if 0 < ratio_min < math.inf
+    ]
+    recettes = Recette.query.filter(Recette.id.in_(ids_realisables)).all() if ids_realisables else []
+
+    recettes_possibles = []
+    for recette in recettes:
+        ratio_min, tous, manquants = ratios[recette.id]
+
+        # Calculer le nombre de portions max (arrondi à l'entier inférieur)
+        portions_max = int(math.floor(ratio_min * (recette.portions or 0)))
+
+        # Ajouter à la liste si on peut faire au moins 1 portion
+        if portions_max > 0:
+            recettes_possibles.append({
+                'recette': recette,
+                'portions_max': portions_max,
+                'ratio': ratio_min,
+                'tous_ingredients': tous,
+                'ingredients_manquants': manquants
+            })
+
+    # Trier par nombre de portions max (décroissant)
+    recettes_possibles.sort(key=lambda x: x['portions_max'], reverse=True)
+    return recettes_possibles
+
@@ -0,0 +1,286 @@
+"""
+Cache des fragments HTML publics : cartes de recettes (/explore) et carrousel
+des meilleures recettes de l'accueil
+
+Les clés contiennent la révision des recettes (version + updated_at) : une
+recette modifiée, notée ou rendue privée n'est plus jamais servie depuis
+l'ancienne entrée. Les entrées locales sont en plus purgées au commit.
+Le cache en mémoire (LRU borné en octets) est propre à chaque worker ; le
+stockage disque optionnel est partagé entre les workers Gunicorn.
+"""
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from itertools import chain
+from markupsafe import Markup
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from flask import render_template
+from app.models import Recette
+
+
+# Cache de l'application (init_app), None = rendu direct
+_cache = None
+
+# Templates des fragments : leur contenu entre dans les noms de fichiers sur disque
+TEMPLATES_FRAGMENTS = ['fragments/carte_recette.html', 'fragments/accueil_top_recettes.html']
+
+# Élagage du disque toutes les N écritures
+ELAGAGE_DISQUE_ECRITURES = 100
+
+
+class CacheFragments:
+    """
+    Cache LRU de fragments HTML borné en octets, doublé d'un stockage disque
+    optionnel (un fichier par fragment, écrit de façon atomique)
+    """
+
+    def __init__(self, budget_octets, dossier=None, budget_disque_octets=None, signature=''):
+        """
+        Args:
+            budget_octets: Taille maximale des fragments gardés en mémoire
+            dossier: Dossier du stockage partagé (None = mémoire seule)
+            budget_disque_octets: Taille maximale du dossier (None = illimitée)
+            signature: Empreinte des templates, pour ne pas relire un rendu d'avant un déploiement
+        """
+        self.budget_octets = budget_octets
+        self.dossier = dossier
+        self.budget_disque_octets = budget_disque_octets
+        self.signature = signature
+
+        # clé -> (html, taille en octets, IDs des recettes affichées), du moins au plus récent
+        self._entrees = OrderedDict()
+        self.taille = 0
+        self.succes = 0
+        self.echecs = 0
+        self._ecritures_disque = 0
+        self._verrou = threading.Lock()
+
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+    def _chemin(self, cle):
+        empreinte = hashlib.sha1(f'{self.signature}:{cle!r}'.encode('utf-8')).hexdigest()
+        return os.path.join(self.dossier, f'{empreinte}.html')
+
+    def lire(self, cle):
+        """HTML du fragment (mémoire puis disque), None s'il est absent"""
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is not None:
+                self._entrees.move_to_end(cle)
+                self.succes += 1
+                return entree[0]
+
+        html = self._lire_disque(cle)
+        if html is None:
+            self.echecs += 1
+            return None
+        self.succes += 1
+        self._garder(cle, html, ())
+        return html
+
+    def ecrire(self, cle, html, recettes=()):
+        """Enregistre le fragment en mémoire et sur disque"""
+        self._garder(cle, html, recettes)
+        self._ecrire_disque(cle, html)
+
+    def invalider(self, recette_ids):
+        """Supprime les fragments qui affichent l'une de ces recettes"""
+        recette_ids = set(recette_ids)
+        with self._verrou:
+            cles = [cle for cle, (_, _, recettes) in self._entrees.items()
+                    if recette_ids.intersection(recettes)]
+            for cle in cles:
+                self.taille -= self._entrees.pop(cle)[1]
+        if self.dossier:
+            for cle in cles:
+                try:
+                    os.remove(self._chemin(cle))
+                except OSError:
+                    pass
+
+    def vider(self):
+        """Vide la mémoire et le dossier partagé"""
+        with self._verrou:
+            self._entrees.clear()
+            self.taille = 0
+        if self.dossier:
+            for entree in os.scandir(self.dossier):
+                if entree.name.endswith('.html'):
+                    try:
+                        os.remove(entree.path)
+                    except OSError:
+                        pass
+
+    def _garder(self, cle, html, recettes):
+        """Ajoute l'entrée en mémoire puis évince les moins récemment utilisées"""
+        taille = len(html.encode('utf-8'))
+        if taille > self.budget_octets:
+            return
+        # Entrée relue depuis le disque : IDs des recettes inconnus, déduits de la clé
+        recettes = tuple(recettes) or _recettes_de_la_cle(cle)
+        with self._verrou:
+            ancienne = self._entrees.pop(cle, None)
+            if ancienne is not None:
+                self.taille -= ancienne[1]
+            self._entrees[cle] = (html, taille, recettes)
+            self.taille += taille
+            while self.taille > self.budget_octets:
+                _, (_, taille_evincee, _) = self._entrees.popitem(last=False)
+                self.taille -= taille_evincee
+
+    def _lire_disque(self, cle):
+        if not self.dossier:
+            return None
+        try:
+            with open(self._chemin(cle), 'r', encoding='utf-8') as fichier:
+                return fichier.read()
+        except OSError:
+            return None
+
+    def _ecrire_disque(self, cle, html):
+        if not self.dossier:
+            return
+        try:
+            # Écriture atomique : un autre worker ne lit jamais un fichier partiel
+            descripteur, temporaire = tempfile.mkstemp(dir=self.dossier, suffix='.tmp')
+            with os.fdopen(descripteur, 'w', encoding='utf-8') as fichier:
+                fichier.write(html)
+            os.replace(temporaire, self._chemin(cle))
+        except OSError:
+            return
+
+        self._ecritures_disque += 1
+        if self.budget_disque_octets and self._ecritures_disque % ELAGAGE_DISQUE_ECRITURES == 0:
+            self._elaguer_disque()
+
+    def _elaguer_disque(self):
+        """Supprime les fichiers les plus anciens au-delà du budget disque"""
+        try:
+            fichiers = [(e.stat().st_mtime, e.stat().st_size, e.path)
+                        for e in os.scandir(self.dossier) if e.name.endswith('.html')]
+        except OSError:
+            return
+        total = sum(taille for _, taille, _ in fichiers)
+        for _, taille, chemin in sorted(fichiers):
+            if total <= self.budget_disque_octets:
+                break
+            try:
+                os.remove(chemin)
+                total -= taille
+            except OSError:
+                pass
+
+
+def _recettes_de_la_cle(cle):
+    """IDs des recettes d'une clé : ('carte', id, ...) ou ('accueil', ((id, ...), ...))"""
+    if cle[0] == 'carte':
+        return (cle[1],)
+    return tuple(revision[0] for revision in cle[1])
+
+
+def rendre(cle, rendu, recettes=()):
+    """
+    HTML du fragment `cle`, produit par `rendu()` s'il n'est pas en cache
+
+    Returns:
+        Markup (inséré tel quel dans le template appelant)
+    """
+    if _cache is None:
+        return Markup(rendu())
+
+    html = _cache.lire(cle)
+    if html is None:
+        html = rendu()
+        _cache.ecrire(cle, html, recettes)
+    return Markup(html)
+
+
+def carte_recette(recette):
+    """Corps de la carte d'une recette publique (fonction des templates)"""
+    return rendre(
+        ('carte', recette.id, recette.version, recette.updated_at),
+        lambda: render_template('fragments/carte_recette.html', recette=recette),
+        (recette.id,)
+    )
+
+
+def carrousel_top_recettes(revisions, charger):
+    """
+    Carrousel des meilleures recettes de l'accueil
+
+    Args:
+        revisions: Liste de tuples (id, version, updated_at) des recettes, dans l'ordre affiché
+        charger: Fonction qui renvoie les recettes (appelée seulement si le carrousel n'est pas en cache)
+    """
+    revisions = tuple(tuple(revision) for revision in revisions)
+    return rendre(
+        ('accueil', revisions),
+        lambda: render_template('fragments/accueil_top_recettes.html', top_recettes=charger()),
+        [revision[0] for revision in revisions]
+    )
+
+
+def vider():
+    """Vide le cache des fragments (False s'il est désactivé)"""
+    if _cache is None:
+        return False
+    _cache.vider()
+    return True
+
+
+def _recettes_modifiees(session, contexte):
+    """Après chaque flush : mémorise les recettes modifiées ou supprimées"""
+    ids = {
+        objet.id for objet in chain(session.dirty, session.deleted)
+        if isinstance(objet, Recette) and (objet in session.deleted
+                                            or session.is_modified(objet, include_collections=False))
+    }
+    if ids:
+        session.info.setdefault('fragments_a_invalider', set()).update(ids)
+
+
+def _invalider_apres_commit(session):
+    ids = session.info.pop('fragments_a_invalider', None)
+    if ids and _cache is not None:
+        _cache.invalider(ids)
+
+
+def _oublier_apres_rollback(session):
+    session.info.pop('fragments_a_invalider', None)
+
+
+def _signature_templates(app):
+    """Empreinte du source des templates de fragments"""
+    empreinte = hashlib.sha1()
+    for nom in TEMPLATES_FRAGMENTS:
+        source, _, _ = app.jinja_loader.get_source(app.jinja_env, nom)
+        empreinte.update(source.encode('utf-8'))
+    return empreinte.hexdigest()[:12]
+
+
+def init_app(app):
+    """Crée le cache des fragments et branche son invalidation sur les commits"""
+    global _cache
+
+    app.add_template_global(carte_recette)
+
+    budget = app.config.get('FRAGMENTS_CACHE_OCTETS')
+    if not budget:
+        _cache = None
+        return
+
+    _cache = CacheFragments(
+        budget,
+        dossier=app.config.get('FRAGMENTS_CACHE_DIR'),
+        budget_disque_octets=app.config.get('FRAGMENTS_CACHE_DISQUE_OCTETS'),
+        signature=_signature_templates(app)
+    )
+
+    if not event.contains(Session, 'after_flush', _recettes_modifiees):
+        event.listen(Session, 'after_flush', _recettes_modifiees)
+        event.listen(Session, 'after_commit', _invalider_apres_commit)
+        event.listen(Session, 'after_rollback', _oublier_apres_rollback)
@@ -0,0 +1,543 @@
+"""
+Import en masse de recettes (flask recettes import)
+
+Fichiers lus en flux et importés par lots :
+- JSONL : un objet par ligne (nom, portions, temps_preparation, temps_cuisson,
+  auteur_nom, evaluation, note, type_repas, is_public,
+  ingredients: [{nom, quantite, unite}], instructions: [texte])
+- CSV : une ligne par ingrédient (colonnes recette, portions, ..., ingredient,
+  quantite, unite, instruction) ; les lignes consécutives d'une même recette
+  sont regroupées
+- texte : blocs "# Nom", lignes "clé: valeur", puis sections "## Ingrédients"
+  et "## Instructions" de lignes "- ..."
+
+Les noms d'ingrédients sont ramenés au catalogue (INGREDIENT_MAPPING, nom
+normalisé, puis correspondance approchée). Un lot coûte une requête de
+recherche des ingrédients et quelques insertions groupées, quelle que soit
+sa taille. Chaque lot est validé à part : relancer un import interrompu
+ignore les recettes déjà importées.
+"""
+import csv
+import difflib
+import json
+import math
+import re
+import time
+from itertools import chain, groupby, islice
+from app import db, recherche
+from app.models import Ingredient, Instruction, Recette, RecetteIngredient, inserer_lignes
+
+
+# Variantes courantes -> nom du catalogue (clés comparées une fois normalisées)
+INGREDIENT_MAPPING = {
+    'queue de lotte': 'Lotte (queue)',
+    'tomates grappe': 'Tomate grappe',
+    'gousse d\'ail': 'Ail',
+    'gousses d\'ail': 'Ail',
+    'filet de saumon': 'Saumon',
+    'pavé de saumon': 'Saumon',
+    'quasi de veau': 'Veau (quasi)',
+    'céleri': 'Céleri (branche)',
+    'céleri branche': 'Céleri (branche)',
+    'choux de bruxelles': 'Chou de Bruxelles',
+    'oignons nouveaux': 'Oignon nouveau',
+    'sucre': 'Sucre en poudre',
+    'sucre semoule': 'Sucre en poudre',
+    'oeufs': 'Œuf',
+    'jaune d\'oeuf': 'Œuf',
+    'huile d\'olive vierge extra': 'Huile d\'olive',
+    'crème fraiche épaisse': 'Crème fraîche',
+    'crème liquide': 'Crème fraîche',
+    'pâtes sèches': 'Pâtes',
+}
+
+# Mots terminés par s ou x laissés tels quels dans le nom d'un ingrédient créé
+MOTS_INVARIABLES = frozenset({
+    'ananas', 'anis', 'bois', 'brebis', 'cassis', 'épais', 'frais', 'gras', 'gros', 'houx', 'jus',
+    'maïs', 'noix', 'panais', 'pâtes', 'pois', 'radis', 'riz', 'salsifis',
+})
+
+# Unités reconnues en tête d'une ligne d'ingrédient (format texte) -> unité enregistrée
+UNITES_TEXTE = {
+    'g': 'g', 'gr': 'g', 'kg': 'kg', 'mg': 'mg',
+    'ml': 'ml', 'cl': 'cl', 'dl': 'dl', 'l': 'l',
+    'cc': 'cc', 'cac': 'cc', 'cs': 'cs', 'cas': 'cs',
+    'pincee': 'pincée', 'gousse': 'gousse', 'feuille': 'feuille', 'sachet': 'sachet',
+    'botte': 'botte', 'tranche': 'tranche', 'bouquet': 'bouquet', 'tasse': 'tasse',
+    'verre': 'verre', 'boite': 'boîte', 'pot': 'pot', 'piece': 'pièce',
+}
+UNITES_CUILLERES = [
+    (re.compile(r'^cuill[eè]re?s? (?:a|à) soupe\b', re.IGNORECASE), 'cs'),
+    (re.compile(r'^cuill[eè]re?s? (?:a|à) caf[eé]\b', re.IGNORECASE), 'cc'),
+]
+
+# Correspondance approchée : similarité minimale (difflib) avant de compter les fautes
+SEUIL_APPROCHE = 0.8
+
+# Taille des colonnes texte de Recette, vérifiée avant l'insertion
+LONGUEURS_MAX = {'nom': 200, 'temps_preparation': 50, 'temps_cuisson': 50,
+                 'auteur_nom': 100, 'type_repas': 200}
+
+# Erreurs détaillées gardées pour le bilan
+ERREURS_MAX = 20
+
+FORMATS_PAR_EXTENSION = {'.jsonl': 'jsonl', '.ndjson': 'jsonl', '.json': 'jsonl',
+                         '.csv': 'csv', '.txt': 'texte', '.md': 'texte'}
+
+
+class ErreurLecture(ValueError):
+    """Enregistrement illisible ou incomplet (la recette est ignorée, l'import continue)"""
+
+
+def cle_ingredient(nom):
+    """Clé de comparaison d'un nom d'ingrédient ("Gousses d'ail" -> "gousse d ail")"""
+    return ' '.join(re.findall(r'\w+', recherche.normaliser_texte(nom)))
+
+
+_MAPPING_CLES = {cle_ingredient(variante): nom for variante, nom in INGREDIENT_MAPPING.items()}
+
+
+def nom_ingredient(nom):
+    """Nom d'un ingrédient créé : mots au singulier, initiale en majuscule ("poivrons rouges" -> "Poivron rouge")"""
+    nom = re.sub(r'\w+', lambda m: m.group() if m.group().lower() in MOTS_INVARIABLES
+                 else recherche.au_singulier(m.group()), nom.strip())
+    return nom[:1].upper() + nom[1:]
+
+
+def _fautes_tolerees(longueur):
+    """Nombre de caractères différents acceptés selon la longueur du nom"""
+    if longueur < 6:
+        return 0  # poire / poivre
+    return 1 if longueur < 7 else 2
+
+
+def _distance(a, b, maximum):
+    """Distance de Levenshtein, ou maximum + 1 dès qu'elle le dépasse"""
+    if abs(len(a) - len(b)) > maximum:
+        return maximum + 1
+    precedente = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        courante = [i]
+        for j, cb in enumerate(b, 1):
+            courante.append(min(precedente[j] + 1, courante[j - 1] + 1, precedente[j - 1] + (ca != cb)))
+        if min(courante) > maximum:
+            return maximum + 1
+        precedente = courante
+    return precedente[-1]
+
+
+class ResolveurIngredients:
+    """
+    Associe les noms d'ingrédients lus à des IDs du catalogue, en créant
+    ceux qui manquent (catégorie 'Autre', nom au singulier, listés dans crees)
+
+    Ordre d'essai : INGREDIENT_MAPPING, nom exact (sans la casse), nom
+    normalisé (accents, pluriel, ponctuation), puis nom proche à une ou deux
+    fautes près. Les noms déjà résolus ne sont plus recherchés.
+    """
+
+    def __init__(self):
+        self._ids = {}  # clé normalisée -> ID
+        self._catalogue = None  # clé normalisée -> (ID, nom), chargé au premier nom inconnu
+        self.crees = []
+        self.approches = {}  # nom lu -> nom du catalogue retenu
+
+    def resoudre(self, lignes):
+        """
+        Résout les noms d'un lot (une requête pour les noms encore inconnus)
+
+        Args:
+            lignes: Liste de tuples (nom lu, unité), l'unité servant aux ingrédients créés
+
+        Returns:
+            Dict nom lu -> ID de l'ingrédient
+        """
+        noms = {}  # nom lu -> (clé, nom cible)
+        for nom, _ in lignes:
+            if nom not in noms:
+                cle = cle_ingredient(nom)
+                cible = _MAPPING_CLES.get(cle)
+                if cible is not None:
+                    cle = cle_ingredient(cible)
+                noms[nom] = (cle, cible or nom_ingredient(nom))
+
+        inconnus = {cible.lower(): cle for cle, cible in noms.values() if cle not in self._ids}
+        if inconnus:
+            trouves = db.session.execute(
+                db.select(Ingredient.id, Ingredient.nom)
+                .where(db.func.lower(Ingredient.nom).in_(list(inconnus)))
+            )
+            for ingredient_id, nom in trouves:
+                self._ids[inconnus.get(nom.lower(), cle_ingredient(nom))] = ingredient_id
+
+        a_creer = {}
+        for nom, (cle, cible) in noms.items():
+            if cle not in self._ids and cle not in a_creer:
+                ingredient_id, nom_catalogue = self._rapprocher(cle)
+                if ingredient_id is not None:
+                    self._ids[cle] = ingredient_id
+                    if cle_ingredient(nom_catalogue) != cle:
+                        self.approches[nom] = nom_catalogue
+                else:
+                    a_creer[cle] = cible
+
+        if a_creer:
+            unites = {}
+            for nom, unite in lignes:
+                if unite:
+                    unites.setdefault(noms[nom][0], unite)
+            nouveaux = [{'nom': cible[:100], 'categorie': 'Autre', 'unite_mesure': unites.get(cle)}
+                        for cle, cible in a_creer.items()]
+            inserer_lignes(Ingredient, nouveaux)
+            for cle, nouveau in zip(a_creer, nouveaux):
+                self._ids[cle] = nouveau['id']
+                self._catalogue[cle] = (nouveau['id'], nouveau['nom'])
+                self.crees.append(nouveau['nom'])
+
+        return {nom: self._ids[cle] for nom, (cle, _) in noms.items()}
+
+    def _rapprocher(self, cle):
+        """(ID, nom) de l'ingrédient du catalogue de même clé ou le plus proche, (None, None) sinon"""
+        if self._catalogue is None:
+            self._catalogue = {}
+            for ingredient_id, nom in db.session.execute(db.select(Ingredient.id, Ingredient.nom)):
+                self._catalogue.setdefault(cle_ingredient(nom), (ingredient_id, nom))
+
+        if cle in self._catalogue:
+            return self._catalogue[cle]
+
+        for candidat in difflib.get_close_matches(cle, self._catalogue, n=3, cutoff=SEUIL_APPROCHE):
+            fautes = _fautes_tolerees(min(len(cle), len(candidat)))
+            if fautes and _distance(cle, candidat, fautes) <= fautes:
+                return self._catalogue[candidat]
+        return None, None
+
+
+def _quantite(valeur):
+    """Quantité lue ("1,5", "1/2", 3) -> float"""
+    try:
+        if isinstance(valeur, (int, float)) and not isinstance(valeur, bool):
+            quantite = float(valeur)
+        else:
+            texte = str(valeur or '').strip().replace(',', '.')
+            if '/' in texte:
+                numerateur, denominateur = texte.split('/', 1)
+                quantite = float(numerateur) / float(denominateur)
+            else:
+                quantite = float(texte)
+    except (ValueError, ZeroDivisionError, OverflowError):
+        raise ErreurLecture(f'Quantité invalide : {valeur!r}')
+    # NaN, Infinity (acceptés par json.loads et float()) ou entier démesuré
+    if not math.isfinite(quantite):
+        raise ErreurLecture(f'Quantité invalide : {valeur!r}')
+    if quantite < 0:
+        raise ErreurLecture(f'Quantité négative : {valeur!r}')
+    return quantite
+
+
+def _entier(valeur, defaut, champ):
+    if valeur in (None, ''):
+        return defaut
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise ErreurLecture(f'{champ} invalide : {valeur!r}')
+
+
+def _booleen(valeur, defaut):
+    if valeur in (None, ''):
+        return defaut
+    if isinstance(valeur, bool):
+        return valeur
+    return str(valeur).strip().lower() in ('1', 'true', 'oui', 'vrai', 'o', 'yes')
+
+
+def normaliser_recette(donnees, is_public=True):
+    """
+    Vérifie un enregistrement lu et le ramène aux colonnes de Recette
+
+    Returns:
+        (colonnes de la recette, liste de (nom, quantite, unite), liste de textes)
+
+    Raises:
+        ErreurLecture: Nom manquant, valeur invalide ou trop longue
+    """
+    if not isinstance(donnees, dict):
+        raise ErreurLecture('Enregistrement qui n\'est pas un objet')
+    nom = str(donnees.get('nom') or '').strip()
+    if not nom:
+        raise ErreurLecture('Recette sans nom')
+
+    type_repas = donnees.get('type_repas')
+    if isinstance(type_repas, (list, tuple)):
+        type_repas = ','.join(type_repas)
+
+    colonnes = {
+        'nom': nom,
+        'portions': _entier(donnees.get('portions'), 4, 'Portions'),
+        'temps_preparation': donnees.get('temps_preparation') or None,
+        'temps_cuisson': donnees.get('temps_cuisson') or None,
+        'auteur_nom': donnees.get('auteur_nom') or None,
+        'evaluation': min(max(_entier(donnees.get('evaluation'), 0, 'Évaluation'), 0), 5),
+        'note': donnees.get('note') or None,
+        'type_repas': type_repas or None,
+        'is_public': _booleen(donnees.get('is_public'), is_public),
+    }
+    for champ, longueur in LONGUEURS_MAX.items():
+        if colonnes[champ] is not None:
+            colonnes[champ] = str(colonnes[champ]).strip()
+            if len(colonnes[champ]) > longueur:
+                raise ErreurLecture(f'{champ} trop long ({len(colonnes[champ])} > {longueur} caractères)')
+
+    ingredients = []
+    for ligne in donnees.get('ingredients') or []:
+        if isinstance(ligne, (list, tuple)):
+            ligne = dict(zip(('nom', 'quantite', 'unite'), ligne))
+        nom_ingredient = str(ligne.get('nom') or '').strip()
+        if not nom_ingredient:
+            raise ErreurLecture('Ingrédient sans nom')
+        unite = str(ligne.get('unite') or '').strip() or None
+        if unite is not None and len(unite) > 20:
+            raise ErreurLecture(f'Unité trop longue : {unite!r}')
+        quantite = ligne.get('quantite')
+        ingredients.append((nom_ingredient, 1.0 if quantite in (None, '') else _quantite(quantite), unite))
+
+    instructions = donnees.get('instructions') or []
+    if isinstance(instructions, str):
+        instructions = [instructions]
+    instructions = [str(texte).strip() for texte in instructions if str(texte).strip()]
+
+    return colonnes, ingredients, instructions
+
+
+# Lecteurs : générateurs de tuples (numéro de ligne, dict ou ErreurLecture)
+
+def lire_jsonl(fichier):
+    """Un objet JSON par ligne (lignes vides et commentaires # ignorés)"""
+    for numero, ligne in enumerate(fichier, 1):
+        ligne = ligne.strip()
+        if not ligne or ligne.startswith('#'):
+            continue
+        try:
+            yield numero, json.loads(ligne)
+        except ValueError as e:
+            yield numero, ErreurLecture(f'JSON invalide : {e}')
+
+
+def lire_csv(fichier):
+    """
+    Une ligne par ingrédient ; les colonnes de la recette ne sont lues que
+    sur sa première ligne. Séparateur , ou ; (détecté sur l'en-tête).
+    """
+    entete = fichier.readline()
+    separateur = ';' if entete.count(';') > entete.count(',') else ','
+    lignes = csv.DictReader(chain([entete], fichier), delimiter=separateur)
+    lignes.fieldnames = [colonne.strip().lower() for colonne in lignes.fieldnames or []]
+    colonne_nom = 'recette' if 'recette' in lignes.fieldnames else 'nom'
+
+    numeros = ((lignes.line_num, ligne) for ligne in lignes)
+    for nom, groupe in groupby(numeros, key=lambda element: (element[1].get(colonne_nom) or '').strip()):
+        groupe = list(groupe)
+        numero, premiere = groupe[0]
+        donnees = {champ: premiere.get(champ) for champ in (
+            'portions', 'temps_preparation', 'temps_cuisson', 'auteur_nom',
+            'evaluation', 'note', 'type_repas', 'is_public')}
+        donnees['nom'] = nom
+        donnees['ingredients'] = [
+            {'nom': ligne['ingredient'], 'quantite': ligne.get('quantite'), 'unite': ligne.get('unite')}
+            for _, ligne in groupe if (ligne.get('ingredient') or '').strip()
+        ]
+        donnees['instructions'] = [ligne['instruction'] for _, ligne in groupe
+                                   if (ligne.get('instruction') or '').strip()]
+        yield numero, donnees
+
+
+def _ligne_ingredient(texte):
+    """ "200 g de farine", "2 gousses d'ail", "sel" -> {nom, quantite, unite} """
+    correspondance = re.match(r'^(\d+(?:[.,]\d+)?(?:/\d+)?)\s*(.*)$', texte)
+    if correspondance is None:
+        return {'nom': texte, 'quantite': None, 'unite': None}
+
+    quantite, reste = correspondance.groups()
+    unite = None
+    for motif, symbole in UNITES_CUILLERES:
+        if motif.match(reste):
+            unite, reste = symbole, motif.sub('', reste, count=1)
+            break
+    else:
+        mots = reste.split(None, 1)
+        if mots:
+            symbole = UNITES_TEXTE.get(recherche.normaliser_texte(mots[0]).rstrip('.'))
+            if symbole is not None:
+                unite, reste = symbole, mots[1] if len(mots) > 1 else ''
+    reste = re.sub(r'^(?:de\s+|d[\'’]\s*)', '', reste.strip(), flags=re.IGNORECASE)
+    return {'nom': reste.strip(), 'quantite': quantite, 'unite': unite or 'pièce'}
+
+
+def lire_texte(fichier):
+    """
+    Format texte :
+
+        # Nom de la recette
+        portions: 4
+        preparation: 15 min
+        cuisson: 30 min
+        ## Ingrédients
+        - 200 g de farine
+        ## Instructions
+        - Mélanger...
+    """
+    cles = {'portions': 'portions', 'preparation': 'temps_preparation', 'cuisson': 'temps_cuisson',
+            'auteur': 'auteur_nom', 'evaluation': 'evaluation', 'note': 'note',
+            'type': 'type_repas', 'publique': 'is_public'}
+    donnees, numero, section = None, 0, None
+
+    for position, ligne in enumerate(fichier, 1):
+        ligne = ligne.strip()
+        if ligne.startswith('# '):
+            if donnees is not None:
+                yield numero, donnees
+            donnees, numero, section = {'nom': ligne[2:], 'ingredients': [], 'instructions': []}, position, None
+        elif donnees is None or not ligne:
+            continue
+        elif ligne.startswith('##'):
+            titre = recherche.normaliser_texte(ligne.lstrip('#').strip())
+            section = 'ingredients' if titre.startswith('ingredient') else 'instructions'
+        elif section is None and ':' in ligne:
+            cle, valeur = ligne.split(':', 1)
+            cle = cles.get(recherche.normaliser_texte(cle.strip()))
+            if cle is not None:
+                donnees[cle] = valeur.strip()
+        elif section == 'ingredients':
+            donnees['ingredients'].append(_ligne_ingredient(re.sub(r'^[-*]\s*', '', ligne)))
+        elif section == 'instructions':
+            texte = re.sub(r'^(?:[-*]|\d+[.)])\s*', '', ligne)
+            if ligne[0] in '-*' or re.match(r'^\d+[.)]', ligne) or not donnees['instructions']:
+                donnees['instructions'].append(texte)
+            else:
+                # Suite de l'étape précédente
+                donnees['instructions'][-1] += ' ' + texte
+
+    if donnees is not None:
+        yield numero, donnees
+
+
+LECTEURS = {'jsonl': lire_jsonl, 'csv': lire_csv, 'texte': lire_texte}
+
+
+def par_lots(elements, taille):
+    """Découpe un itérable en listes de `taille` éléments, sans le charger en entier"""
+    elements = iter(elements)
+    while True:
+        lot = list(islice(elements, taille))
+        if not lot:
+            return
+        yield lot
+
+
+class Importeur:
+    """
+    Importe des recettes lues pour un utilisateur, lot par lot
+
+    Chaque lot : une requête pour les recettes déjà présentes, une pour les
+    ingrédients inconnus, puis insertion groupée (bulk_insert_mappings) des
+    recettes, de leurs ingrédients et instructions, indexation plein texte
+    et commit.
+    """
+
+    def __init__(self, created_by, is_public=True):
+        self.created_by = created_by
+        self.is_public = is_public
+        self.resolveur = ResolveurIngredients()
+        self._noms_vus = set()
+
+        self.importees = 0
+        self.ignorees = 0
+        self.invalides = 0
+        self.erreurs = []  # (numéro de ligne, message), ERREURS_MAX au plus
+
+    def _erreur(self, numero, message):
+        self.invalides += 1
+        if len(self.erreurs) < ERREURS_MAX:
+            self.erreurs.append((numero, message))
+
+    def importer_lot(self, lot):
+        """
+        Args:
+            lot: Liste de (numéro de ligne, dict ou ErreurLecture) produits par un lecteur
+
+        Returns:
+            Nombre de recettes importées
+        """
+        recettes = []
+        for numero, donnees in lot:
+            if isinstance(donnees, ErreurLecture):
+                self._erreur(numero, str(donnees))
+                continue
+            try:
+                recettes.append(normaliser_recette(donnees, self.is_public))
+            except ErreurLecture as e:
+                self._erreur(numero, str(e))
+
+        noms = [colonnes['nom'] for colonnes, _, _ in recettes]
+        existantes = set(db.session.scalars(
+            db.select(Recette.nom).where(Recette.created_by == self.created_by, Recette.nom.in_(noms))
+        )) if noms else set()
+
+        a_importer = []
+        for recette in recettes:
+            nom = recette[0]['nom']
+            if nom in existantes or nom in self._noms_vus:
+                self.ignorees += 1
+            else:
+                self._noms_vus.add(nom)
+                a_importer.append(recette)
+        if not a_importer:
+            return 0
+
+        ingredient_ids = self.resolveur.resoudre(
+            [(nom, unite) for _, ingredients, _ in a_importer for nom, _, unite in ingredients]
+        )
+
+        lignes_recettes = [dict(colonnes, created_by=self.created_by,
+                                nb_ingredients=len(ingredients), nb_instructions=len(instructions))
+                           for colonnes, ingredients, instructions in a_importer]
+        inserer_lignes(Recette, lignes_recettes)
+
+        lignes_ingredients, lignes_instructions = [], []
+        for ligne, (_, ingredients, instructions) in zip(lignes_recettes, a_importer):
+            lignes_ingredients.extend(
+                {'recette_id': ligne['id'], 'ingredient_id': ingredient_ids[nom],
+                 'quantite': quantite, 'unite': unite}
+                for nom, quantite, unite in ingredients
+            )
+            lignes_instructions.extend(
+                {'recette_id': ligne['id'], 'ordre': ordre, 'texte': texte}
+                for ordre, texte in enumerate(instructions, start=1)
+            )
+        inserer_lignes(RecetteIngredient, lignes_ingredients)
+        inserer_lignes(Instruction, lignes_instructions)
+
+        connexion = db.session.connection()
+        if recherche.plein_texte_disponible(connexion):
+            recherche.indexer_plein_texte(connexion, [ligne['id'] for ligne in lignes_recettes])
+
+        db.session.commit()
+        self.importees += len(lignes_recettes)
+        return len(lignes_recettes)
+
+    def importer(self, enregistrements, taille_lot=500):
+        """
+        Importe tous les enregistrements d'un lecteur
+
+        Yields:
+            Tuple (nombre de recettes importées, durée en secondes) par lot
+        """
+        for lot in par_lots(enregistrements, taille_lot):
+            debut = time.perf_counter()
+            try:
+                importees = self.importer_lot(lot)
+            except Exception:
+                db.session.rollback()
+                raise
+            yield importees, time.perf_counter() - debut
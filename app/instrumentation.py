@@ -0,0 +1,87 @@
+"""
+Instrumentation SQL par requête HTTP : nombre de requêtes et temps cumulé
+(en-tête Server-Timing), journal des requêtes lentes et détection des N+1
+"""
+import time
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from app import db
+
+
+def _avant_execution(conn, cursor, statement, parameters, context, executemany):
+    """Mémorise l'instant de début de la requête SQL"""
+    conn.info.setdefault('instrumentation_debuts', []).append(time.perf_counter())
+
+
+def _apres_execution(conn, cursor, statement, parameters, context, executemany):
+    """Comptabilise la requête SQL dans les statistiques de la requête HTTP en cours"""
+    debuts = conn.info.get('instrumentation_debuts')
+    if not debuts:
+        return
+    duree_ms = (time.perf_counter() - debuts.pop()) * 1000
+
+    if not has_request_context():
+        return
+    stats = g.get('stats_sql')
+    if stats is None:
+        return
+
+    stats['nombre'] += 1
+    stats['duree_ms'] += duree_ms
+    stats['statements'][statement] = stats['statements'].get(statement, 0) + 1
+
+    if duree_ms >= stats['seuil_lent_ms']:
+        current_app.logger.warning(
+            'Requête SQL lente (%.1f ms) sur %s : %s',
+            duree_ms, request.endpoint, ' '.join(statement.split())
+        )
+
+
+def _debut_requete():
+    """Initialise les statistiques SQL de la requête HTTP"""
+    g.stats_sql = {
+        'debut': time.perf_counter(),
+        'nombre': 0,
+        'duree_ms': 0.0,
+        'statements': {},
+        'seuil_lent_ms': current_app.config['SQL_SEUIL_LENT_MS'],
+    }
+
+
+def _fin_requete(response):
+    """Ajoute l'en-tête Server-Timing et signale les requêtes répétées (N+1 probables)"""
+    stats = g.pop('stats_sql', None)
+    if stats is None:
+        return response
+
+    duree_totale_ms = (time.perf_counter() - stats['debut']) * 1000
+    response.headers.add(
+        'Server-Timing',
+        f'sql;dur={stats["duree_ms"]:.1f};desc="{stats["nombre"]} requetes", '
+        f'app;dur={duree_totale_ms:.1f}'
+    )
+
+    seuil_n_plus_1 = current_app.config['SQL_SEUIL_N_PLUS_1']
+    for statement, nombre in stats['statements'].items():
+        if nombre >= seuil_n_plus_1:
+            current_app.logger.warning(
+                'N+1 probable sur %s : requête exécutée %d fois : %s',
+                request.endpoint, nombre, ' '.join(statement.split())[:300]
+            )
+
+    return response
+
+
+def init_app(app):
+    """Branche l'instrumentation sur les moteurs SQLAlchemy et le cycle des requêtes"""
+    if not app.config.get('SQL_INSTRUMENTATION'):
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not event.contains(engine, 'before_cursor_execute', _avant_execution):
+                event.listen(engine, 'before_cursor_execute', _avant_execution)
+                event.listen(engine, 'after_cursor_execute', _apres_execution)
+
+    app.before_request(_debut_requete)
+    app.after_request(_fin_requete)
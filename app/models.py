@@ -1,11 +1,23 @@
 """
 Modèles de base de données pour Iovag
 """
+import math
+import os
+import threading
+import time
 from datetime import datetime
+from itertools import chain
 from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from werkzeug.security import generate_password_hash, check_password_hash
 from app import db, login_manager
 
+try:
+    import fcntl
+except ImportError:  # Windows (développement uniquement)
+    fcntl = None
+
 
 class UnitConverter:
     """
@@ -13,9 +25,26 @@ class UnitConverter:
     Version 2: Utilise la base de données pour les conversions
     """
 
-    # Cache pour les unités (pour éviter trop de requêtes DB)
+    # Tables de conversion précalculées (chargées une seule fois depuis la DB)
+    # unité (nom ou symbole en minuscules) -> (facteur_vers_base, symbole_base)
     _cache_unites = {}
+    # (ingredient_id, unité en minuscules) -> (facteur_vers_base, symbole_base)
+    _cache_conversions = {}
     _cache_initialized = False
+    _version = 0  # Incrémentée à chaque reconstruction des tables
+
+    # Lignes brutes indexées par ID, pour ne recharger que les lignes modifiées
+    _lignes_unites = {}
+    _lignes_conversions = {}
+
+    # Journal partagé entre les workers Gunicorn (une ligne par modification)
+    _journal_path = None
+    _journal_offset = 0
+    _generation = 0
+    JOURNAL_TAILLE_MAX = 64 * 1024  # Au-delà, le journal est réinitialisé
+
+    # Chargement et rechargement des tables sérialisés entre les threads d'un worker
+    _verrou = threading.RLock()
 
     # Table de conversion LEGACY : unité -> (unité_base, facteur_multiplication)
     # Conservée pour compatibilité avec l'ancien système
@@ -40,43 +69,318 @@ class UnitConverter:
         'tranche': ('tranche', 1),
     }
 
+    @classmethod
+    def init_app(cls, app):
+        """
+        Configure le journal de modifications des unités partagé entre workers
+        et vérifie sa génération une fois par requête
+        """
+        cls._journal_path = app.config.get('UNITES_JOURNAL_PATH')
+        if cls._journal_path:
+            os.makedirs(os.path.dirname(cls._journal_path), exist_ok=True)
+        app.before_request(cls.synchroniser)
+
+    @classmethod
+    def _taille_journal(cls):
+        """Taille actuelle du journal (0 s'il n'existe pas encore)"""
+        try:
+            return os.stat(cls._journal_path).st_size
+        except (OSError, TypeError):
+            return 0
+
     @classmethod
     def _init_cache(cls):
-        """Initialise le cache des unités depuis la base de données"""
+        """
+        Charge en mémoire les tables de conversion depuis la base de données
+        Deux requêtes au total (unités + conversions par ingrédient), ensuite
+        toutes les normalisations sont résolues sans accès à la DB
+        """
         if cls._cache_initialized:
             return
 
-        # Import ici pour éviter les imports circulaires
-        from app.models import Unite
+        with cls._verrou:
+            if cls._cache_initialized:
+                return
 
-        try:
-            # Charger toutes les unités dans le cache
-            unites = Unite.query.all()
-            for unite in unites:
-                # Indexer par nom et par symbole
-                cls._cache_unites[unite.nom.lower()] = unite
-                cls._cache_unites[unite.symbole.lower()] = unite
+            # Lire la position du journal AVANT de charger pour ne rater aucune modification
+            offset = cls._taille_journal()
+
+            try:
+                lignes_unites = cls._charger_unites()
+                lignes_conversions = cls._charger_conversions()
+            except Exception:
+                # Si la table n'existe pas encore (migrations), utiliser le système legacy
+                db.session.rollback()
+                cls._cache_initialized = False
+                return
+
+            cls._lignes_unites = {u.id: u for u in lignes_unites}
+            cls._lignes_conversions = {c.id: c for c in lignes_conversions}
+            cls._reconstruire()
+            cls._journal_offset = offset
             cls._cache_initialized = True
-        except Exception:
-            # Si la table n'existe pas encore (migrations), utiliser le système legacy
+
+    @staticmethod
+    def _charger_unites(ids=None):
+        """Charge les colonnes utiles des unités (toutes ou seulement `ids`)"""
+        from app.models import Unite
+
+        query = db.session.query(
+            Unite.id, Unite.nom, Unite.symbole, Unite.type_unite,
+            Unite.unite_base_id, Unite.facteur_vers_base
+        )
+        if ids is not None:
+            query = query.filter(Unite.id.in_(ids))
+        return query.all()
+
+    @staticmethod
+    def _charger_conversions(ids=None):
+        """Charge les colonnes utiles des conversions (toutes ou seulement `ids`)"""
+        from app.models import IngredientConversionUnite
+
+        query = db.session.query(
+            IngredientConversionUnite.id,
+            IngredientConversionUnite.ingredient_id,
+            IngredientConversionUnite.unite_source_id,
+            IngredientConversionUnite.unite_cible_id,
+            IngredientConversionUnite.facteur_conversion
+        )
+        if ids is not None:
+            query = query.filter(IngredientConversionUnite.id.in_(ids))
+        return query.all()
+
+    @classmethod
+    def _reconstruire(cls):
+        """Recalcule les tables de recherche à partir des lignes en mémoire"""
+        cls._version += 1
+        cls._cache_unites, cls._cache_conversions = cls._construire_tables(
+            cls._lignes_unites.values(),
+            sorted(cls._lignes_conversions.values(), key=lambda c: c.id)
+        )
+
+    @staticmethod
+    def _construire_tables(lignes_unites, lignes_conversions):
+        """
+        Résout les facteurs vers l'unité de base pour chaque unité et chaque
+        conversion personnalisée
+
+        Returns:
+            tuple (table_unites, table_conversions)
+        """
+        symboles = {u.id: u.symbole for u in lignes_unites}
+        par_id = {}
+        for u in lignes_unites:
+            symbole_base = symboles.get(u.unite_base_id, u.symbole) if u.unite_base_id else u.symbole
+            facteur = u.facteur_vers_base if u.facteur_vers_base is not None else 1.0
+            par_id[u.id] = (facteur, symbole_base, u)
+
+        table_unites = {}
+        for facteur, symbole_base, u in par_id.values():
+            # Indexer par nom et par symbole
+            table_unites[u.nom.lower()] = (facteur, symbole_base)
+            table_unites[u.symbole.lower()] = (facteur, symbole_base)
+
+        table_conversions = {}
+        for c in lignes_conversions:
+            source = par_id.get(c.unite_source_id)
+            cible = par_id.get(c.unite_cible_id)
+            # Les conversions personnalisées ne s'appliquent qu'aux unités "unitaires"
+            if not source or not cible or source[2].type_unite != 'unitaire':
+                continue
+            facteur_cible, symbole_base_cible, _ = cible
+            valeur = (c.facteur_conversion * facteur_cible, symbole_base_cible)
+            # La première conversion définie l'emporte (comme .first())
+            table_conversions.setdefault((c.ingredient_id, source[2].nom.lower()), valeur)
+            table_conversions.setdefault((c.ingredient_id, source[2].symbole.lower()), valeur)
+
+        return table_unites, table_conversions
+
+    @classmethod
+    def invalider_cache(cls):
+        """Vide les tables de conversion (à appeler après modification des unités)"""
+        with cls._verrou:
             cls._cache_initialized = False
+            cls._cache_unites = {}
+            cls._cache_conversions = {}
+            cls._lignes_unites = {}
+            cls._lignes_conversions = {}
+
+    @classmethod
+    def signaler_modification(cls, unites=(), conversions=()):
+        """
+        Enregistre dans le journal partagé les unités/conversions modifiées
+        Les autres workers rechargeront uniquement ces lignes à leur prochaine requête
+
+        Args:
+            unites: IDs des unités créées, modifiées ou supprimées
+            conversions: IDs des conversions créées, modifiées ou supprimées
+        """
+        if not cls._journal_path:
+            cls.invalider_cache()
+            return
+
+        with open(cls._journal_path, 'a', encoding='utf-8') as journal:
+            if fcntl:
+                fcntl.flock(journal, fcntl.LOCK_EX)
+            try:
+                generation = cls._lire_generation() + 1
+                lignes = [f'{generation} unite {i}\n' for i in unites]
+                lignes += [f'{generation} conversion {i}\n' for i in conversions]
+                if os.fstat(journal.fileno()).st_size > cls.JOURNAL_TAILLE_MAX:
+                    # Compacter : les workers verront un journal plus court et rechargeront tout
+                    journal.truncate(0)
+                    lignes = [f'{generation} reset 0\n']
+                journal.writelines(lignes or [f'{generation} reset 0\n'])
+            finally:
+                if fcntl:
+                    fcntl.flock(journal, fcntl.LOCK_UN)
+
+    @classmethod
+    def _lire_generation(cls):
+        """Dernière génération écrite dans le journal"""
+        try:
+            with open(cls._journal_path, 'rb') as journal:
+                journal.seek(max(0, os.fstat(journal.fileno()).st_size - 128))
+                derniere = journal.read().splitlines()[-1:]
+            return int(derniere[0].split()[0]) if derniere else 0
+        except (OSError, ValueError, IndexError):
+            return 0
+
+    @classmethod
+    def generation(cls):
+        """
+        Génération des tables de conversion, identique dans tous les workers
+        (lue dans le journal partagé, sinon version locale des tables)
+        """
+        if cls._journal_path:
+            return cls._lire_generation()
+        return cls._version
 
     @classmethod
-    def _get_unite_db(cls, nom_ou_symbole):
+    def synchroniser(cls):
+        """
+        Applique les modifications signalées par les autres workers
+        Coût nominal : un stat() du journal, aucune requête DB
         """
-        Récupère une unité depuis le cache/DB
-        Retourne None si non trouvée
+        if not cls._cache_initialized or not cls._journal_path:
+            return
+
+        if cls._taille_journal() == cls._journal_offset:
+            return
+
+        with cls._verrou:
+            # Un autre thread a pu appliquer le journal entre-temps
+            taille = cls._taille_journal()
+            if not cls._cache_initialized or taille == cls._journal_offset:
+                return
+            if taille < cls._journal_offset:
+                # Journal réinitialisé : tout recharger
+                cls.invalider_cache()
+                return
+
+            with open(cls._journal_path, 'r', encoding='utf-8') as journal:
+                journal.seek(cls._journal_offset)
+                contenu = journal.read()
+
+            # Ne traiter que les lignes complètes
+            fin = contenu.rfind('\n') + 1
+            unites_modifiees, conversions_modifiees = set(), set()
+            for ligne in contenu[:fin].splitlines():
+                try:
+                    generation, type_ligne, id_ligne = ligne.split()
+                    generation, id_ligne = int(generation), int(id_ligne)
+                except ValueError:
+                    continue
+                cls._generation = max(cls._generation, generation)
+                if type_ligne == 'unite':
+                    unites_modifiees.add(id_ligne)
+                elif type_ligne == 'conversion':
+                    conversions_modifiees.add(id_ligne)
+                else:
+                    cls.invalider_cache()
+                    return
+
+            try:
+                cls._appliquer_modifications(unites_modifiees, conversions_modifiees)
+            except Exception:
+                db.session.rollback()
+                cls.invalider_cache()
+                return
+            cls._journal_offset += len(contenu[:fin].encode('utf-8'))
+
+    @classmethod
+    def _appliquer_modifications(cls, unites_ids, conversions_ids):
+        """Recharge uniquement les lignes modifiées puis reconstruit les tables"""
+        if unites_ids:
+            nouvelles = {u.id: u for u in cls._charger_unites(unites_ids)}
+            for unite_id in unites_ids:
+                if unite_id in nouvelles:
+                    cls._lignes_unites[unite_id] = nouvelles[unite_id]
+                else:
+                    cls._lignes_unites.pop(unite_id, None)
+                    # Les conversions liées sont supprimées en cascade
+                    for conversion in list(cls._lignes_conversions.values()):
+                        if unite_id in (conversion.unite_source_id, conversion.unite_cible_id):
+                            del cls._lignes_conversions[conversion.id]
+
+        if conversions_ids:
+            nouvelles = {c.id: c for c in cls._charger_conversions(conversions_ids)}
+            for conversion_id in conversions_ids:
+                if conversion_id in nouvelles:
+                    cls._lignes_conversions[conversion_id] = nouvelles[conversion_id]
+                else:
+                    cls._lignes_conversions.pop(conversion_id, None)
+
+        cls._reconstruire()
+
+    @classmethod
+    def facteur_base(cls, unite, ingredient_id=None, poids_estime_g=None):
+        """
+        Retourne le facteur multiplicatif et l'unité de base pour une unité
+        Aucune requête DB une fois les tables chargées
+
+        Args:
+            unite: L'unité (nom ou symbole)
+            ingredient_id: ID de l'ingrédient (optionnel, pour conversions spécifiques)
+            poids_estime_g: Poids estimé d'une pièce (optionnel, fallback pièce → g)
+
+        Returns:
+            tuple (facteur, unite_base_symbole)
         """
+        if not unite:
+            return 1, None
+
         cls._init_cache()
-        if not nom_ou_symbole:
-            return None
-        return cls._cache_unites.get(nom_ou_symbole.lower())
+        unite_lower = unite.lower()
+
+        # 1. Conversion personnalisée pour cet ingrédient
+        if ingredient_id is not None:
+            conversion = cls._cache_conversions.get((ingredient_id, unite_lower))
+            if conversion:
+                return conversion
+
+            # Fallback: utiliser poids_estime_g pour pièce → g (legacy)
+            if unite_lower == 'pièce' and poids_estime_g:
+                return poids_estime_g, 'g'
+
+        # 2. Unités standards de la DB
+        unite_db = cls._cache_unites.get(unite_lower)
+        if unite_db:
+            return unite_db
+
+        # 3. Fallback sur l'ancien système CONVERSIONS
+        if unite_lower in cls.CONVERSIONS:
+            unite_base, facteur = cls.CONVERSIONS[unite_lower]
+            return facteur, unite_base
+
+        # 4. Si rien ne fonctionne, retourner tel quel
+        return 1, unite
 
     @classmethod
     def normaliser(cls, quantite, unite, ingredient=None):
         """
         Convertit une quantité dans son unité de base
-        Utilise la base de données en priorité, fallback sur CONVERSIONS legacy
+        Utilise les tables précalculées, fallback sur CONVERSIONS legacy
 
         Args:
             quantite: La quantité à convertir
@@ -89,47 +393,25 @@ class UnitConverter:
         if not unite:
             return quantite, None
 
-        # 1. Chercher si on a une conversion personnalisée pour cet ingrédient
-        if ingredient:
-            try:
-                from app.models import IngredientConversionUnite, Unite
-
-                # Trouver l'unité source
-                unite_source = cls._get_unite_db(unite)
-
-                if unite_source and unite_source.type_unite == 'unitaire':
-                    # Chercher une conversion personnalisée depuis cette unité
-                    conversion = IngredientConversionUnite.query.filter_by(
-                        ingredient_id=ingredient.id,
-                        unite_source_id=unite_source.id
-                    ).first()
-
-                    if conversion:
-                        # Utiliser la conversion personnalisée
-                        quantite_convertie = conversion.convertir(quantite)
-                        return quantite_convertie, conversion.unite_cible.symbole
-
-                # Fallback: utiliser poids_estime_g pour pièce → g (legacy)
-                if unite.lower() == 'pièce' and ingredient.poids_estime_g:
-                    return quantite * ingredient.poids_estime_g, 'g'
-            except Exception:
-                pass  # Continuer avec le système de DB normal
+        if ingredient is not None:
+            facteur, unite_base = cls.facteur_base(unite, ingredient.id, ingredient.poids_estime_g)
+        else:
+            facteur, unite_base = cls.facteur_base(unite)
+        return quantite * facteur, unite_base
 
-        # 2. Utiliser le système de DB pour les unités standards
-        unite_obj = cls._get_unite_db(unite)
-        if unite_obj:
-            unite_base = unite_obj.get_unite_base()
-            quantite_normalisee = unite_obj.convertir_vers_base(quantite)
-            return quantite_normalisee, unite_base.symbole
+    @classmethod
+    def normaliser_many(cls, lignes):
+        """
+        Normalise un lot de quantités en une seule passe
 
-        # 3. Fallback sur l'ancien système CONVERSIONS
-        unite_lower = unite.lower()
-        if unite_lower in cls.CONVERSIONS:
-            unite_base, facteur = cls.CONVERSIONS[unite_lower]
-            return quantite * facteur, unite_base
+        Args:
+            lignes: Itérable de tuples (quantite, unite, ingredient)
 
-        # 4. Si rien ne fonctionne, retourner tel quel
-        return quantite, unite
+        Returns:
+            Liste de tuples (quantite_normalisee, unite_base_symbole)
+        """
+        cls._init_cache()
+        return [cls.normaliser(quantite, unite, ingredient) for quantite, unite, ingredient in lignes]
 
     @classmethod
     def convertir_pour_affichage(cls, quantite, unite, ingredient=None):
@@ -181,6 +463,34 @@ def load_user(user_id):
     return User.query.get(int(user_id))
 
 
+def _plus_recente(*dates):
+    """Date la plus récente parmi celles renseignées (None si aucune)"""
+    return max((d for d in dates if d is not None), default=None)
+
+
+def _colonnes_renseignees(ligne):
+    return sorted(cle for cle, valeur in ligne.items() if valeur is not None)
+
+
+def inserer_lignes(modele, lignes):
+    """
+    Insère des lignes en masse et renseigne leur clé 'id' (dans l'ordre de la liste)
+
+    bulk_insert_mappings(return_defaults=True) envoie un INSERT ... RETURNING
+    par ligne. Seule la première ligne est insérée ainsi : elle prend le
+    verrou d'écriture SQLite jusqu'au commit, les suivantes reçoivent donc
+    les IDs consécutifs. Elles sont ensuite triées par colonnes renseignées :
+    bulk_insert_mappings ouvre un nouvel executemany à chaque changement.
+    """
+    if not lignes:
+        return
+    db.session.bulk_insert_mappings(modele, lignes[:1], return_defaults=True)
+    premier = lignes[0]['id']
+    for decalage, ligne in enumerate(lignes[1:], start=1):
+        ligne['id'] = premier + decalage
+    db.session.bulk_insert_mappings(modele, sorted(lignes[1:], key=_colonnes_renseignees))
+
+
 # Table d'association pour les recettes favorites
 recettes_favorites = db.Table('recettes_favorites',
     db.Column('user_id', db.Integer, db.ForeignKey('users.id'), primary_key=True),
@@ -319,7 +629,7 @@ class Recette(db.Model):
     est_divisible = db.Column(db.Boolean, default=True)  # Si False, on ne peut pas réduire les portions
     temps_preparation = db.Column(db.String(50))  # Ex: "15 min"
     temps_cuisson = db.Column(db.String(50))  # Ex: "30 min"
-    evaluation = db.Column(db.Integer, default=0)  # 0-5 étoiles
+    evaluation = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # 0-5 étoiles
     auteur_nom = db.Column(db.String(100))  # Nom de l'auteur de la recette
     note = db.Column(db.Text)  # Notes personnelles
     mois_saison = db.Column(db.String(200))  # Mois de saison basés sur les ingrédients (format: "Janvier,Février,Mars")
@@ -328,13 +638,96 @@ class Recette(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    # Compteurs dénormalisés (maintenus par les événements de session, voir fin du module)
+    nb_ingredients = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    nb_instructions = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    nb_sauvegardes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Révision incrémentée à chaque modification de la recette ou de ses lignes (ETag des pages)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relations
     ingredients = db.relationship('RecetteIngredient', backref='recette', lazy='dynamic', cascade='all, delete-orphan')
     instructions = db.relationship('Instruction', backref='recette', lazy='dynamic', cascade='all, delete-orphan', order_by='Instruction.ordre')
 
+    # Mêmes collections en lecture seule, chargeables d'avance (profils de chargement)
+    ingredients_charges = db.relationship('RecetteIngredient', viewonly=True, order_by='RecetteIngredient.id')
+    instructions_charges = db.relationship('Instruction', viewonly=True, order_by='Instruction.ordre')
+
+    # Index de la pagination de /explore (recettes publiques triées par note puis date)
+    __table_args__ = (
+        db.Index('ix_recettes_explorer', 'is_public', 'evaluation', 'created_at', 'id'),
+    )
+
     # Types de repas prédéfinis
     TYPES_REPAS = ['Petit-déjeuner', 'Déjeuner', 'Goûter', 'Dîner']
 
+    COMPTEURS = ['nb_ingredients', 'nb_instructions', 'nb_sauvegardes']
+
+    @classmethod
+    def with_details(cls):
+        """
+        Profil de chargement de la page détail : lignes d'ingrédients (avec
+        l'ingrédient) et instructions, en deux requêtes supplémentaires
+        """
+        return cls.query.options(
+            db.selectinload(cls.ingredients_charges).joinedload(RecetteIngredient.ingredient),
+            db.selectinload(cls.instructions_charges)
+        )
+
+    @classmethod
+    def revision(cls, recette_id, user_id):
+        """
+        Révision de la page détail pour un utilisateur, en une requête : version
+        de la recette, stock de l'utilisateur pour ses ingrédients, sauvegarde
+        et tables de conversion (disponibilité des ingrédients)
+
+        Returns:
+            tuple (composants de l'ETag, date de dernière modification),
+            None si la recette n'existe pas
+        """
+        ingredients = db.select(RecetteIngredient.ingredient_id).where(RecetteIngredient.recette_id == recette_id)
+        stock = db.and_(Stock.user_id == user_id, Stock.ingredient_id.in_(ingredients))
+        ligne = db.session.execute(
+            db.select(
+                cls.version,
+                cls.updated_at,
+                db.select(db.func.count(Stock.id)).where(stock).scalar_subquery(),
+                db.select(db.func.max(Stock.updated_at)).where(stock).scalar_subquery(),
+                db.exists().where(recettes_favorites.c.recette_id == recette_id,
+                                  recettes_favorites.c.user_id == user_id)
+            ).where(cls.id == recette_id)
+        ).first()
+        if ligne is None:
+            return None
+
+        version, updated_at, nb_stock, maj_stock, sauvegardee = ligne
+        composants = ('recette', recette_id, version, updated_at, nb_stock, maj_stock,
+                      sauvegardee, UnitConverter.generation())
+        return composants, _plus_recente(updated_at, maj_stock)
+
+    @classmethod
+    def recalculer_compteurs(cls, connexion, ids=None):
+        """
+        Recalcule les compteurs depuis les tables liées (une requête UPDATE)
+
+        Args:
+            connexion: Connexion SQLAlchemy
+            ids: IDs des recettes à recalculer (None = toutes)
+        """
+        requete = db.update(cls).values(
+            nb_ingredients=db.select(db.func.count(RecetteIngredient.id))
+                .where(RecetteIngredient.recette_id == cls.id).scalar_subquery(),
+            nb_instructions=db.select(db.func.count(Instruction.id))
+                .where(Instruction.recette_id == cls.id).scalar_subquery(),
+            nb_sauvegardes=db.select(db.func.count())
+                .where(recettes_favorites.c.recette_id == cls.id).scalar_subquery()
+        )
+        if ids is not None:
+            requete = requete.where(cls.id.in_(ids))
+        connexion.execute(requete)
+
     def calculer_mois_saison_auto(self):
         """
         Calcule automatiquement les mois de saison en fonction des ingrédients
@@ -528,67 +921,174 @@ class Menu(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    # Révision incrémentée à chaque modification du menu, de ses jours ou de ses gâteaux
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relations
     jours = db.relationship('MenuJour', backref='menu', lazy='dynamic', cascade='all, delete-orphan', order_by='MenuJour.jour_semaine')
     gateaux = db.relationship('MenuGateau', backref='menu', lazy='dynamic', cascade='all, delete-orphan', order_by='MenuGateau.ordre')
     listes_courses = db.relationship('ListeCourse', backref='menu', lazy='dynamic', cascade='all, delete-orphan')
 
+    # Mêmes collections en lecture seule, chargeables d'avance (profils de chargement)
+    jours_charges = db.relationship('MenuJour', viewonly=True, order_by='MenuJour.jour_semaine')
+    gateaux_charges = db.relationship('MenuGateau', viewonly=True, order_by='MenuGateau.ordre')
+
+    # Colonnes de MenuJour correspondant à chaque repas
+    COLONNES_REPAS = ['petit_dejeuner_id', 'dejeuner_id', 'gouter_id', 'diner_id']
+
+    @classmethod
+    def with_full_week(cls):
+        """
+        Profil de chargement : les 7 jours avec leurs 4 recettes et les gâteaux
+        avec leur recette, en deux requêtes supplémentaires quel que soit le
+        nombre de menus
+        """
+        return cls.query.options(
+            db.selectinload(cls.jours_charges).options(
+                db.joinedload(MenuJour.petit_dejeuner_recette),
+                db.joinedload(MenuJour.dejeuner_recette),
+                db.joinedload(MenuJour.gouter_recette),
+                db.joinedload(MenuJour.diner_recette)
+            ),
+            db.selectinload(cls.gateaux_charges).joinedload(MenuGateau.recette)
+        )
+
+    @classmethod
+    def with_meal_counts(cls):
+        """
+        Profil de chargement des listes : couples (menu, nombre de repas
+        planifiés), comptés en SQL dans la même requête
+        """
+        repas = db.select(
+            MenuJour.menu_id,
+            sum(db.func.count(getattr(MenuJour, colonne)) for colonne in cls.COLONNES_REPAS).label('nb_repas')
+        ).group_by(MenuJour.menu_id).subquery()
+        return db.session.query(cls, db.func.coalesce(repas.c.nb_repas, 0))\
+            .outerjoin(repas, repas.c.menu_id == cls.id)
+
+    @classmethod
+    def revision(cls, menu_id):
+        """
+        Révision de la page détail, en une requête : version du menu et
+        dernière modification des recettes planifiées (leur nom est affiché)
+
+        Returns:
+            tuple (composants de l'ETag, date de dernière modification),
+            None si le menu n'existe pas
+        """
+        recettes = db.union(
+            *(db.select(getattr(MenuJour, colonne)).where(MenuJour.menu_id == menu_id)
+              for colonne in cls.COLONNES_REPAS),
+            db.select(MenuGateau.recette_id).where(MenuGateau.menu_id == menu_id)
+        )
+        planifiees = Recette.id.in_(recettes)
+        ligne = db.session.execute(
+            db.select(
+                cls.version,
+                cls.updated_at,
+                db.select(db.func.count(Recette.id)).where(planifiees).scalar_subquery(),
+                db.select(db.func.max(Recette.updated_at)).where(planifiees).scalar_subquery()
+            ).where(cls.id == menu_id)
+        ).first()
+        if ligne is None:
+            return None
+
+        version, updated_at, nb_recettes, maj_recettes = ligne
+        composants = ('menu', menu_id, version, updated_at, nb_recettes, maj_recettes)
+        return composants, _plus_recente(updated_at, maj_recettes)
+
+    def get_lignes_ingredients(self):
+        """
+        Récupère toutes les lignes d'ingrédients des recettes du menu en une
+        seule requête (repas de la semaine + gâteaux)
+
+        Une recette planifiée plusieurs fois apparaît une seule fois avec
+        nb_occurrences > 1.
+
+        Returns:
+            Liste de lignes (quantite, unite, portions, nb_occurrences,
+            ingredient_id, nom, categorie, poids_estime_g)
+        """
+        # Toutes les occurrences de recettes du menu (un repas = une occurrence)
+        occurrences = db.union_all(*[
+            db.select(getattr(MenuJour, colonne).label('recette_id'))
+            .where(MenuJour.menu_id == self.id, getattr(MenuJour, colonne).isnot(None))
+            for colonne in self.COLONNES_REPAS
+        ], db.select(MenuGateau.recette_id.label('recette_id'))
+            .where(MenuGateau.menu_id == self.id)).subquery()
+
+        par_recette = db.select(
+            occurrences.c.recette_id,
+            db.func.count().label('nb_occurrences')
+        ).group_by(occurrences.c.recette_id).subquery()
+
+        return db.session.query(
+            RecetteIngredient.quantite,
+            RecetteIngredient.unite,
+            Recette.portions,
+            par_recette.c.nb_occurrences,
+            Ingredient.id.label('ingredient_id'),
+            Ingredient.nom,
+            Ingredient.categorie,
+            Ingredient.poids_estime_g
+        ).join(par_recette, par_recette.c.recette_id == RecetteIngredient.recette_id)\
+            .join(Recette, Recette.id == RecetteIngredient.recette_id)\
+            .join(Ingredient, Ingredient.id == RecetteIngredient.ingredient_id)\
+            .order_by(RecetteIngredient.id)\
+            .all()
+
+    def calculer_ingredients_totaux(self, lignes=None):
+        """
+        Agrège les quantités par (ingrédient, unité de base) pour le nombre
+        de personnes du menu
+
+        Args:
+            lignes: Lignes issues de get_lignes_ingredients() (chargées si absent)
+
+        Returns:
+            dict {(ingredient_id, unite_base): {'nom', 'categorie', 'quantite', 'unite'}}
+        """
+        if lignes is None:
+            lignes = self.get_lignes_ingredients()
+
+        ingredients_totaux = {}
+        for ligne in lignes:
+            # Ajuster au nombre de personnes du menu puis normaliser l'unité
+            ratio = self.nb_personnes / (ligne.portions or 1)
+            facteur, unite_base = UnitConverter.facteur_base(
+                ligne.unite, ligne.ingredient_id, ligne.poids_estime_g
+            )
+            quantite = ligne.quantite * ratio * ligne.nb_occurrences * facteur
+
+            key = (ligne.ingredient_id, unite_base)
+            if key in ingredients_totaux:
+                ingredients_totaux[key]['quantite'] += quantite
+            else:
+                ingredients_totaux[key] = {
+                    'nom': ligne.nom,
+                    'categorie': ligne.categorie,
+                    'quantite': quantite,
+                    'unite': unite_base
+                }
+
+        return ingredients_totaux
+
     def generer_liste_courses(self):
         """
         Génère automatiquement la liste de courses pour ce menu
         en ajustant les quantités selon le nombre de personnes
 
+        Nombre de requêtes constant : une requête pour toutes les lignes
+        d'ingrédients, une pour la liste, une insertion groupée des items.
+
         IMPORTANT: À la génération initiale, TOUS les ingrédients sont ajoutés
         sans déduction du stock. La déduction du stock se fait dans la phase
         "réviser" via la méthode verifier_stock() de ListeCourse.
         """
-        ingredients_totaux = {}
-
-        # Parcourir tous les jours et tous les repas
-        for jour in self.jours:
-            for repas_type in ['petit_dejeuner', 'dejeuner', 'gouter', 'diner']:
-                recette = getattr(jour, f'{repas_type}_recette', None)
-                if recette:
-                    # Calculer les ingrédients ajustés pour le nombre de personnes du menu
-                    ingredients_ajustes = recette.get_ingredients_for_portions(self.nb_personnes)
-
-                    for ingredient, quantite, unite in ingredients_ajustes:
-                        # Normaliser l'unité pour regrouper les quantités
-                        quantite_normalisee, unite_base = UnitConverter.normaliser(quantite, unite, ingredient)
-
-                        key = (ingredient.id, unite_base)
-                        if key in ingredients_totaux:
-                            ingredients_totaux[key]['quantite'] += quantite_normalisee
-                        else:
-                            ingredients_totaux[key] = {
-                                'ingredient': ingredient,
-                                'quantite': quantite_normalisee,
-                                'unite': unite_base
-                            }
-
-        # Parcourir les gâteaux
-        for menu_gateau in self.gateaux:
-            recette = menu_gateau.recette
-            if recette:
-                # Calculer les ingrédients ajustés pour le nombre de personnes du menu
-                ingredients_ajustes = recette.get_ingredients_for_portions(self.nb_personnes)
-
-                for ingredient, quantite, unite in ingredients_ajustes:
-                    # Normaliser l'unité pour regrouper les quantités
-                    quantite_normalisee, unite_base = UnitConverter.normaliser(quantite, unite, ingredient)
-
-                    key = (ingredient.id, unite_base)
-                    if key in ingredients_totaux:
-                        ingredients_totaux[key]['quantite'] += quantite_normalisee
-                    else:
-                        ingredients_totaux[key] = {
-                            'ingredient': ingredient,
-                            'quantite': quantite_normalisee,
-                            'unite': unite_base
-                        }
+        ingredients_totaux = self.calculer_ingredients_totaux()
 
         # Créer une nouvelle liste de courses
-        from datetime import datetime
         liste = ListeCourse(
             nom=f"Liste de courses - {self.nom}",
             menu_id=self.id,
@@ -599,16 +1099,19 @@ class Menu(db.Model):
 
         # Créer TOUS les items sans déduction du stock (brouillon)
         # La déduction se fera lors de la révision
-        for data in ingredients_totaux.values():
-            item = ListeCourseItem(
-                liste_id=liste.id,
-                nom_ingredient=data['ingredient'].nom,
-                quantite=data['quantite'],
-                unite=data['unite'],
-                rayon=data['ingredient'].categorie,
-                achete=False
-            )
-            db.session.add(item)
+        if ingredients_totaux:
+            db.session.execute(db.insert(ListeCourseItem), [
+                {
+                    'liste_id': liste.id,
+                    'ingredient_id': ingredient_id,
+                    'nom_ingredient': data['nom'],
+                    'quantite': data['quantite'],
+                    'unite': data['unite'],
+                    'rayon': data['categorie'],
+                    'achete': False
+                }
+                for (ingredient_id, _), data in ingredients_totaux.items()
+            ])
 
         return liste
 
@@ -674,82 +1177,339 @@ class ListeCourse(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
+    # Compteurs dénormalisés (maintenus par les événements de session, voir fin du module)
+    nb_items = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    nb_achetes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    # Version incrémentée à chaque modification de la liste ou d'un article
+    # (synchronisation hors ligne, ETag de la page)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
     # Relations
     ingredients = db.relationship('ListeCourseItem', backref='liste', lazy='dynamic', cascade='all, delete-orphan')
 
+    # Même collection en lecture seule, chargeable d'avance (profil de chargement)
+    items_charges = db.relationship('ListeCourseItem', viewonly=True, order_by='ListeCourseItem.id')
+
+    COMPTEURS = ['nb_items', 'nb_achetes']
+
+    # Opérations acceptées par appliquer_operations() (endpoint /courses/<id>/batch)
+    OPERATIONS_LOT = ('toggle', 'quantite', 'retirer')
+    TAILLE_MAX_LOT = 500
+
+    @classmethod
+    def with_items(cls):
+        """
+        Profil de chargement : items de la liste (avec leur ingrédient) et menu
+        d'origine, en une requête supplémentaire
+        """
+        return cls.query.options(
+            db.selectinload(cls.items_charges),
+            db.joinedload(cls.menu)
+        )
+
+    @classmethod
+    def revision(cls, liste_id):
+        """
+        Révision de la page détail, en une requête : version de la liste
+        (statut et articles) et du menu d'origine (son nom est affiché)
+
+        Returns:
+            tuple (composants de l'ETag, date de dernière modification),
+            None si la liste n'existe pas
+        """
+        ligne = db.session.execute(
+            db.select(cls.version, cls.updated_at, Menu.version)
+            .outerjoin(Menu, Menu.id == cls.menu_id)
+            .where(cls.id == liste_id)
+        ).first()
+        if ligne is None:
+            return None
+
+        version, updated_at, version_menu = ligne
+        return ('liste', liste_id, version, updated_at, version_menu), updated_at
+
+    @classmethod
+    def recalculer_compteurs(cls, connexion, ids=None):
+        """
+        Recalcule les compteurs depuis les items (une requête UPDATE)
+
+        Args:
+            connexion: Connexion SQLAlchemy
+            ids: IDs des listes à recalculer (None = toutes)
+        """
+        requete = db.update(cls).values(
+            nb_items=db.select(db.func.count(ListeCourseItem.id))
+                .where(ListeCourseItem.liste_id == cls.id).scalar_subquery(),
+            nb_achetes=db.select(db.func.count(ListeCourseItem.id))
+                .where(ListeCourseItem.liste_id == cls.id, ListeCourseItem.achete.is_(True))
+                .scalar_subquery()
+        )
+        if ids is not None:
+            requete = requete.where(cls.id.in_(ids))
+        connexion.execute(requete)
+
+    def items_par_rayon(self, ordre_rayons):
+        """
+        Articles de la liste groupés par rayon, en une requête (ingrédients joints)
+
+        Args:
+            ordre_rayons: Rayons dans l'ordre du parcours du magasin ; les autres
+                          suivent par ordre alphabétique, 'Autre' en dernier
+
+        Returns:
+            Liste de tuples (rayon, articles triés par nom)
+        """
+        items = ListeCourseItem.query.filter_by(liste_id=self.id)\
+            .order_by(db.func.lower(ListeCourseItem.nom_ingredient)).all()
+
+        rayons = {}
+        for item in items:
+            rayon = item.rayon or (item.ingredient.categorie if item.ingredient else None) or 'Autre'
+            rayons.setdefault(rayon, []).append(item)
+
+        position = {rayon: i for i, rayon in enumerate(ordre_rayons)}
+        return sorted(rayons.items(), key=lambda entree: (
+            position.get(entree[0], len(position)), entree[0] == 'Autre', entree[0].lower()
+        ))
+
+    def get_stock_snapshot(self, items=None):
+        """
+        Construit l'index du stock de l'auteur pour les ingrédients de la liste
+
+        Args:
+            items: Items de la liste déjà chargés (optionnel)
+
+        Returns:
+            StockSnapshot
+        """
+        if items is None:
+            items = self.ingredients.all()
+        return StockSnapshot(self.created_by, {item.ingredient_id for item in items if item.ingredient_id})
+
     def verifier_stock(self):
         """
         Vérifier le stock pour chaque ingrédient et calculer quantite_en_stock
         Cette méthode est appelée lors de la phase "réviser"
         Les items ne sont PAS supprimés automatiquement, l'utilisateur décide
         """
-        from app.models import Stock, Ingredient
+        items = self.ingredients.all()
+        snapshot = self.get_stock_snapshot(items)
 
-        for item in self.ingredients.all():
-            # Trouver l'ingrédient dans la base
-            ingredient = Ingredient.query.filter_by(nom=item.nom_ingredient).first()
-            if ingredient:
-                # Chercher le stock de l'utilisateur pour cet ingrédient
-                stock_item = Stock.query.filter_by(
-                    user_id=self.created_by,
-                    ingredient_id=ingredient.id
-                ).first()
-
-                if stock_item:
-                    # Normaliser le stock pour comparer avec la quantité nécessaire
-                    stock_normalise, stock_unite_base = UnitConverter.normaliser(
-                        stock_item.quantite, stock_item.unite, ingredient
-                    )
-
-                    # Normaliser la quantité nécessaire
-                    qte_necessaire_norm, qte_unite_base = UnitConverter.normaliser(
-                        item.quantite, item.unite, ingredient
-                    )
-
-                    # Si les unités correspondent, stocker le stock
-                    if stock_unite_base == qte_unite_base:
-                        item.quantite_en_stock = stock_normalise
-                    else:
-                        # Unités incompatibles
-                        item.quantite_en_stock = 0
-                else:
-                    # Pas de stock
-                    item.quantite_en_stock = 0
-            else:
+        for item in items:
+            ingredient = item.ingredient
+            stock_item = snapshot.get_stock(ingredient) if ingredient else None
+
+            if not stock_item:
+                # Ingrédient inconnu ou pas de stock
                 item.quantite_en_stock = 0
+                continue
+
+            # Normaliser le stock et la quantité nécessaire pour les comparer
+            stock_normalise, stock_unite_base = snapshot.get_stock_normalise(ingredient)
+            qte_necessaire_norm, qte_unite_base = UnitConverter.normaliser(
+                item.quantite, item.unite, ingredient
+            )
+
+            # Si les unités correspondent, stocker le stock (sinon unités incompatibles)
+            item.quantite_en_stock = stock_normalise if stock_unite_base == qte_unite_base else 0
 
     def retirer_items_en_stock(self):
         """
         Retirer tous les items dont le stock est suffisant
         Cette méthode est appelée manuellement par l'utilisateur
         """
-        from app.models import Ingredient
+        items = self.ingredients.all()
+        ids_a_supprimer = []
 
-        items_a_supprimer = []
-
-        for item in self.ingredients.all():
+        for item in items:
             # Si quantite_en_stock >= quantite nécessaire, marquer pour suppression
             if item.quantite_en_stock is not None and item.quantite_en_stock > 0:
-                ingredient = Ingredient.query.filter_by(nom=item.nom_ingredient).first()
+                ingredient = item.ingredient
 
                 if ingredient:
                     # Normaliser pour comparer
-                    qte_necessaire_norm, qte_unite_base = UnitConverter.normaliser(
-                        item.quantite, item.unite, ingredient
-                    )
-                    stock_normalise, stock_unite_base = UnitConverter.normaliser(
-                        item.quantite_en_stock, item.unite, ingredient
-                    )
+                    (qte_necessaire_norm, qte_unite_base), (stock_normalise, stock_unite_base) = \
+                        UnitConverter.normaliser_many([
+                            (item.quantite, item.unite, ingredient),
+                            (item.quantite_en_stock, item.unite, ingredient)
+                        ])
 
                     # Si stock suffisant, marquer pour suppression
                     if stock_unite_base == qte_unite_base and stock_normalise >= qte_necessaire_norm:
-                        items_a_supprimer.append(item)
+                        ids_a_supprimer.append(item.id)
+
+        # Supprimer les items en une seule requête
+        if ids_a_supprimer:
+            ListeCourseItem.query.filter(ListeCourseItem.id.in_(ids_a_supprimer))\
+                .delete(synchronize_session='fetch')
+
+        return len(ids_a_supprimer)
+
+    def appliquer_operations(self, operations):
+        """
+        Applique dans l'ordre un lot d'opérations sur les articles de la liste
+        Une requête pour charger les articles concernés ; le commit (unique)
+        est fait par l'appelant
+
+        Args:
+            operations: Liste de dicts {'op': 'toggle', 'item_id': int, 'achete': bool},
+                        {'op': 'quantite', 'item_id': int, 'quantite_achetee': float}
+                        ou {'op': 'retirer', 'item_id': int}
+
+        Returns:
+            dict {'appliquees': int, 'ignorees': [item_id]} (articles absents de la liste,
+            par exemple déjà retirés depuis un autre appareil)
+
+        Raises:
+            ValueError: Lot invalide (rien n'est appliqué)
+        """
+        if len(operations) > self.TAILLE_MAX_LOT:
+            raise ValueError(f'Lot trop volumineux (maximum {self.TAILLE_MAX_LOT} opérations)')
+
+        # Tout valider avant de modifier quoi que ce soit
+        valides = []
+        for position, operation in enumerate(operations):
+            type_op = operation.get('op') if isinstance(operation, dict) else None
+            item_id = operation.get('item_id') if isinstance(operation, dict) else None
+            if type_op not in self.OPERATIONS_LOT or not isinstance(item_id, int) or isinstance(item_id, bool):
+                raise ValueError(f'Opération {position} invalide')
+
+            valeur = None
+            if type_op == 'toggle':
+                valeur = operation.get('achete')
+                if not isinstance(valeur, bool):
+                    raise ValueError(f'Opération {position} : achete doit être un booléen')
+            elif type_op == 'quantite':
+                try:
+                    valeur = float(operation.get('quantite_achetee'))
+                except (TypeError, ValueError):
+                    raise ValueError(f'Opération {position} : quantité invalide')
+                if not (math.isfinite(valeur) and valeur >= 0):
+                    raise ValueError(f'Opération {position} : quantité invalide')
+            elif self.statut not in ['brouillon', 'validee']:
+                raise ValueError('Liste en cours ou terminée : les articles ne peuvent plus être retirés')
+            valides.append((type_op, item_id, valeur))
+
+        ids = {item_id for _, item_id, _ in valides}
+        items = {
+            item.id: item for item in ListeCourseItem.query.filter(
+                ListeCourseItem.liste_id == self.id, ListeCourseItem.id.in_(ids)
+            )
+        } if ids else {}
+
+        appliquees = 0
+        ignorees = set()
+        for type_op, item_id, valeur in valides:
+            item = items.get(item_id)
+            if item is None:
+                ignorees.add(item_id)
+                continue
+            if type_op == 'toggle':
+                item.achete = valeur
+            elif type_op == 'quantite':
+                item.quantite_achetee = valeur
+            else:
+                db.session.delete(item)
+                del items[item_id]
+            appliquees += 1
+
+        return {'appliquees': appliquees, 'ignorees': sorted(ignorees)}
+
+    def appliquer_changements_hors_ligne(self, changements):
+        """
+        Applique les changements enregistrés hors ligne pendant les courses
+        Le dernier qui écrit gagne, article par article : un changement plus
+        ancien que la dernière modification connue de l'article est ignoré
+
+        Args:
+            changements: Liste de dicts {'item_id': int, 'modifie_le': int (ms),
+                         'achete': bool (optionnel), 'quantite_achetee': float (optionnel)}
+
+        Returns:
+            int: Nombre de changements appliqués
+
+        Raises:
+            ValueError: Changement invalide (rien n'est appliqué)
+        """
+        if len(changements) > self.TAILLE_MAX_LOT:
+            raise ValueError(f'Trop de changements (maximum {self.TAILLE_MAX_LOT})')
+
+        valides = []
+        for position, changement in enumerate(changements):
+            if not isinstance(changement, dict):
+                raise ValueError(f'Changement {position} invalide')
+            item_id = changement.get('item_id')
+            modifie_le = changement.get('modifie_le')
+            if not isinstance(item_id, int) or isinstance(item_id, bool) \
+                    or not isinstance(modifie_le, int) or isinstance(modifie_le, bool):
+                raise ValueError(f'Changement {position} invalide')
+
+            valeurs = {}
+            if 'achete' in changement:
+                if not isinstance(changement['achete'], bool):
+                    raise ValueError(f'Changement {position} : achete doit être un booléen')
+                valeurs['achete'] = changement['achete']
+            if 'quantite_achetee' in changement:
+                try:
+                    valeurs['quantite_achetee'] = float(changement['quantite_achetee'])
+                except (TypeError, ValueError):
+                    raise ValueError(f'Changement {position} : quantité invalide')
+                if not (math.isfinite(valeurs['quantite_achetee']) and valeurs['quantite_achetee'] >= 0):
+                    raise ValueError(f'Changement {position} : quantité invalide')
+            valides.append((item_id, modifie_le, valeurs))
+
+        ids = {item_id for item_id, _, _ in valides}
+        items = {
+            item.id: item for item in ListeCourseItem.query.filter(
+                ListeCourseItem.liste_id == self.id, ListeCourseItem.id.in_(ids)
+            )
+        } if ids else {}
+
+        appliques = 0
+        for item_id, modifie_le, valeurs in sorted(valides, key=lambda v: v[1]):
+            item = items.get(item_id)
+            if item is None or (item.modifie_le is not None and modifie_le <= item.modifie_le):
+                continue
+            for attribut, valeur in valeurs.items():
+                setattr(item, attribut, valeur)
+            item.modifie_le = modifie_le
+            appliques += 1
+
+        return appliques
 
-        # Supprimer les items
-        for item in items_a_supprimer:
-            db.session.delete(item)
+    def etat_depuis(self, version):
+        """
+        État de la liste pour la synchronisation : articles modifiés depuis
+        `version` et IDs de tous les articles (pour retirer les supprimés)
+
+        Returns:
+            dict sérialisable en JSON
+        """
+        lignes = db.session.execute(
+            db.select(
+                ListeCourseItem.id, ListeCourseItem.version, ListeCourseItem.achete,
+                ListeCourseItem.quantite_achetee, ListeCourseItem.modifie_le
+            ).where(ListeCourseItem.liste_id == self.id).order_by(ListeCourseItem.id)
+        ).all()
 
-        return len(items_a_supprimer)
+        return {
+            'version': self.version,
+            'statut': self.statut,
+            'nb_items': self.nb_items,
+            'nb_achetes': self.nb_achetes,
+            'ids': [ligne.id for ligne in lignes],
+            'items': [
+                {
+                    'id': ligne.id,
+                    'achete': bool(ligne.achete),
+                    'quantite_achetee': ligne.quantite_achetee,
+                    'modifie_le': ligne.modifie_le,
+                }
+                for ligne in lignes if ligne.version > version
+            ],
+        }
 
     def valider(self):
         """Marquer la liste comme validée (prête pour les courses)"""
@@ -765,34 +1525,18 @@ class ListeCourse(db.Model):
 
     def confirmer(self):
         """Confirmer l'achat et mettre à jour le stock avec les quantités ACHETÉES"""
-        from app.models import Stock
-        for item in self.ingredients.all():
-            if item.achete:
-                # Chercher si l'ingrédient existe dans le stock
-                ingredient = Ingredient.query.filter_by(nom=item.nom_ingredient).first()
-                if ingredient:
-                    stock_item = Stock.query.filter_by(
-                        user_id=self.created_by,
-                        ingredient_id=ingredient.id
-                    ).first()
-
-                    # Utiliser quantite_achetee si disponible, sinon quantite
-                    quantite_a_ajouter = item.quantite_achetee if item.quantite_achetee is not None else item.quantite
-
-                    if stock_item:
-                        # Ajouter à la quantité existante
-                        stock_item.quantite += quantite_a_ajouter
-                        stock_item.unite = item.unite
-                    else:
-                        # Créer un nouveau stock
-                        stock_item = Stock(
-                            user_id=self.created_by,
-                            ingredient_id=ingredient.id,
-                            quantite=quantite_a_ajouter,
-                            unite=item.unite
-                        )
-                        db.session.add(stock_item)
+        items = [item for item in self.ingredients.all() if item.achete]
+        snapshot = self.get_stock_snapshot(items)
 
+        for item in items:
+            # Chercher si l'ingrédient existe dans le stock
+            ingredient = item.ingredient
+            if ingredient:
+                # Utiliser quantite_achetee si disponible, sinon quantite
+                quantite_a_ajouter = item.quantite_achetee if item.quantite_achetee is not None else item.quantite
+                snapshot.ajouter(ingredient, quantite_a_ajouter, item.unite)
+
+        snapshot.enregistrer()
         self.statut = 'terminee'
 
     def __repr__(self):
@@ -805,6 +1549,7 @@ class ListeCourseItem(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     liste_id = db.Column(db.Integer, db.ForeignKey('liste_courses.id'), nullable=False)
+    ingredient_id = db.Column(db.Integer, db.ForeignKey('ingredients.id', ondelete='SET NULL'), nullable=True, index=True)
     nom_ingredient = db.Column(db.String(100), nullable=False)
     quantite = db.Column(db.Float, nullable=False)  # Quantité nécessaire (de la recette)
     quantite_en_stock = db.Column(db.Float, nullable=True)  # Quantité présumée en stock (calculée automatiquement)
@@ -813,6 +1558,19 @@ class ListeCourseItem(db.Model):
     rayon = db.Column(db.String(50))  # Pour organiser la liste par rayon
     achete = db.Column(db.Boolean, default=False)
 
+    # Synchronisation hors ligne : version de la liste lors de la dernière modification
+    # et horodatage (ms) de cette modification, pour le « dernier qui écrit gagne »
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    modifie_le = db.Column(db.BigInteger, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_liste_course_items_liste_version', 'liste_id', 'version'),
+    )
+
+    # Relations (ingrédient chargé avec l'item pour éviter une requête par ligne)
+    ingredient = db.relationship('Ingredient', lazy='joined',
+                                 backref=db.backref('liste_course_items', lazy='dynamic'))
+
     def get_quantite_arrondie(self):
         """Retourne la quantité arrondie à l'unité supérieure pour l'affichage en magasin"""
         import math
@@ -837,9 +1595,8 @@ class ListeCourseItem(db.Model):
 
     def get_lieu_rangement(self):
         """Retourne le lieu de rangement de l'ingrédient"""
-        ingredient = Ingredient.query.filter_by(nom=self.nom_ingredient).first()
-        if ingredient and ingredient.lieu_rangement:
-            return ingredient.lieu_rangement
+        if self.ingredient and self.ingredient.lieu_rangement:
+            return self.ingredient.lieu_rangement
         return "Autre"
 
     def get_affichage_quantite(self):
@@ -852,7 +1609,7 @@ class ListeCourseItem(db.Model):
             str: Quantité formatée (ex: "3 pièces (~450g)" ou "250 g")
         """
         import math
-        ingredient = Ingredient.query.filter_by(nom=self.nom_ingredient).first()
+        ingredient = self.ingredient
 
         if ingredient:
             # Convertir pour affichage (g → pièce si applicable)
@@ -909,6 +1666,16 @@ class Stock(db.Model):
         'Autre': 50
     }
 
+    @classmethod
+    def for_user_with_ingredients(cls, user_id):
+        """
+        Profil de chargement : stock d'un utilisateur avec ses ingrédients,
+        en une seule requête (jointure réutilisable pour trier par ingrédient)
+        """
+        return cls.query.filter_by(user_id=user_id)\
+            .join(Ingredient, Ingredient.id == cls.ingredient_id)\
+            .options(db.contains_eager(cls.ingredient))
+
     def get_seuil_stock(self):
         """
         Retourne le seuil de stock à utiliser pour cet item
@@ -929,6 +1696,75 @@ class Stock(db.Model):
         return f'<Stock {self.quantite} {self.unite}>'
 
 
+class StockSnapshot:
+    """
+    Index en mémoire du stock d'un utilisateur pour un ensemble d'ingrédients
+    Construit en une seule requête : ingredient_id -> stock
+    """
+
+    def __init__(self, user_id, ingredient_ids):
+        """
+        Args:
+            user_id: ID de l'utilisateur propriétaire du stock
+            ingredient_ids: IDs des ingrédients à indexer
+        """
+        self.user_id = user_id
+        self.stocks = {}  # ingredient_id -> Stock
+        self._nouveaux = []
+
+        ids = list(ingredient_ids)
+        if not ids:
+            return
+
+        stocks = Stock.query.filter(Stock.user_id == user_id, Stock.ingredient_id.in_(ids))\
+            .order_by(Stock.id)\
+            .all()
+
+        for stock in stocks:
+            self.stocks.setdefault(stock.ingredient_id, stock)
+
+    def get_stock(self, ingredient):
+        """Retourne le stock de l'utilisateur pour cet ingrédient (ou None)"""
+        return self.stocks.get(ingredient.id)
+
+    def get_stock_normalise(self, ingredient):
+        """
+        Retourne le stock normalisé dans son unité de base
+
+        Returns:
+            tuple (quantite_normalisee, unite_base) ou (0, None) si pas de stock
+        """
+        stock = self.get_stock(ingredient)
+        if not stock:
+            return 0, None
+        return UnitConverter.normaliser(stock.quantite, stock.unite, ingredient)
+
+    def ajouter(self, ingredient, quantite, unite):
+        """Ajoute une quantité au stock (crée l'entrée si nécessaire)"""
+        stock = self.get_stock(ingredient)
+        if stock:
+            # Ajouter à la quantité existante
+            stock.quantite += quantite
+            stock.unite = unite
+        else:
+            # Créer un nouveau stock
+            stock = Stock(
+                user_id=self.user_id,
+                ingredient_id=ingredient.id,
+                quantite=quantite,
+                unite=unite
+            )
+            self.stocks[ingredient.id] = stock
+            self._nouveaux.append(stock)
+        return stock
+
+    def enregistrer(self):
+        """Ajoute les nouvelles entrées de stock à la session en un seul lot"""
+        if self._nouveaux:
+            db.session.add_all(self._nouveaux)
+            self._nouveaux = []
+
+
 class Inventaire(db.Model):
     """Modèle pour l'historique des inventaires"""
     __tablename__ = 'inventaires'
@@ -942,10 +1778,42 @@ class Inventaire(db.Model):
     # Relations
     items = db.relationship('InventaireItem', backref='inventaire', lazy='dynamic', cascade='all, delete-orphan')
 
+    # Même collection en lecture seule, chargeable d'avance (profil de chargement)
+    items_charges = db.relationship('InventaireItem', viewonly=True, order_by='InventaireItem.id')
+
+    @classmethod
+    def with_items(cls):
+        """
+        Profil de chargement : items de l'inventaire avec leur ingrédient,
+        en une requête supplémentaire quel que soit le nombre d'inventaires
+        """
+        return cls.query.options(
+            db.selectinload(cls.items_charges).joinedload(InventaireItem.ingredient)
+        )
+
+    @classmethod
+    def with_item_counts(cls):
+        """
+        Profil de chargement des listes : tuples (inventaire, nombre d'items,
+        écarts négatifs, écarts positifs), comptés en SQL dans la même requête
+        """
+        comptes = db.select(
+            InventaireItem.inventaire_id,
+            db.func.count(InventaireItem.id).label('nb_items'),
+            db.func.count(db.case((InventaireItem.ecart < 0, 1))).label('negatifs'),
+            db.func.count(db.case((InventaireItem.ecart > 0, 1))).label('positifs')
+        ).group_by(InventaireItem.inventaire_id).subquery()
+        return db.session.query(
+            cls,
+            db.func.coalesce(comptes.c.nb_items, 0),
+            db.func.coalesce(comptes.c.negatifs, 0),
+            db.func.coalesce(comptes.c.positifs, 0)
+        ).outerjoin(comptes, comptes.c.inventaire_id == cls.id)
+
     def get_total_ecarts(self):
         """Retourne le nombre total d'écarts (positifs et négatifs)"""
-        ecarts_positifs = sum(1 for item in self.items if item.ecart > 0)
-        ecarts_negatifs = sum(1 for item in self.items if item.ecart < 0)
+        ecarts_positifs = sum(1 for item in self.items_charges if item.ecart > 0)
+        ecarts_negatifs = sum(1 for item in self.items_charges if item.ecart < 0)
         return {
             'positifs': ecarts_positifs,
             'negatifs': ecarts_negatifs,
@@ -954,11 +1822,11 @@ class Inventaire(db.Model):
 
     def get_ingredients_manquants(self):
         """Retourne la liste des ingrédients avec écarts négatifs"""
-        return [item for item in self.items if item.ecart < 0]
+        return [item for item in self.items_charges if item.ecart < 0]
 
     def get_ingredients_surplus(self):
         """Retourne la liste des ingrédients avec écarts positifs"""
-        return [item for item in self.items if item.ecart > 0]
+        return [item for item in self.items_charges if item.ecart > 0]
 
     def __repr__(self):
         return f'<Inventaire {self.date_inventaire.strftime("%Y-%m-%d %H:%M")}>'
@@ -1111,3 +1979,355 @@ class IngredientConversionUnite(db.Model):
         if self.facteur_conversion == 0:
             return 0
         return quantite / self.facteur_conversion
+
+
+class Tache(db.Model):
+    """
+    Tâche de fond (génération de liste, vérification du stock, PDF...)
+    enregistrée par les requêtes et exécutée par le worker (flask taches-worker)
+    """
+    __tablename__ = 'taches'
+
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(50), nullable=False)  # Nom du gestionnaire (voir app/taches.py)
+    parametres = db.Column(db.JSON, nullable=False, default=dict)
+    statut = db.Column(db.String(20), nullable=False, default='en_attente')  # en_attente, en_cours, terminee, echec
+    tentatives = db.Column(db.Integer, nullable=False, default=0)
+    max_tentatives = db.Column(db.Integer, nullable=False, default=3)
+    resultat = db.Column(db.JSON, nullable=True)
+    erreur = db.Column(db.Text, nullable=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True, index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    executer_apres = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Report après un échec
+    demarree_le = db.Column(db.DateTime, nullable=True)
+    terminee_le = db.Column(db.DateTime, nullable=True)
+    jeton = db.Column(db.String(32), nullable=True)  # Réservation par un worker
+
+    __table_args__ = (
+        db.Index('ix_taches_statut_executer_apres', 'statut', 'executer_apres'),
+    )
+
+    STATUTS_ACTIFS = ('en_attente', 'en_cours')
+
+    @property
+    def terminee(self):
+        """True si la tâche ne sera plus exécutée (succès ou échec définitif)"""
+        return self.statut not in self.STATUTS_ACTIFS
+
+    @classmethod
+    def reserver(cls, jeton):
+        """
+        Réserve la plus ancienne tâche exécutable pour un worker
+
+        Un seul UPDATE : deux workers ne peuvent pas réserver la même tâche.
+
+        Args:
+            jeton: Identifiant unique de cette réservation
+
+        Returns:
+            Tache réservée, None si la file est vide
+        """
+        maintenant = datetime.utcnow()
+        prochaine = db.select(cls.id).where(
+            cls.statut == 'en_attente', cls.executer_apres <= maintenant
+        ).order_by(cls.executer_apres, cls.id).limit(1).scalar_subquery()
+
+        resultat = db.session.execute(
+            db.update(cls).where(cls.id == prochaine, cls.statut == 'en_attente').values(
+                statut='en_cours', jeton=jeton, demarree_le=maintenant, tentatives=cls.tentatives + 1
+            ).execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if not resultat.rowcount:
+            return None
+        return cls.query.filter_by(jeton=jeton).first()
+
+    @classmethod
+    def finir(cls, tache_id, jeton, **valeurs):
+        """
+        Enregistre l'issue d'une exécution si la réservation est toujours
+        valable (tâche reprise entre-temps par un autre worker sinon), dans
+        la transaction en cours : à valider par l'appelant
+
+        Returns:
+            True si la tâche a été mise à jour
+        """
+        resultat = db.session.execute(
+            db.update(cls).where(cls.id == tache_id, cls.jeton == jeton)
+            .values(jeton=None, **valeurs)
+            .execution_options(synchronize_session=False)
+        )
+        return bool(resultat.rowcount)
+
+    @classmethod
+    def reprendre_abandonnees(cls, delai):
+        """
+        Remet en attente les tâches en cours depuis plus de `delai` (worker arrêté
+        brutalement), ou les passe en échec si elles ont épuisé leurs tentatives
+
+        Returns:
+            Nombre de tâches reprises
+        """
+        limite = datetime.utcnow() - delai
+        abandonnees = db.and_(cls.statut == 'en_cours', cls.demarree_le < limite)
+        db.session.execute(
+            db.update(cls).where(abandonnees, cls.tentatives >= cls.max_tentatives)
+            .values(statut='echec', erreur='Worker interrompu', terminee_le=datetime.utcnow(), jeton=None)
+            .execution_options(synchronize_session=False)
+        )
+        reprises = db.session.execute(
+            db.update(cls).where(abandonnees)
+            .values(statut='en_attente', jeton=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return reprises
+
+    @classmethod
+    def purger(cls, anciennete):
+        """Supprime les tâches terminées depuis plus de `anciennete` (timedelta)"""
+        supprimees = db.session.execute(
+            db.delete(cls).where(
+                cls.statut.notin_(cls.STATUTS_ACTIFS),
+                cls.terminee_le < datetime.utcnow() - anciennete
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        return supprimees
+
+    def to_dict(self):
+        """État de la tâche pour les pages d'attente"""
+        return {
+            'id': self.id,
+            'type': self.type,
+            'statut': self.statut,
+            'tentatives': self.tentatives,
+            'max_tentatives': self.max_tentatives,
+            'erreur': self.erreur if self.statut == 'echec' else None,
+            'created_at': self.created_at.isoformat(),
+            'terminee_le': self.terminee_le.isoformat() if self.terminee_le else None
+        }
+
+    def __repr__(self):
+        return f'<Tache {self.id} {self.type} {self.statut}>'
+
+
+# Compteurs dénormalisés : modèle enfant -> (clé étrangère, modèle parent, attributs suivis)
+# Une modification des attributs suivis d'un enfant déclenche le recalcul du parent
+COMPTEURS_ENFANTS = {
+    RecetteIngredient: ('recette_id', Recette, ()),
+    Instruction: ('recette_id', Recette, ()),
+    ListeCourseItem: ('liste_id', ListeCourse, ('achete',)),
+}
+
+
+def _compteurs_a_recalculer(session):
+    """Ensembles des IDs parents à recalculer pendant le flush en cours"""
+    return session.info.setdefault('compteurs_a_recalculer', {Recette: set(), ListeCourse: set()})
+
+
+def _expirer_compteurs(session, parents):
+    """Expire les compteurs des objets parents chargés (rechargés au prochain accès)"""
+    for modele, ids in parents.items():
+        for parent_id in ids:
+            objet = session.identity_map.get(db.inspect(modele).identity_key_from_primary_key([parent_id]))
+            if objet is not None:
+                session.expire(objet, modele.COMPTEURS)
+
+
+# Révisions : modèle enfant -> (clé étrangère, relation vers le parent, modèle parent)
+# Toute création, modification ou suppression d'un enfant incrémente la version du parent
+VERSIONS_ENFANTS = {
+    RecetteIngredient: ('recette_id', 'recette', Recette),
+    Instruction: ('recette_id', 'recette', Recette),
+    RecetteCommentaire: ('recette_id', 'recette', Recette),
+    MenuJour: ('menu_id', 'menu', Menu),
+    MenuGateau: ('menu_id', 'menu', Menu),
+    ListeCourseItem: ('liste_id', 'liste', ListeCourse),
+}
+MODELES_VERSIONNES = (Recette, Menu, ListeCourse)
+
+# Un ingrédient modifié (nom, rayon...) change les pages qui l'affichent
+VERSIONS_INGREDIENTS = {
+    Recette: RecetteIngredient.recette_id,
+    ListeCourse: ListeCourseItem.liste_id,
+}
+
+
+def _id_parent(objet, attribut, relation):
+    """ID du parent d'un enfant : clé étrangère, ou parent rattaché par la relation (avant le flush)"""
+    parent_id = getattr(objet, attribut)
+    if parent_id is None:
+        parent_id = getattr(db.inspect(objet).dict.get(relation), 'id', None)
+    return parent_id
+
+
+def _incrementer_versions(connexion, modele, ids):
+    """Incrémente la version et date la modification des parents (une requête UPDATE)"""
+    table = modele.__table__
+    connexion.execute(
+        db.update(table)
+        .where(table.c.id.in_(ids))
+        .values(version=table.c.version + 1, updated_at=datetime.utcnow())
+    )
+
+
+def _expirer_versions(session, parents):
+    """Expire la version des objets parents chargés (rechargée au prochain accès)"""
+    for modele, ids in parents.items():
+        for parent_id in ids:
+            objet = session.identity_map.get(db.inspect(modele).identity_key_from_primary_key([parent_id]))
+            if objet is not None:
+                session.expire(objet, ['version', 'updated_at'])
+
+
+@event.listens_for(Session, 'before_flush')
+def _versions_avant_flush(session, contexte, instances):
+    """
+    Incrémente la version des recettes, menus et listes de courses modifiés
+    directement ou par un de leurs enfants (ETag des pages, synchronisation
+    hors ligne), et date la modification des articles de liste
+    """
+    parents = {modele: set() for modele in MODELES_VERSIONNES}
+    items = []
+    ingredients = set()
+
+    for objet in chain(session.new, session.dirty):
+        if objet not in session.new and not session.is_modified(objet, include_collections=False):
+            continue
+        if type(objet) in VERSIONS_ENFANTS:
+            attribut, relation, modele = VERSIONS_ENFANTS[type(objet)]
+            parents[modele].add(_id_parent(objet, attribut, relation))
+            # Enfant déplacé : l'ancien parent change aussi
+            parents[modele].update(db.inspect(objet).attrs[attribut].history.deleted or ())
+            if isinstance(objet, ListeCourseItem):
+                items.append(objet)
+        elif isinstance(objet, MODELES_VERSIONNES) and objet not in session.new:
+            parents[type(objet)].add(objet.id)
+        elif isinstance(objet, Ingredient) and objet not in session.new:
+            ingredients.add(objet.id)
+
+    for objet in session.deleted:
+        if type(objet) in VERSIONS_ENFANTS:
+            attribut, relation, modele = VERSIONS_ENFANTS[type(objet)]
+            parents[modele].add(_id_parent(objet, attribut, relation))
+
+    if ingredients:
+        for modele, colonne in VERSIONS_INGREDIENTS.items():
+            parents[modele].update(session.execute(
+                db.select(colonne).distinct().where(colonne.table.c.ingredient_id.in_(ingredients))
+            ).scalars())
+
+    for ids in parents.values():
+        ids.discard(None)
+    if not any(parents.values()):
+        return
+
+    connexion = session.connection()
+    for modele, ids in parents.items():
+        if ids:
+            _incrementer_versions(connexion, modele, ids)
+
+    if items:
+        versions = dict(connexion.execute(
+            db.select(ListeCourse.__table__.c.id, ListeCourse.__table__.c.version)
+            .where(ListeCourse.__table__.c.id.in_(parents[ListeCourse]))
+        ).all())
+        maintenant = int(time.time() * 1000)
+        for objet in items:
+            objet.version = versions.get(_id_parent(objet, 'liste_id', 'liste'), 0)
+            if not db.inspect(objet).attrs.modifie_le.history.has_changes():
+                objet.modifie_le = maintenant
+
+    _expirer_versions(session, parents)
+
+
+@event.listens_for(Session, 'before_flush')
+def _compteurs_avant_flush(session, contexte, instances):
+    """Objets supprimés : lire les clés étrangères tant que les lignes existent"""
+    parents = _compteurs_a_recalculer(session)
+    for objet in session.deleted:
+        if type(objet) in COMPTEURS_ENFANTS:
+            attribut, modele, _ = COMPTEURS_ENFANTS[type(objet)]
+            parents[modele].add(getattr(objet, attribut))
+        elif isinstance(objet, User):
+            # Ses recettes sauvegardées perdent une sauvegarde
+            parents[Recette].update(session.execute(
+                db.select(recettes_favorites.c.recette_id)
+                .where(recettes_favorites.c.user_id == objet.id)
+            ).scalars())
+
+
+@event.listens_for(Session, 'after_flush')
+def _compteurs_apres_flush(session, contexte):
+    """Recalcule les compteurs des parents touchés, dans la même transaction"""
+    parents = _compteurs_a_recalculer(session)
+
+    for objet in chain(session.new, session.dirty):
+        etat = db.inspect(objet)
+        if type(objet) in COMPTEURS_ENFANTS:
+            attribut, modele, suivis = COMPTEURS_ENFANTS[type(objet)]
+            if objet in session.new or any(etat.attrs[a].history.has_changes() for a in (attribut,) + suivis):
+                parents[modele].add(getattr(objet, attribut))
+                parents[modele].update(etat.attrs[attribut].history.deleted or ())
+        elif isinstance(objet, User):
+            historique = etat.attrs.recettes_sauvegardees.history
+            parents[Recette].update(r.id for r in chain(historique.added, historique.deleted))
+        elif isinstance(objet, Recette):
+            historique = etat.attrs.utilisateurs_sauvegardes.history
+            if historique.has_changes():
+                parents[Recette].add(objet.id)
+
+    connexion = session.connection()
+    for modele, ids in parents.items():
+        ids.discard(None)
+        if ids:
+            modele.recalculer_compteurs(connexion, ids)
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _compteurs_apres_flush_postexec(session, contexte):
+    """Les compteurs ont été modifiés en SQL : expirer les valeurs en mémoire"""
+    parents = session.info.pop('compteurs_a_recalculer', None)
+    if parents:
+        _expirer_compteurs(session, parents)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _operations_en_masse(etat):
+    """
+    INSERT/UPDATE/DELETE en masse (session.execute(db.insert(...)), query.delete())
+    sur un modèle enfant : ils contournent le flush, recalculer les compteurs
+    et incrémenter la version des parents ici
+    """
+    if not (etat.is_insert or etat.is_update or etat.is_delete):
+        return None
+    mapper = etat.bind_mapper
+    if mapper is None or (mapper.class_ not in COMPTEURS_ENFANTS and mapper.class_ not in VERSIONS_ENFANTS):
+        return None
+
+    attribut = (COMPTEURS_ENFANTS.get(mapper.class_) or VERSIONS_ENFANTS[mapper.class_])[0]
+    colonne = getattr(mapper.class_, attribut)
+
+    if etat.is_insert:
+        lignes = etat.parameters if isinstance(etat.parameters, list) else [etat.parameters or {}]
+        ids = {ligne.get(attribut) for ligne in lignes}
+    else:
+        requete = db.select(colonne).distinct()
+        if etat.statement.whereclause is not None:
+            requete = requete.where(etat.statement.whereclause)
+        ids = set(etat.session.execute(requete).scalars())
+
+    resultat = etat.invoke_statement()
+
+    ids.discard(None)
+    if ids and mapper.class_ in COMPTEURS_ENFANTS:
+        modele = COMPTEURS_ENFANTS[mapper.class_][1]
+        modele.recalculer_compteurs(etat.session.connection(), ids)
+        _expirer_compteurs(etat.session, {modele: ids})
+    if ids and mapper.class_ in VERSIONS_ENFANTS:
+        modele = VERSIONS_ENFANTS[mapper.class_][2]
+        _incrementer_versions(etat.session.connection(), modele, ids)
+        _expirer_versions(etat.session, {modele: ids})
+    return resultat
+
@@ -0,0 +1,251 @@
+"""
+Cache disque des PDF (PDF_OUTPUT_DIR) et pré-rendu en arrière-plan
+
+Un PDF n'est mis en page qu'une fois par révision : les téléchargements
+suivants sont servis directement depuis le fichier. Après la modification
+d'une recette, une tâche de fond pré-rend son PDF (portions par défaut)
+dans le worker de tâches, hors des workers Gunicorn.
+
+Les noms de fichiers portent une signature HMAC de la clé : le dossier est
+sous static/ et le PDF d'une recette privée ne doit pas se deviner.
+"""
+import hashlib
+import hmac
+import os
+import tempfile
+from itertools import chain
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Menu, Recette, UnitConverter, VERSIONS_ENFANTS
+from app.pdf_generator import generer_pdf_courses, generer_pdf_menu, generer_pdf_recette
+from app.taches import TacheImpossible, enfiler_hors_session, gestionnaire
+
+
+_app = None
+
+# Recettes chargées par requête pour le livre de recettes d'un menu
+TAILLE_LOT_RECETTES = 7
+
+
+def _dossier():
+    dossier = os.path.join(str(current_app.config['PDF_OUTPUT_DIR']), 'cache')
+    os.makedirs(dossier, exist_ok=True)
+    return dossier
+
+
+def chemin(prefixe, version, cle):
+    """
+    Chemin du fichier en cache
+
+    Args:
+        prefixe: Document concerné (ex: "recette-12"), commun à toutes ses versions
+        version: Révision du document
+        cle: Tuple décrivant exactement le rendu (révision, portions...)
+    """
+    signature = hmac.new(
+        current_app.config['SECRET_KEY'].encode('utf-8'), repr(cle).encode('utf-8'), hashlib.sha256
+    ).hexdigest()[:24]
+    return os.path.join(_dossier(), f'{prefixe}-{version}-{signature}.pdf')
+
+
+def obtenir(prefixe, version, cle, generer):
+    """
+    Chemin du PDF, écrit par `generer(sortie)` s'il n'est pas encore en cache
+    (None si absent et `generer` vaut None)
+    Les fichiers des versions précédentes du document sont supprimés.
+    """
+    fichier = chemin(prefixe, version, cle)
+    if os.path.exists(fichier):
+        return fichier
+    if generer is None:
+        return None
+
+    # Écriture atomique : une requête concurrente ne sert jamais un fichier partiel
+    descripteur, temporaire = tempfile.mkstemp(dir=os.path.dirname(fichier), suffix='.tmp')
+    try:
+        with os.fdopen(descripteur, 'wb') as sortie:
+            generer(sortie)
+        os.replace(temporaire, fichier)
+    except BaseException:
+        try:
+            os.remove(temporaire)
+        except OSError:
+            pass
+        raise
+
+    purger(prefixe, garder=version)
+    return fichier
+
+
+def purger(prefixe, garder=None):
+    """Supprime les PDF en cache d'un document, sauf ceux de la version `garder`"""
+    conserve = f'{prefixe}-{garder}-'
+    for entree in os.scandir(_dossier()):
+        if entree.name.startswith(f'{prefixe}-') and entree.name.endswith('.pdf') \
+                and not entree.name.startswith(conserve):
+            try:
+                os.remove(entree.path)
+            except OSError:
+                pass
+
+
+def pdf_recette(recette, portions=None):
+    """
+    Chemin du PDF d'une recette pour un nombre de portions (None = portions de base)
+
+    La mise en page n'a lieu que si cette révision n'est pas encore en cache ;
+    les lignes d'ingrédients et les instructions ne sont chargées que dans ce cas.
+    """
+    def generer(sortie):
+        complete = Recette.with_details().filter(Recette.id == recette.id).one()
+        generer_pdf_recette(complete, portions, sortie)
+
+    return obtenir(
+        f'recette-{recette.id}', recette.version,
+        ('recette', recette.id, recette.version, recette.updated_at, portions),
+        generer
+    )
+
+
+def _recettes_par_lots(recette_ids):
+    """
+    Recettes avec leurs détails, dans l'ordre des IDs, chargées par lots
+    de TAILLE_LOT_RECETTES : les détails d'une recette sont oubliés une
+    fois sa fiche mise en page
+    """
+    for debut in range(0, len(recette_ids), TAILLE_LOT_RECETTES):
+        lot = recette_ids[debut:debut + TAILLE_LOT_RECETTES]
+        recettes = {r.id: r for r in Recette.with_details().filter(Recette.id.in_(lot))}
+        for recette_id in lot:
+            recette = recettes.pop(recette_id, None)
+            if recette is not None:
+                yield recette
+                db.session.expire(recette, ['ingredients_charges', 'instructions_charges'])
+
+
+def pdf_menu(menu, en_cache_seulement=False):
+    """
+    Chemin du livre de recettes d'un menu (planning, liste de courses, recettes)
+
+    La clé reprend la révision du menu (version et dernière modification des
+    recettes planifiées) et la génération des conversions d'unités, qui
+    change les quantités de la liste de courses.
+
+    Args:
+        menu: Objet Menu
+        en_cache_seulement: Renvoyer None plutôt que mettre en page (tâche de fond)
+    """
+    composants, _ = Menu.revision(menu.id)
+    cle = composants + (UnitConverter.generation(),)
+    version = hashlib.sha1(repr(cle).encode('utf-8')).hexdigest()[:12]
+
+    def generer(sortie):
+        complet = Menu.with_full_week().filter(Menu.id == menu.id).one()
+
+        # Recettes dans l'ordre d'apparition (repas de la semaine puis gâteaux), sans doublon
+        recette_ids = []
+        for jour in complet.jours_charges:
+            recette_ids.extend(getattr(jour, colonne) for colonne in Menu.COLONNES_REPAS)
+        recette_ids.extend(gateau.recette_id for gateau in complet.gateaux_charges)
+        recette_ids = [rid for rid in dict.fromkeys(recette_ids) if rid is not None]
+
+        generer_pdf_menu(complet, complet.calculer_ingredients_totaux(),
+                         _recettes_par_lots(recette_ids), sortie)
+
+    return obtenir(f'menu-{menu.id}', version, cle, None if en_cache_seulement else generer)
+
+
+def pdf_courses(liste):
+    """
+    Chemin du PDF d'une liste de courses
+
+    La version de la liste change avec chacun de ses articles : le PDF n'est
+    mis en page (articles chargés en une requête) qu'après une modification.
+    Les quantités affichées dépendent aussi des conversions d'unités.
+    """
+    ordre_rayons = tuple(current_app.config['COURSES_ORDRE_RAYONS'])
+
+    def generer(sortie):
+        generer_pdf_courses(liste, liste.items_par_rayon(ordre_rayons), sortie)
+
+    return obtenir(
+        f'courses-{liste.id}', liste.version,
+        ('courses', liste.id, liste.version, liste.updated_at, UnitConverter.generation(), ordre_rayons),
+        generer
+    )
+
+
+def planifier_recettes(recette_ids):
+    """
+    Demande le pré-rendu des PDF de ces recettes (sans effet si désactivé,
+    ou avec TACHES_SYNCHRONES : sans worker, la tâche ne serait jamais
+    exécutée et le rendu dans la requête annulerait le bénéfice du pré-rendu)
+    """
+    if _app is None or not _app.config.get('PDF_PRERENDU') or _app.config.get('TACHES_SYNCHRONES'):
+        return
+    try:
+        enfiler_hors_session('pdf_recettes', recette_ids=sorted(recette_ids))
+    except Exception:
+        # Le commit de la modification a déjà eu lieu : le PDF sera rendu au premier téléchargement
+        _app.logger.exception('Pré-rendu des PDF des recettes %s non planifié', sorted(recette_ids))
+
+
+@gestionnaire('pdf_recettes')
+def _prerendre_recettes(tache):
+    """Pré-rendu des PDF de recettes modifiées (les recettes supprimées sont purgées)"""
+    for recette_id in tache.parametres['recette_ids']:
+        recette = db.session.get(Recette, recette_id)
+        if recette is None:
+            purger(f'recette-{recette_id}')
+        else:
+            pdf_recette(recette)
+
+
+@gestionnaire('pdf_menu')
+def _pdf_menu(tache):
+    """Livre de recettes d'un menu"""
+    menu = db.session.get(Menu, tache.parametres['menu_id'])
+    if menu is None:
+        raise TacheImpossible('Menu supprimé')
+    pdf_menu(menu)
+    return {'redirection': ['menus.telecharger_pdf', {'id': menu.id}]}
+
+
+def _recettes_modifiees(session, contexte):
+    """Après chaque flush : mémorise les recettes dont la révision change"""
+    ids = set()
+    for objet in chain(session.new, session.dirty, session.deleted):
+        if isinstance(objet, Recette):
+            if objet in session.new or objet in session.deleted \
+                    or session.is_modified(objet, include_collections=False):
+                ids.add(objet.id)
+        elif type(objet) in VERSIONS_ENFANTS:
+            attribut, _, modele = VERSIONS_ENFANTS[type(objet)]
+            if modele is Recette:
+                ids.add(getattr(objet, attribut))
+    ids.discard(None)
+    if ids:
+        session.info.setdefault('pdf_a_prerendre', set()).update(ids)
+
+
+def _prerendre_apres_commit(session):
+    ids = session.info.pop('pdf_a_prerendre', None)
+    if ids:
+        planifier_recettes(ids)
+
+
+def _oublier_apres_rollback(session):
+    session.info.pop('pdf_a_prerendre', None)
+
+
+def init_app(app):
+    """Branche le pré-rendu des PDF sur les commits (PDF_PRERENDU)"""
+    global _app
+    _app = app
+
+    if not event.contains(Session, 'after_flush', _recettes_modifiees):
+        event.listen(Session, 'after_flush', _recettes_modifiees)
+        event.listen(Session, 'after_commit', _prerendre_apres_commit)
+        event.listen(Session, 'after_rollback', _oublier_apres_rollback)
@@ -1,6 +1,8 @@
 """
-Générateur de PDF pour les recettes
+Générateur de PDF pour les recettes, les menus et les listes de courses
 """
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.units import cm
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
@@ -11,21 +13,130 @@ from io import BytesIO
 from datetime import datetime
 
 
-def generer_pdf_recette(recette, portions=None):
+# Tableaux : informations générales et ingrédients d'une recette
+STYLE_TABLE_INFOS = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+    ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+    ('ALIGN', (1, 0), (1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+STYLE_TABLE_INGREDIENTS = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#198754')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 11),
+    ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+# Planning de la semaine d'un menu (jours en lignes, repas en colonnes)
+STYLE_TABLE_PLANNING = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('BACKGROUND', (0, 1), (0, -1), colors.HexColor('#f8f9fa')),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTNAME', (0, 1), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 6),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+])
+
+# Liste de courses (case à cocher, article, quantité)
+STYLE_TABLE_COURSES = TableStyle([
+    ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOX', (0, 0), (0, -1), 0.5, colors.grey),
+    ('INNERGRID', (0, 0), (0, -1), 0.5, colors.grey),
+    ('LINEBELOW', (1, 0), (-1, -1), 0.25, colors.lightgrey),
+    ('ALIGN', (0, 0), (0, -1), 'CENTER'),
+    ('ALIGN', (2, 0), (2, -1), 'RIGHT'),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('TOPPADDING', (0, 0), (-1, -1), 4),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+])
+
+
+@lru_cache(maxsize=None)
+def styles_pdf():
     """
-    Génère un PDF pour une recette
-
-    Args:
-        recette: Objet Recette
-        portions: Nombre de portions (optionnel, utilise recette.portions_min par défaut)
+    Styles de paragraphe partagés par tous les documents,
+    construits une seule fois par processus
 
     Returns:
-        BytesIO contenant le PDF
+        dict nom -> ParagraphStyle
     """
-    buffer = BytesIO()
-
-    # Créer le document PDF
-    doc = SimpleDocTemplate(
+    styles = getSampleStyleSheet()
+    return {
+        'base': styles['Normal'],
+        # Titre d'un document
+        'titre': ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#0d6efd'),
+            spaceAfter=20,
+            alignment=TA_CENTER
+        ),
+        # Sous-titres (Ingrédients, Instructions...)
+        'sous_titre': ParagraphStyle(
+            'CustomSubtitle',
+            parent=styles['Heading2'],
+            fontSize=16,
+            textColor=colors.HexColor('#198754'),
+            spaceAfter=10
+        ),
+        # Jours d'un menu
+        'jour': ParagraphStyle(
+            'CustomDay',
+            parent=styles['Heading2'],
+            fontSize=14,
+            textColor=colors.HexColor('#198754'),
+            spaceAfter=10
+        ),
+        # Texte courant
+        'normal': ParagraphStyle(
+            'CustomNormal',
+            parent=styles['Normal'],
+            fontSize=11,
+            alignment=TA_JUSTIFY
+        ),
+        # Cellules du planning d'un menu
+        'cellule': ParagraphStyle(
+            'CustomCell',
+            parent=styles['Normal'],
+            fontSize=9,
+            leading=11
+        ),
+        'pied': ParagraphStyle(
+            'Footer',
+            parent=styles['Normal'],
+            fontSize=8,
+            textColor=colors.grey,
+            alignment=TA_CENTER
+        ),
+    }
+
+
+def _document(buffer):
+    """Document A4 aux marges de 2 cm"""
+    return SimpleDocTemplate(
         buffer,
         pagesize=A4,
         rightMargin=2*cm,
@@ -34,261 +145,349 @@ def generer_pdf_recette(recette, portions=None):
         bottomMargin=2*cm
     )
 
-    # Styles
-    styles = getSampleStyleSheet()
 
-    # Style personnalisé pour le titre
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#0d6efd'),
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
+def _quantite(valeur):
+    """Quantité lisible : 200 plutôt que 200.0, deux décimales au plus"""
+    return f'{round(valeur, 2):g}' if valeur is not None else ''
 
-    # Style pour les sous-titres
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=16,
-        textColor=colors.HexColor('#198754'),
-        spaceAfter=10
-    )
 
-    # Style pour le texte normal
-    normal_style = ParagraphStyle(
-        'CustomNormal',
-        parent=styles['Normal'],
-        fontSize=11,
-        alignment=TA_JUSTIFY
-    )
+def story_recette(recette, portions=None):
+    """
+    Contenu d'une recette (titre, informations, ingrédients, instructions, notes)
 
-    # Contenu du PDF
+    Args:
+        recette: Objet Recette (lignes d'ingrédients et instructions chargées d'avance
+                 de préférence, voir Recette.with_details)
+        portions: Nombre de portions (optionnel, portions de base de la recette par défaut)
+
+    Returns:
+        Liste de flowables ReportLab
+    """
+    styles = styles_pdf()
     story = []
 
     # Titre de la recette
-    story.append(Paragraph(recette.nom, title_style))
+    story.append(Paragraph(escape(recette.nom), styles['titre']))
     story.append(Spacer(1, 0.5*cm))
 
     # Informations générales
-    portions_affichees = portions or recette.portions_min or 1
+    portions_affichees = portions or recette.portions or 1
     info_data = [
-        ['<b>Portions:</b>', str(portions_affichees)],
-        ['<b>Temps de préparation:</b>', f"{recette.temps_preparation} min" if recette.temps_preparation else "Non spécifié"],
-        ['<b>Évaluation:</b>', f"{recette.evaluation}/5" if recette.evaluation else "Non évaluée"],
-        ['<b>Type:</b>', recette.type_repas or "Non spécifié"],
+        ['Portions:', str(portions_affichees)],
+        ['Temps de préparation:', recette.temps_preparation or "Non spécifié"],
+        ['Temps de cuisson:', recette.temps_cuisson or "Non spécifié"],
+        ['Évaluation:', f"{recette.evaluation}/5" if recette.evaluation else "Non évaluée"],
+        ['Type:', recette.type_repas or "Non spécifié"],
     ]
 
     info_table = Table(info_data, colWidths=[5*cm, 10*cm])
-    info_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f8f9fa')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-        ('ALIGN', (1, 0), (1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('TOPPADDING', (0, 0), (-1, -1), 8),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-    ]))
+    info_table.setStyle(STYLE_TABLE_INFOS)
 
     story.append(info_table)
     story.append(Spacer(1, 1*cm))
 
     # Ingrédients
-    story.append(Paragraph("Ingrédients", subtitle_style))
+    story.append(Paragraph("Ingrédients", styles['sous_titre']))
     story.append(Spacer(1, 0.3*cm))
 
-    if recette.recette_ingredients:
-        ingredient_data = [['<b>Ingrédient</b>', '<b>Quantité</b>', '<b>Unité</b>']]
-
-        for ri in recette.recette_ingredients.all():
-            # Ajuster les quantités selon le nombre de portions
-            quantite_base = ri.quantite
-            if portions and recette.portions_min:
-                ratio = portions / recette.portions_min
-                quantite_affichee = round(quantite_base * ratio, 2)
-            else:
-                quantite_affichee = quantite_base
+    if recette.ingredients_charges:
+        # Ajuster les quantités selon le nombre de portions
+        ratio = portions / recette.portions if portions and recette.portions else 1
+        ingredient_data = [['Ingrédient', 'Quantité', 'Unité']]
 
+        for ri in recette.ingredients_charges:
             ingredient_data.append([
-                ri.ingredient.nom,
-                str(quantite_affichee),
+                Paragraph(escape(ri.ingredient.nom), styles['base']),
+                _quantite(ri.quantite * ratio if ri.quantite is not None else None),
                 ri.unite or 'g'
             ])
 
-        ingredient_table = Table(ingredient_data, colWidths=[8*cm, 3*cm, 3*cm])
-        ingredient_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#198754')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('ALIGN', (1, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')]),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
+        ingredient_table = Table(ingredient_data, colWidths=[8*cm, 3*cm, 3*cm], repeatRows=1)
+        ingredient_table.setStyle(STYLE_TABLE_INGREDIENTS)
 
         story.append(ingredient_table)
     else:
-        story.append(Paragraph("<i>Aucun ingrédient défini</i>", normal_style))
+        story.append(Paragraph("<i>Aucun ingrédient défini</i>", styles['normal']))
 
     story.append(Spacer(1, 1*cm))
 
     # Instructions
-    story.append(Paragraph("Instructions", subtitle_style))
+    story.append(Paragraph("Instructions", styles['sous_titre']))
     story.append(Spacer(1, 0.3*cm))
 
-    if recette.instructions:
-        # Diviser les instructions par lignes et numéroter
-        instructions_lines = recette.instructions.split('\n')
-        for i, line in enumerate(instructions_lines, 1):
-            if line.strip():
-                story.append(Paragraph(f"<b>{i}.</b> {line.strip()}", normal_style))
-                story.append(Spacer(1, 0.2*cm))
+    if recette.instructions_charges:
+        for i, instruction in enumerate(recette.instructions_charges, 1):
+            story.append(Paragraph(f"<b>{i}.</b> {escape(instruction.texte.strip())}", styles['normal']))
+            story.append(Spacer(1, 0.2*cm))
     else:
-        story.append(Paragraph("<i>Aucune instruction définie</i>", normal_style))
+        story.append(Paragraph("<i>Aucune instruction définie</i>", styles['normal']))
 
     story.append(Spacer(1, 1*cm))
 
     # Notes (si présentes)
-    if recette.notes:
-        story.append(Paragraph("Notes", subtitle_style))
+    if recette.note:
+        story.append(Paragraph("Notes", styles['sous_titre']))
         story.append(Spacer(1, 0.3*cm))
-        story.append(Paragraph(recette.notes, normal_style))
+        story.append(Paragraph(escape(recette.note).replace('\n', '<br/>'), styles['normal']))
         story.append(Spacer(1, 1*cm))
 
+    return story
+
+
+def generer_pdf_recette(recette, portions=None, sortie=None):
+    """
+    Génère un PDF pour une recette
+
+    Args:
+        recette: Objet Recette
+        portions: Nombre de portions (optionnel, utilise recette.portions par défaut)
+        sortie: Fichier binaire où écrire le PDF (optionnel, BytesIO par défaut)
+
+    Returns:
+        Fichier contenant le PDF
+    """
+    buffer = sortie if sortie is not None else BytesIO()
+
+    # Créer le document PDF
+    doc = _document(buffer)
+
+    # Contenu du PDF
+    story = story_recette(recette, portions)
+
     # Pied de page
     story.append(Spacer(1, 2*cm))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey,
-        alignment=TA_CENTER
-    )
     story.append(Paragraph(
         f"Recette générée le {datetime.now().strftime('%d/%m/%Y à %H:%M')} - Iovag",
-        footer_style
+        styles_pdf()['pied']
     ))
 
     # Générer le PDF
     doc.build(story)
 
     # Réinitialiser le buffer au début
-    buffer.seek(0)
+    if sortie is None:
+        buffer.seek(0)
     return buffer
 
 
-def generer_pdf_menu(menu):
+class FlowablesParSection(list):
     """
-    Génère un PDF pour un menu de la semaine
+    Liste de flowables alimentée section par section depuis un itérable
+
+    doc.build() consomme la liste par le début : la section suivante n'est
+    produite que lorsque la précédente est entièrement mise en page, seule
+    la section en cours reste donc en mémoire.
+    """
+
+    def __init__(self, sections):
+        super().__init__()
+        self._sections = iter(sections)
+
+    def __len__(self):
+        while not super().__len__():
+            section = next(self._sections, None)
+            if section is None:
+                break
+            self.extend(section)
+        return super().__len__()
+
+
+def _planning_menu(menu):
+    """Planning de la semaine : un jour par ligne, un repas par colonne"""
+    styles = styles_pdf()
+
+    def cellule(recette):
+        return Paragraph(escape(recette.nom), styles['cellule']) if recette else ''
+
+    planning = [['', 'Petit-déjeuner', 'Déjeuner', 'Goûter', 'Dîner']]
+    for jour in menu.jours_charges:
+        planning.append([
+            jour.nom_jour,
+            cellule(jour.petit_dejeuner_recette),
+            cellule(jour.dejeuner_recette),
+            cellule(jour.gouter_recette),
+            cellule(jour.diner_recette),
+        ])
+
+    table = Table(planning, colWidths=[2.6*cm] + [3.6*cm] * 4, repeatRows=1)
+    table.setStyle(STYLE_TABLE_PLANNING)
+    return table
+
+
+def _sections_menu(menu, ingredients_totaux, recettes):
+    """
+    Sections du livre de recettes d'un menu, produites à la demande :
+    présentation et planning, liste de courses, puis une section par recette
+    """
+    styles = styles_pdf()
+
+    # Présentation et planning de la semaine
+    section = [Paragraph(f"Menu: {escape(menu.nom)}", styles['titre']), Spacer(1, 0.5*cm)]
+    info = f"Début: {menu.date_debut.strftime('%d/%m/%Y')} | Personnes: {menu.nb_personnes}"
+    if menu.theme:
+        info += f" | Thème: {escape(menu.theme)}"
+    section.append(Paragraph(info, styles['base']))
+    if menu.description:
+        section.append(Spacer(1, 0.3*cm))
+        section.append(Paragraph(escape(menu.description).replace('\n', '<br/>'), styles['normal']))
+    section.append(Spacer(1, 1*cm))
+
+    section.append(Paragraph("Planning de la semaine", styles['sous_titre']))
+    section.append(_planning_menu(menu))
+
+    if menu.gateaux_charges:
+        section.append(Spacer(1, 0.5*cm))
+        section.append(Paragraph("Gâteaux", styles['jour']))
+        for gateau in menu.gateaux_charges:
+            texte = f"• {escape(gateau.recette.nom)}"
+            if gateau.note:
+                texte += f" <i>({escape(gateau.note)})</i>"
+            section.append(Paragraph(texte, styles['base']))
+            section.append(Spacer(1, 0.2*cm))
+    yield section
+
+    # Liste de courses agrégée, par rayon
+    section = [PageBreak(), Paragraph("Liste de courses", styles['titre'])]
+    rayons = {}
+    for data in ingredients_totaux.values():
+        rayons.setdefault(data['categorie'] or 'Autre', []).append(data)
+
+    if rayons:
+        for rayon in sorted(rayons):
+            section.append(Paragraph(escape(rayon), styles['jour']))
+            lignes = [['Ingrédient', 'Quantité', 'Unité']]
+            for data in sorted(rayons[rayon], key=lambda d: d['nom'].lower()):
+                lignes.append([
+                    Paragraph(escape(data['nom']), styles['base']),
+                    _quantite(data['quantite']),
+                    data['unite']
+                ])
+            table = Table(lignes, colWidths=[8*cm, 3*cm, 3*cm], repeatRows=1)
+            table.setStyle(STYLE_TABLE_INGREDIENTS)
+            section.append(table)
+            section.append(Spacer(1, 0.5*cm))
+    else:
+        section.append(Paragraph("<i>Aucun ingrédient</i>", styles['normal']))
+    yield section
+
+    # Une fiche par recette, aux portions du menu
+    for recette in recettes:
+        yield [PageBreak()] + story_recette(recette, menu.nb_personnes)
+
+    yield [Spacer(1, 1*cm), Paragraph(
+        f"Menu généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')} - Iovag",
+        styles['pied']
+    )]
+
+
+def generer_pdf_menu(menu, ingredients_totaux, recettes, sortie=None):
+    """
+    Génère le livre de recettes d'un menu : planning de la semaine, liste de
+    courses agrégée et fiche de chaque recette
+
+    La mise en page avance section par section : les recettes sont
+    consommées une à une, jamais toutes en mémoire en même temps.
 
     Args:
-        menu: Objet Menu
+        menu: Objet Menu (jours et gâteaux chargés d'avance, voir Menu.with_full_week)
+        ingredients_totaux: Résultat de menu.calculer_ingredients_totaux()
+        recettes: Itérable des recettes du menu avec leurs détails, dans l'ordre d'apparition
+        sortie: Fichier binaire où écrire le PDF (optionnel, BytesIO par défaut)
 
     Returns:
-        BytesIO contenant le PDF
+        Fichier contenant le PDF
     """
-    buffer = BytesIO()
+    buffer = sortie if sortie is not None else BytesIO()
 
-    # Créer le document PDF
-    doc = SimpleDocTemplate(
-        buffer,
-        pagesize=A4,
-        rightMargin=2*cm,
-        leftMargin=2*cm,
-        topMargin=2*cm,
-        bottomMargin=2*cm
-    )
+    doc = _document(buffer)
+    doc.build(FlowablesParSection(_sections_menu(menu, ingredients_totaux, recettes)))
 
-    # Styles
-    styles = getSampleStyleSheet()
+    if sortie is None:
+        buffer.seek(0)
+    return buffer
 
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#0d6efd'),
-        spaceAfter=20,
-        alignment=TA_CENTER
-    )
 
-    subtitle_style = ParagraphStyle(
-        'CustomSubtitle',
-        parent=styles['Heading2'],
-        fontSize=14,
-        textColor=colors.HexColor('#198754'),
-        spaceAfter=10
-    )
+def generer_pdf_courses(liste, rayons, sortie=None):
+    """
+    Génère la liste de courses à imprimer, groupée par rayon
 
-    # Contenu
-    story = []
+    Args:
+        liste: Objet ListeCourse
+        rayons: Résultat de liste.items_par_rayon() (ordre du parcours du magasin)
+        sortie: Fichier binaire où écrire le PDF (optionnel, BytesIO par défaut)
+
+    Returns:
+        Fichier contenant le PDF
+    """
+    buffer = sortie if sortie is not None else BytesIO()
+    styles = styles_pdf()
 
-    # Titre
-    story.append(Paragraph(f"Menu: {menu.nom}", title_style))
+    story = [Paragraph(escape(liste.nom), styles['titre'])]
+    nb_items = sum(len(items) for _, items in rayons)
+    story.append(Paragraph(f"{nb_items} article{'s' if nb_items > 1 else ''}", styles['base']))
     story.append(Spacer(1, 0.5*cm))
 
-    # Date de début et nombre de convives
-    info = f"Début: {menu.date_debut.strftime('%d/%m/%Y')} | Convives: {menu.nb_convives}"
-    story.append(Paragraph(info, styles['Normal']))
-    story.append(Spacer(1, 1*cm))
+    for rayon, items in rayons:
+        story.append(Paragraph(escape(rayon), styles['jour']))
+        lignes = []
+        for item in items:
+            nom = escape(item.nom_ingredient)
+            lignes.append([
+                'X' if item.achete else '',
+                Paragraph(f"<strike>{nom}</strike>" if item.achete else nom, styles['base']),
+                item.get_affichage_quantite()
+            ])
+        table = Table(lignes, colWidths=[0.6*cm, 10.4*cm, 6*cm])
+        table.setStyle(STYLE_TABLE_COURSES)
+        story.append(table)
+        story.append(Spacer(1, 0.4*cm))
 
-    # Jours de la semaine
-    jours_ordre = ['Lundi', 'Mardi', 'Mercredi', 'Jeudi', 'Vendredi', 'Samedi', 'Dimanche']
-
-    for jour in jours_ordre:
-        # Récupérer les plats pour ce jour
-        menu_jours = menu.jours.filter_by(jour_semaine=jour).all()
-
-        if menu_jours:
-            story.append(Paragraph(jour, subtitle_style))
-
-            for mj in menu_jours:
-                if mj.recette:
-                    plat_text = f"<b>{mj.type_repas}:</b> {mj.recette.nom}"
-                    if mj.nb_fois > 1:
-                        plat_text += f" (×{mj.nb_fois})"
-                    story.append(Paragraph(plat_text, styles['Normal']))
-                    story.append(Spacer(1, 0.2*cm))
-
-            story.append(Spacer(1, 0.5*cm))
-
-    # Gâteaux (si présents)
-    if menu.gateaux.count() > 0:
-        story.append(Paragraph("Gâteaux", subtitle_style))
-        for gateau in menu.gateaux.all():
-            if gateau.recette:
-                gateau_text = f"• {gateau.recette.nom}"
-                if gateau.nb_fois > 1:
-                    gateau_text += f" (×{gateau.nb_fois})"
-                story.append(Paragraph(gateau_text, styles['Normal']))
-                story.append(Spacer(1, 0.2*cm))
-        story.append(Spacer(1, 0.5*cm))
+    if not rayons:
+        story.append(Paragraph("<i>Aucun article</i>", styles['normal']))
 
-    # Pied de page
-    story.append(Spacer(1, 2*cm))
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=8,
-        textColor=colors.grey,
-        alignment=TA_CENTER
-    )
+    story.append(Spacer(1, 1*cm))
     story.append(Paragraph(
-        f"Menu généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')} - Iovag",
-        footer_style
+        f"Liste générée le {datetime.now().strftime('%d/%m/%Y à %H:%M')} - Iovag",
+        styles['pied']
     ))
 
-    # Générer le PDF
+    doc = _document(buffer)
     doc.build(story)
 
-    buffer.seek(0)
+    if sortie is None:
+        buffer.seek(0)
     return buffer
+
+
+def texte_courses(liste, rayons, largeur=42):
+    """
+    Variante texte brut de la liste de courses (imprimante thermique, SMS...)
+
+    Args:
+        liste: Objet ListeCourse
+        rayons: Résultat de liste.items_par_rayon()
+        largeur: Nombre de caractères par ligne (42 pour un ticket de 80 mm)
+
+    Returns:
+        str
+    """
+    lignes = [liste.nom[:largeur], datetime.now().strftime('%d/%m/%Y %H:%M'), '=' * largeur]
+
+    for rayon, items in rayons:
+        lignes.append('')
+        lignes.append(rayon.upper()[:largeur])
+        lignes.append('-' * largeur)
+        for item in items:
+            case = '[x]' if item.achete else '[ ]'
+            quantite = item.get_affichage_quantite()
+            # Nom tronqué pour garder la quantité alignée à droite
+            place = max(largeur - len(case) - len(quantite) - 2, 1)
+            nom = item.nom_ingredient if len(item.nom_ingredient) <= place \
+                else item.nom_ingredient[:place - 1] + '.'
+            lignes.append(f"{case} {nom.ljust(place)} {quantite}")
+
+    if not rayons:
+        lignes.append('Aucun article')
+
+    lignes.append('=' * largeur)
+    return '\n'.join(lignes) + '\n'
@@ -0,0 +1,112 @@
+"""
+Réglages SQLite appliqués à chaque connexion : WAL, synchronisation allégée,
+délai d'attente des verrous et caches adaptés au Raspberry Pi
+"""
+from sqlalchemy import event
+from app import db
+
+
+# Valeurs numériques renvoyées par SQLite pour les pragmas énumérés
+VALEURS_SYNCHRONOUS = {'OFF': 0, 'NORMAL': 1, 'FULL': 2, 'EXTRA': 3}
+VALEURS_TEMP_STORE = {'DEFAULT': 0, 'FILE': 1, 'MEMORY': 2}
+
+
+def _est_sqlite(engine):
+    return engine.dialect.name == 'sqlite'
+
+
+def _est_en_memoire(engine):
+    return engine.url.database in (None, '', ':memory:')
+
+
+def _appliquer_pragmas(pragmas):
+    """Construit l'écouteur 'connect' qui applique les pragmas à la connexion DBAPI"""
+    def appliquer(connexion_dbapi, connection_record):
+        cursor = connexion_dbapi.cursor()
+        try:
+            for nom, valeur in pragmas.items():
+                cursor.execute(f'PRAGMA {nom}={valeur}')
+        finally:
+            cursor.close()
+    return appliquer
+
+
+def lire_pragmas(engine, noms):
+    """
+    Valeurs effectives des pragmas sur une connexion du pool
+
+    Returns:
+        dict {nom: valeur}
+    """
+    connexion = engine.raw_connection()
+    try:
+        cursor = connexion.cursor()
+        valeurs = {}
+        for nom in noms:
+            ligne = cursor.execute(f'PRAGMA {nom}').fetchone()
+            valeurs[nom] = ligne[0] if ligne else None
+        cursor.close()
+        return valeurs
+    finally:
+        connexion.close()
+
+
+def ecarts_pragmas(attendus, effectifs):
+    """
+    Pragmas dont la valeur effective diffère de la valeur demandée
+
+    SQLite renvoie des entiers pour synchronous et temp_store, et peut
+    plafonner mmap_size selon sa compilation.
+
+    Returns:
+        dict {nom: (attendu, effectif)}
+    """
+    ecarts = {}
+    for nom, attendu in attendus.items():
+        effectif = effectifs.get(nom)
+        if nom == 'synchronous':
+            attendu_norme = VALEURS_SYNCHRONOUS.get(str(attendu).upper(), attendu)
+        elif nom == 'temp_store':
+            attendu_norme = VALEURS_TEMP_STORE.get(str(attendu).upper(), attendu)
+        elif isinstance(attendu, str):
+            attendu_norme = attendu.lower()
+            effectif = str(effectif).lower()
+        else:
+            attendu_norme = attendu
+        if nom == 'mmap_size' and effectif is not None and 0 < effectif <= attendu_norme:
+            continue
+        if effectif != attendu_norme:
+            ecarts[nom] = (attendu, effectif)
+    return ecarts
+
+
+def init_app(app):
+    """
+    Branche les pragmas sur les moteurs SQLite et vérifie les valeurs effectives
+
+    Les écarts (WAL refusé sur un système de fichiers réseau, mmap désactivé...)
+    sont signalés dans le journal au démarrage.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if not pragmas:
+        return
+
+    with app.app_context():
+        for engine in db.engines.values():
+            if not _est_sqlite(engine):
+                continue
+
+            # Une base en mémoire ne peut pas passer en WAL
+            pragmas_moteur = {nom: valeur for nom, valeur in pragmas.items()
+                              if not (_est_en_memoire(engine) and nom in ('journal_mode', 'mmap_size'))}
+            event.listen(engine, 'connect', _appliquer_pragmas(pragmas_moteur))
+
+            # Les connexions déjà ouvertes n'ont pas reçu les pragmas
+            engine.dispose()
+
+            if not app.config.get('SQLITE_VERIFIER_PRAGMAS', True):
+                continue
+            ecarts = ecarts_pragmas(pragmas_moteur, lire_pragmas(engine, pragmas_moteur))
+            for nom, (attendu, effectif) in ecarts.items():
+                app.logger.warning('PRAGMA %s=%s demandé, valeur effective %s (%s)',
+                                   nom, attendu, effectif, engine.url.database)
@@ -0,0 +1,549 @@
+"""
+Recherche de recettes :
+- index plein texte SQLite FTS5 (nom, ingrédients, instructions, notes) classé par BM25
+- index en mémoire des recettes d'un utilisateur (recettes personnelles + sauvegardées)
+"""
+import re
+import threading
+import unicodedata
+from itertools import chain
+from sqlalchemy import event, inspect, table, column
+from sqlalchemy.orm import Session
+from app import db
+from app.models import Recette, RecetteIngredient, Ingredient, Instruction, MenuJour, recettes_favorites
+
+
+# Index chargés par utilisateur : user_id -> IndexRecettes
+_index = {}
+
+# Sérialise les écritures dans les index (workers gthread) ; les lectures
+# se font sans verrou, un index reconstruit étant remplacé d'un bloc
+_verrou = threading.RLock()
+
+# Disponibilité de l'index plein texte par base : url -> bool
+_plein_texte = {}
+
+# Table virtuelle FTS5 (rowid = id de la recette), textes stockés déjà normalisés
+TABLE_PLEIN_TEXTE = 'recettes_fts'
+SQL_CREATION_PLEIN_TEXTE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS recettes_fts USING fts5("
+    "nom, ingredients, instructions, note, tokenize='unicode61 remove_diacritics 2')"
+)
+recettes_fts = table(
+    TABLE_PLEIN_TEXTE,
+    column('rowid'), column('nom'), column('ingredients'), column('instructions'), column('note')
+)
+
+# Poids BM25 des colonnes : nom, ingredients, instructions, note
+POIDS_BM25 = (10.0, 5.0, 1.0, 1.0)
+
+# Recherche par préfixe à partir de cette longueur de mot (mot exact en dessous)
+LONGUEUR_MIN_PREFIXE = 2
+
+# Nombre maximal de recettes renvoyées par rechercher_plein_texte (autocomplétion)
+LIMITE_PLEIN_TEXTE = 200
+
+LIGATURES = {'œ': 'oe', 'æ': 'ae'}
+
+
+def _singulier(mot):
+    """Repli simple du pluriel : tomates -> tomate, choux -> chou"""
+    if len(mot) > 3 and mot[-1] in 'sx' and mot[-2] not in 'sx':
+        return mot[:-1]
+    return mot
+
+
+def normaliser_texte(texte):
+    """
+    Normalise un texte pour la recherche : minuscules, sans accents ni ligatures,
+    mots ramenés au singulier ("Œufs brouillés" -> "oeuf brouille")
+    """
+    texte = (texte or '').lower()
+    for ligature, remplacement in LIGATURES.items():
+        texte = texte.replace(ligature, remplacement)
+    texte = ''.join(c for c in unicodedata.normalize('NFKD', texte) if not unicodedata.combining(c))
+    return au_singulier(texte)
+
+
+def au_singulier(texte):
+    """Mots d'un texte ramenés au singulier, casse et accents conservés ("Poivrons rouges" -> "Poivron rouge")"""
+    return re.sub(r'\w+', lambda m: _singulier(m.group()), texte)
+
+
+def trigrammes(texte):
+    """Ensemble des trigrammes d'un texte normalisé"""
+    return {texte[i:i + 3] for i in range(len(texte) - 2)}
+
+
+class DocumentRecette:
+    """Données d'une recette nécessaires à la recherche et au score"""
+
+    __slots__ = ('id', 'nom', 'nom_normalise', 'portions', 'temps_preparation', 'temps_cuisson',
+                 'evaluation', 'mois_saison', 'type_repas', 'ingredients', 'ingredients_normalises',
+                 'bitset')
+
+    def __init__(self, recette, ingredients):
+        """
+        Args:
+            recette: Ligne/objet avec les colonnes de Recette
+            ingredients: Liste de tuples (ingredient_id, nom)
+        """
+        self.id = recette.id
+        self.nom = recette.nom
+        self.nom_normalise = normaliser_texte(recette.nom)
+        self.portions = recette.portions
+        self.temps_preparation = recette.temps_preparation
+        self.temps_cuisson = recette.temps_cuisson
+        self.evaluation = recette.evaluation
+        self.mois_saison = [m.strip() for m in (recette.mois_saison or '').split(',') if m.strip()]
+        self.type_repas = [t.strip() for t in (recette.type_repas or '').split(',') if t.strip()]
+        self.ingredients = ingredients
+        self.ingredients_normalises = [normaliser_texte(nom) for _, nom in ingredients]
+        # Un bit par ingrédient : les intersections se font par ET binaire
+        self.bitset = 0
+        for ingredient_id, _ in ingredients:
+            self.bitset |= 1 << ingredient_id
+
+    def textes(self):
+        """Champs texte indexés (nom + noms d'ingrédients)"""
+        return [self.nom_normalise] + self.ingredients_normalises
+
+    def correspond(self, terme):
+        """Vérifie si le terme normalisé apparaît dans le nom ou un ingrédient"""
+        return any(terme in texte for texte in self.textes())
+
+    def ingredients_communs(self, bitset):
+        """Noms (triés) des ingrédients de la recette présents dans le bitset"""
+        return sorted({nom for ingredient_id, nom in self.ingredients if bitset >> ingredient_id & 1})
+
+
+def _charger_documents(recette_ids):
+    """
+    Charge les documents de recherche pour un ensemble de recettes (deux requêtes)
+
+    Returns:
+        dict {recette_id: DocumentRecette}
+    """
+    if not recette_ids:
+        return {}
+
+    recettes = db.session.query(
+        Recette.id, Recette.nom, Recette.portions, Recette.temps_preparation,
+        Recette.temps_cuisson, Recette.evaluation, Recette.mois_saison, Recette.type_repas
+    ).filter(Recette.id.in_(recette_ids)).order_by(Recette.id).all()
+
+    lignes = db.session.query(
+        RecetteIngredient.recette_id, Ingredient.id, Ingredient.nom
+    ).join(Ingredient, Ingredient.id == RecetteIngredient.ingredient_id)\
+        .filter(RecetteIngredient.recette_id.in_(recette_ids))\
+        .order_by(RecetteIngredient.id)\
+        .all()
+
+    ingredients_par_recette = {}
+    for recette_id, ingredient_id, nom in lignes:
+        ingredients_par_recette.setdefault(recette_id, []).append((ingredient_id, nom))
+
+    return {
+        recette.id: DocumentRecette(recette, ingredients_par_recette.get(recette.id, []))
+        for recette in recettes
+    }
+
+
+def _ids_recettes_utilisateur(user_id):
+    """IDs des recettes personnelles et sauvegardées d'un utilisateur"""
+    personnelles = db.select(Recette.id).where(Recette.created_by == user_id)
+    sauvegardees = db.select(recettes_favorites.c.recette_id)\
+        .where(recettes_favorites.c.user_id == user_id)
+    return {ligne[0] for ligne in db.session.execute(db.union(personnelles, sauvegardees))}
+
+
+def _signature(user_id):
+    """
+    Empreinte bon marché (une requête) du catalogue de l'utilisateur
+    Permet de détecter les modifications faites par un autre worker
+    """
+    catalogue = db.union(
+        db.select(Recette.id.label('recette_id')).where(Recette.created_by == user_id),
+        db.select(recettes_favorites.c.recette_id).where(recettes_favorites.c.user_id == user_id)
+    ).subquery()
+
+    recettes = Recette.id.in_(db.select(catalogue.c.recette_id))
+    lignes = RecetteIngredient.recette_id.in_(db.select(catalogue.c.recette_id))
+
+    # Version (incrémentée avec les lignes) et date de modification :
+    # renommage ou ingrédient remplacé à nombre de lignes constant
+    return tuple(db.session.execute(db.select(
+        db.select(db.func.count()).select_from(catalogue).scalar_subquery(),
+        db.select(db.func.max(catalogue.c.recette_id)).scalar_subquery(),
+        db.select(db.func.sum(Recette.version)).where(recettes).scalar_subquery(),
+        db.select(db.func.max(Recette.updated_at)).where(recettes).scalar_subquery(),
+        db.select(db.func.count(RecetteIngredient.id)).where(lignes).scalar_subquery(),
+        db.select(db.func.max(RecetteIngredient.id)).where(lignes).scalar_subquery(),
+    )).one())
+
+
+class IndexRecettes:
+    """Index inversé trigramme -> recettes pour un utilisateur"""
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+        self.documents = {}  # recette_id -> DocumentRecette
+        self.postings = {}  # trigramme -> set(recette_id)
+        self.signature = None
+
+    def construire(self):
+        """(Re)construit l'index complet depuis la base"""
+        signature = _signature(self.user_id)
+        documents = _charger_documents(_ids_recettes_utilisateur(self.user_id))
+        postings = {}
+        for document in documents.values():
+            for texte in document.textes():
+                for trigramme in trigrammes(texte):
+                    postings.setdefault(trigramme, set()).add(document.id)
+        self.documents, self.postings, self.signature = documents, postings, signature
+
+    def ajouter(self, document):
+        """Ajoute ou remplace un document dans l'index"""
+        self.retirer(document.id)
+        self.documents[document.id] = document
+        for texte in document.textes():
+            for trigramme in trigrammes(texte):
+                self.postings.setdefault(trigramme, set()).add(document.id)
+
+    def retirer(self, recette_id):
+        """Retire un document de l'index"""
+        document = self.documents.pop(recette_id, None)
+        if not document:
+            return
+        for texte in document.textes():
+            for trigramme in trigrammes(texte):
+                ids = self.postings.get(trigramme)
+                if ids:
+                    ids.discard(recette_id)
+                    if not ids:
+                        del self.postings[trigramme]
+
+    def rechercher(self, terme):
+        """
+        Recettes dont le nom, un ingrédient, les instructions ou les notes
+        correspondent au terme (nom et ingrédients seulement sans FTS5)
+
+        Returns:
+            Liste de DocumentRecette
+        """
+        documents = self.documents
+        if not normaliser_texte(terme).strip():
+            return [document for document in map(documents.get, sorted(documents)) if document]
+
+        # Index plein texte : résultats déjà classés par pertinence
+        ids = rechercher_plein_texte(terme, self.user_id)
+        if ids is not None:
+            return [document for document in map(documents.get, ids) if document]
+
+        # Repli : index trigramme en mémoire
+        terme = normaliser_texte(terme)
+        if len(terme) >= 3:
+            # Intersection des listes de trigrammes, puis vérification exacte
+            candidats = None
+            for trigramme in trigrammes(terme):
+                ids = self.postings.get(trigramme, set())
+                candidats = set(ids) if candidats is None else candidats & ids
+                if not candidats:
+                    return []
+        else:
+            candidats = documents.keys()
+
+        return [document for document in map(documents.get, sorted(candidats))
+                if document and document.correspond(terme)]
+
+    def bitset_ingredients(self, recette_ids):
+        """
+        Union des ingrédients d'un ensemble de recettes sous forme de bitset
+        Les recettes hors de l'index sont chargées à la demande
+        """
+        manquantes = [i for i in recette_ids if i not in self.documents]
+        externes = _charger_documents(manquantes) if manquantes else {}
+
+        bitset = 0
+        for recette_id in recette_ids:
+            document = self.documents.get(recette_id) or externes.get(recette_id)
+            if document:
+                bitset |= document.bitset
+        return bitset
+
+
+def get_index(user_id):
+    """
+    Retourne l'index de l'utilisateur, reconstruit s'il a été modifié
+    par un autre worker (une requête de vérification, sans verrou)
+    """
+    index = _index.get(user_id)
+    signature = _signature(user_id) if index is not None else None
+    if index is not None and index.signature == signature:
+        return index
+
+    with _verrou:
+        # Un autre thread a pu (re)construire l'index pendant l'attente du verrou
+        index = _index.get(user_id)
+        if index is None:
+            index = IndexRecettes(user_id)
+            index.construire()
+            _index[user_id] = index
+        else:
+            if signature is None:
+                signature = _signature(user_id)
+            if index.signature != signature:
+                index.construire()
+        return index
+
+
+def mettre_a_jour_recette(recette):
+    """
+    Met à jour les index chargés après création/modification d'une recette
+    (index de l'auteur et des utilisateurs qui l'ont sauvegardée)
+    """
+    documents = None
+    with _verrou:
+        for index in _index.values():
+            if index.user_id == recette.created_by or recette.id in index.documents:
+                if documents is None:
+                    documents = _charger_documents([recette.id])
+                if recette.id in documents:
+                    index.ajouter(documents[recette.id])
+                index.signature = _signature(index.user_id)
+
+
+def retirer_recette(recette_id):
+    """Retire une recette supprimée de tous les index chargés"""
+    with _verrou:
+        for index in _index.values():
+            if recette_id in index.documents:
+                index.retirer(recette_id)
+                index.signature = _signature(index.user_id)
+
+
+def mettre_a_jour_sauvegarde(user_id, recette_id, sauvegardee):
+    """Ajoute/retire une recette sauvegardée de l'index d'un utilisateur"""
+    with _verrou:
+        index = _index.get(user_id)
+        if index is None:
+            return
+        if sauvegardee:
+            documents = _charger_documents([recette_id])
+            if recette_id in documents:
+                index.ajouter(documents[recette_id])
+        else:
+            index.retirer(recette_id)
+        index.signature = _signature(user_id)
+
+
+def get_recettes_menu(menu_id):
+    """IDs des recettes planifiées dans un menu (une requête)"""
+    colonnes = [MenuJour.petit_dejeuner_id, MenuJour.dejeuner_id, MenuJour.gouter_id, MenuJour.diner_id]
+    requete = db.union(*[
+        db.select(colonne).where(MenuJour.menu_id == menu_id, colonne.isnot(None))
+        for colonne in colonnes
+    ])
+    return {ligne[0] for ligne in db.session.execute(requete)}
+
+
+def plein_texte_disponible(connexion=None):
+    """Vérifie (une fois par base) que la table FTS5 existe"""
+    connexion = connexion or db.session.connection()
+    cle = str(connexion.engine.url)
+    if cle not in _plein_texte:
+        _plein_texte[cle] = (connexion.dialect.name == 'sqlite'
+                             and inspect(connexion).has_table(TABLE_PLEIN_TEXTE))
+    return _plein_texte[cle]
+
+
+def indexer_plein_texte(connexion, recette_ids=None):
+    """
+    (Ré)indexe des recettes dans la table FTS5
+
+    Args:
+        connexion: Connexion SQLAlchemy (session, migration ou commande)
+        recette_ids: IDs à réindexer (None = toute la table). Les recettes
+            supprimées sont simplement retirées de l'index.
+    """
+    requete_recettes = db.select(Recette.id, Recette.nom, Recette.note)
+    requete_ingredients = db.select(RecetteIngredient.recette_id, Ingredient.nom)\
+        .join(Ingredient, Ingredient.id == RecetteIngredient.ingredient_id)
+    requete_instructions = db.select(Instruction.recette_id, Instruction.texte)\
+        .order_by(Instruction.recette_id, Instruction.ordre)
+
+    if recette_ids is None:
+        connexion.execute(db.delete(recettes_fts))
+    else:
+        recette_ids = list(recette_ids)
+        if not recette_ids:
+            return
+        connexion.execute(db.delete(recettes_fts).where(recettes_fts.c.rowid.in_(recette_ids)))
+        requete_recettes = requete_recettes.where(Recette.id.in_(recette_ids))
+        requete_ingredients = requete_ingredients.where(RecetteIngredient.recette_id.in_(recette_ids))
+        requete_instructions = requete_instructions.where(Instruction.recette_id.in_(recette_ids))
+
+    ingredients = {}
+    for recette_id, nom in connexion.execute(requete_ingredients):
+        ingredients.setdefault(recette_id, []).append(nom)
+    instructions = {}
+    for recette_id, texte in connexion.execute(requete_instructions):
+        instructions.setdefault(recette_id, []).append(texte)
+
+    lignes = [{
+        'rowid': recette.id,
+        'nom': normaliser_texte(recette.nom),
+        'ingredients': normaliser_texte(' '.join(ingredients.get(recette.id, []))),
+        'instructions': normaliser_texte(' '.join(instructions.get(recette.id, []))),
+        'note': normaliser_texte(recette.note),
+    } for recette in connexion.execute(requete_recettes)]
+
+    if lignes:
+        connexion.execute(db.insert(recettes_fts), lignes)
+
+
+def _expression_plein_texte(terme):
+    """
+    Traduit un terme saisi en requête FTS5 (préfixe sur chaque mot d'au
+    moins LONGUEUR_MIN_PREFIXE lettres, mot exact sinon), None si vide
+    """
+    mots = re.findall(r'\w+', normaliser_texte(terme))
+    if not mots:
+        return None
+    return ' '.join(f'"{mot}"*' if len(mot) >= LONGUEUR_MIN_PREFIXE else f'"{mot}"' for mot in mots)
+
+
+def _resultats_plein_texte(expression):
+    """Sous-requête (recette_id, rang BM25) des recettes correspondant à l'expression"""
+    return db.select(
+        recettes_fts.c.rowid.label('recette_id'),
+        db.func.bm25(db.literal_column(TABLE_PLEIN_TEXTE), *POIDS_BM25).label('rang')
+    ).where(db.literal_column(TABLE_PLEIN_TEXTE).op('MATCH')(expression)).subquery()
+
+
+def rechercher_plein_texte(terme, user_id):
+    """
+    IDs des recettes de l'utilisateur (personnelles ou sauvegardées et
+    publiques) correspondant au terme, du plus au moins pertinent
+
+    Returns:
+        Liste d'au plus LIMITE_PLEIN_TEXTE IDs, ou None si l'index plein
+        texte n'est pas disponible
+    """
+    if not plein_texte_disponible():
+        return None
+    expression = _expression_plein_texte(terme)
+    if expression is None:
+        return []
+    resultats = _resultats_plein_texte(expression)
+    sauvegardees = db.select(recettes_favorites.c.recette_id).where(recettes_favorites.c.user_id == user_id)
+    requete = db.select(resultats.c.recette_id)\
+        .join(Recette, Recette.id == resultats.c.recette_id)\
+        .where(db.or_(
+            Recette.created_by == user_id,
+            db.and_(Recette.is_public.is_(True), Recette.id.in_(sauvegardees))
+        ))\
+        .order_by(resultats.c.rang)\
+        .limit(LIMITE_PLEIN_TEXTE)
+    return [ligne[0] for ligne in db.session.execute(requete)]
+
+
+def filtrer_plein_texte(requete, terme):
+    """
+    Restreint une requête sur Recette aux recettes correspondant au terme.
+    Hors SQLite, repli sur un LIKE.
+
+    Returns:
+        Tuple (requete, rang) : rang est la colonne BM25 (plus petit = plus
+        pertinent) à utiliser pour le tri, ou None sans index plein texte
+    """
+    expression = _expression_plein_texte(terme)
+    if expression is None:
+        return requete, None
+
+    if plein_texte_disponible():
+        resultats = _resultats_plein_texte(expression)
+        return requete.join(resultats, resultats.c.recette_id == Recette.id), resultats.c.rang
+
+    # Repli : sensible aux accents et au pluriel
+    motif = f'%{terme}%'
+    return requete.filter(db.or_(
+        Recette.nom.ilike(motif),
+        Recette.note.ilike(motif),
+        Recette.ingredients.any(RecetteIngredient.ingredient.has(Ingredient.nom.ilike(motif))),
+        Recette.instructions.any(Instruction.texte.ilike(motif))
+    )), None
+
+
+def _valeur(objet, attribut):
+    """Valeur chargée d'un attribut sans déclencher de requête (objets supprimés)"""
+    return inspect(objet).dict.get(attribut)
+
+
+def _a_change(objet, *attributs):
+    """Vérifie si l'un des attributs a été modifié dans ce flush"""
+    etat = inspect(objet)
+    return any(etat.attrs[attribut].history.has_changes() for attribut in attributs)
+
+
+def _synchroniser_plein_texte(session, contexte):
+    """
+    Après chaque flush : réindexe les recettes touchées (recette, lignes
+    d'ingrédients, instructions, ingrédient renommé) dans la même transaction
+    """
+    recette_ids = set()
+    ingredient_ids = set()
+
+    for objet in chain(session.new, session.deleted):
+        if isinstance(objet, Recette):
+            recette_ids.add(_valeur(objet, 'id'))
+        elif isinstance(objet, (RecetteIngredient, Instruction)):
+            recette_ids.add(_valeur(objet, 'recette_id'))
+
+    for objet in session.dirty:
+        if isinstance(objet, Recette) and _a_change(objet, 'nom', 'note'):
+            recette_ids.add(objet.id)
+        elif isinstance(objet, RecetteIngredient) and _a_change(objet, 'ingredient_id', 'recette_id'):
+            recette_ids.update(chain([objet.recette_id], inspect(objet).attrs.recette_id.history.deleted))
+        elif isinstance(objet, Instruction) and _a_change(objet, 'texte', 'recette_id'):
+            recette_ids.update(chain([objet.recette_id], inspect(objet).attrs.recette_id.history.deleted))
+        elif isinstance(objet, Ingredient) and _a_change(objet, 'nom'):
+            ingredient_ids.add(objet.id)
+
+    recette_ids.discard(None)
+    if not recette_ids and not ingredient_ids:
+        return
+
+    connexion = session.connection()
+    if not plein_texte_disponible(connexion):
+        return
+
+    if ingredient_ids:
+        recette_ids.update(connexion.execute(
+            db.select(RecetteIngredient.recette_id)
+            .where(RecetteIngredient.ingredient_id.in_(ingredient_ids))
+        ).scalars())
+
+    indexer_plein_texte(connexion, recette_ids)
+
+
+def _creer_table_plein_texte(cible, connexion, **kwargs):
+    """Crée la table FTS5 avec db.create_all() (tests, nouvelle installation)"""
+    if connexion.dialect.name == 'sqlite':
+        connexion.exec_driver_sql(SQL_CREATION_PLEIN_TEXTE)
+    _plein_texte.clear()
+
+
+def _supprimer_table_plein_texte(cible, connexion, **kwargs):
+    """Supprime la table FTS5 avec db.drop_all()"""
+    if connexion.dialect.name == 'sqlite':
+        connexion.exec_driver_sql(f'DROP TABLE IF EXISTS {TABLE_PLEIN_TEXTE}')
+    _plein_texte.clear()
+
+
+def init_app(app):
+    """Branche la synchronisation de l'index plein texte sur les événements SQLAlchemy"""
+    if not event.contains(Session, 'after_flush', _synchroniser_plein_texte):
+        event.listen(Session, 'after_flush', _synchroniser_plein_texte)
+        event.listen(db.metadata, 'after_create', _creer_table_plein_texte)
+        event.listen(db.metadata, 'before_drop', _supprimer_table_plein_texte)
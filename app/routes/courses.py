@@ -1,28 +1,35 @@
 """
 Routes pour la gestion des listes de courses
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, current_app
 from flask_login import login_required, current_user
-from app import db
-from app.models import ListeCourse, ListeCourseItem, Menu
+from app import db, taches
+from app.decorators import conditionnel
+from app.models import ListeCourse, ListeCourseItem, Menu, Tache
 
 bp = Blueprint('courses', __name__, url_prefix='/courses')
 
+# Bornes de la largeur de l'export texte (caractères par ligne)
+COLONNES_TEXTE_MIN = 24
+COLONNES_TEXTE_MAX = 80
+
 
 @bp.route('/')
 @login_required
 def index():
     """Liste de toutes les listes de courses"""
     listes = ListeCourse.query.filter_by(created_by=current_user.id)\
+        .options(db.joinedload(ListeCourse.menu))\
         .order_by(ListeCourse.created_at.desc()).all()
     return render_template('courses/index.html', listes=listes)
 
 
 @bp.route('/<int:id>')
 @login_required
+@conditionnel(lambda id: ListeCourse.revision(id))
 def detail(id):
     """Détail d'une liste de courses"""
-    liste = ListeCourse.query.get_or_404(id)
+    liste = ListeCourse.with_items().get_or_404(id)
     return render_template('courses/detail.html', liste=liste)
 
 
@@ -70,6 +77,90 @@ def update_quantite(id):
         return jsonify({'success': False, 'error': 'Invalid quantity'}), 400
 
 
+@bp.route('/<int:id>/batch', methods=['POST'])
+@login_required
+def batch(id):
+    """
+    Appliquer un lot d'opérations sur les articles en une transaction (AJAX)
+    Utilisé par la page de courses, qui regroupe les modifications côté client
+    """
+    liste = ListeCourse.query.get_or_404(id)
+
+    if liste.created_by != current_user.id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    data = request.get_json(silent=True) or {}
+    operations = data.get('operations')
+    if not isinstance(operations, list):
+        return jsonify({'success': False, 'error': 'operations doit être une liste'}), 400
+
+    try:
+        resultat = liste.appliquer_operations(operations)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    db.session.commit()
+
+    return jsonify({
+        'success': True,
+        'appliquees': resultat['appliquees'],
+        'ignorees': resultat['ignorees'],
+        'nb_items': liste.nb_items,
+        'nb_achetes': liste.nb_achetes,
+    })
+
+
+@bp.route('/<int:id>/sync', methods=['GET', 'POST'])
+@login_required
+def sync(id):
+    """
+    Synchronisation du mode hors ligne (AJAX)
+
+    GET ?depuis=<version> : articles modifiés depuis cette version
+    POST {depuis, changements} : applique les changements enregistrés hors ligne
+    (dernier qui écrit gagne par article) puis renvoie le même état
+    """
+    liste = ListeCourse.query.get_or_404(id)
+
+    if liste.created_by != current_user.id:
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 403
+
+    if request.method == 'GET':
+        depuis = request.args.get('depuis', 0, type=int)
+        return jsonify({'success': True, **liste.etat_depuis(depuis)})
+
+    data = request.get_json(silent=True) or {}
+    depuis = data.get('depuis', 0)
+    changements = data.get('changements', [])
+    if not isinstance(depuis, int) or not isinstance(changements, list):
+        return jsonify({'success': False, 'error': 'depuis et changements sont requis'}), 400
+
+    if changements and liste.statut != 'en_course':
+        # Courses déjà confirmées (par exemple depuis un autre appareil)
+        return jsonify({'success': False, 'error': 'La liste n\'est plus en cours',
+                        **liste.etat_depuis(depuis)}), 409
+
+    try:
+        appliques = liste.appliquer_changements_hors_ligne(changements)
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    db.session.commit()
+
+    return jsonify({'success': True, 'appliques': appliques, **liste.etat_depuis(depuis)})
+
+
+@bp.route('/sw.js')
+def service_worker():
+    """Service worker du mode hors ligne (portée /courses/)"""
+    response = current_app.send_static_file('js/courses-sw.js')
+    response.headers['Content-Type'] = 'application/javascript'
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @bp.route('/<int:id>/delete', methods=['POST'])
 @login_required
 def delete(id):
@@ -95,9 +186,14 @@ def reviser(id):
         flash('Seules les listes en brouillon peuvent être révisées', 'warning')
         return redirect(url_for('courses.detail', id=id))
 
-    # Vérifier le stock automatiquement
-    liste.verifier_stock()
-    db.session.commit()
+    # Vérifier le stock automatiquement, en tâche de fond (sauf retour d'une vérification terminée)
+    verifie = request.args.get('verifie', type=int)
+    verification = db.session.get(Tache, verifie) if verifie else None
+    if verification is None or verification.type != 'verifier_stock' or verification.statut != 'terminee' \
+            or verification.parametres.get('liste_id') != liste.id:
+        tache = taches.enfiler('verifier_stock', created_by=current_user.id, liste_id=liste.id)
+        if tache.statut != 'terminee':
+            return taches.suivre(tache)
 
     return render_template('courses/reviser.html', liste=liste)
 
@@ -240,7 +336,48 @@ def confirmer(id):
 @bp.route('/<int:id>/export-pdf')
 @login_required
 def export_pdf(id):
-    """Exporter la liste de courses en PDF"""
-    # TODO: Implémenter l'export PDF avec WeasyPrint
-    flash('Fonctionnalité à venir', 'info')
-    return redirect(url_for('courses.detail', id=id))
+    """Exporter la liste de courses en PDF, groupée par rayon"""
+    from flask import send_file
+    from app.pdf_cache import pdf_courses
+
+    liste = ListeCourse.query.get_or_404(id)
+
+    if liste.created_by != current_user.id:
+        flash('Vous n\'avez pas accès à cette liste', 'danger')
+        return redirect(url_for('courses.index'))
+
+    # PDF en cache pour cette version de la liste (mis en page seulement après une modification)
+    chemin_pdf = pdf_courses(liste)
+
+    filename = f"courses_{liste.nom.replace(' ', '_')}.pdf"
+
+    return send_file(
+        chemin_pdf,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=filename
+    )
+
+
+@bp.route('/<int:id>/export-texte')
+@login_required
+def export_texte(id):
+    """Exporter la liste de courses en texte brut (imprimante thermique)"""
+    from app.pdf_generator import texte_courses
+
+    liste = ListeCourse.query.get_or_404(id)
+
+    if liste.created_by != current_user.id:
+        flash('Vous n\'avez pas accès à cette liste', 'danger')
+        return redirect(url_for('courses.index'))
+
+    # Largeur du ticket en caractères (32 pour 58 mm, 42 pour 80 mm)
+    largeur = request.args.get('largeur', 42, type=int)
+    largeur = min(max(largeur, COLONNES_TEXTE_MIN), COLONNES_TEXTE_MAX)
+
+    rayons = liste.items_par_rayon(current_app.config['COURSES_ORDRE_RAYONS'])
+    response = current_app.response_class(
+        texte_courses(liste, rayons, largeur), mimetype='text/plain'
+    )
+    response.headers['Content-Disposition'] = 'inline'
+    return response
@@ -15,7 +15,7 @@ bp = Blueprint('inventaires', __name__, url_prefix='/inventaires')
 @login_required
 def index():
     """Liste des inventaires"""
-    inventaires = Inventaire.query.filter_by(created_by=current_user.id)\
+    inventaires = Inventaire.with_item_counts().filter(Inventaire.created_by == current_user.id)\
         .order_by(Inventaire.date_inventaire.desc()).all()
     return render_template('inventaires/index.html', inventaires=inventaires)
 
@@ -25,7 +25,7 @@ def index():
 def nouveau():
     """Formulaire de saisie d'un nouvel inventaire"""
     # Récupérer tous les stocks de l'utilisateur
-    stocks = Stock.query.filter_by(user_id=current_user.id).all()
+    stocks = Stock.for_user_with_ingredients(current_user.id).all()
 
     # Grouper les stocks par lieu de rangement
     stocks_par_lieu = defaultdict(list)
@@ -125,7 +125,7 @@ def sauvegarder():
 @login_required
 def detail(id):
     """Détail d'un inventaire"""
-    inventaire = Inventaire.query.get_or_404(id)
+    inventaire = Inventaire.with_items().get_or_404(id)
 
     if inventaire.created_by != current_user.id:
         flash('Accès non autorisé', 'danger')
@@ -133,7 +133,7 @@ def detail(id):
 
     # Grouper les items par lieu de rangement
     items_par_lieu = defaultdict(list)
-    for item in inventaire.items:
+    for item in inventaire.items_charges:
         lieu = item.ingredient.lieu_rangement or 'Non défini'
         items_par_lieu[lieu].append(item)
 
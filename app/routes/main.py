@@ -1,10 +1,13 @@
 """
 Routes principales de l'application
 """
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+import base64
+import json
+from datetime import datetime
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify
 from flask_login import current_user, login_required
-from app.models import Menu, Recette, ContactMessage
-from app import db
+from app.models import Menu, Recette, ContactMessage, recettes_favorites
+from app import db, fragments
 from app.decorators import admin_required
 
 bp = Blueprint('main', __name__)
@@ -29,12 +32,15 @@ def index():
                              menus_recents=menus_recents,
                              recettes_favorites=recettes_favorites)
     else:
-        # Récupérer les meilleures recettes publiques pour les visiteurs
+        # Meilleures recettes publiques pour les visiteurs : seule leur révision
+        # est lue, le carrousel n'est rendu que si l'une d'elles a changé
         top_recettes = Recette.query.filter_by(is_public=True)\
             .filter(Recette.evaluation >= 4)\
             .order_by(Recette.evaluation.desc(), Recette.created_at.desc())\
-            .limit(10).all()
-        return render_template('landing.html', top_recettes=top_recettes)
+            .limit(10)
+        revisions = top_recettes.with_entities(Recette.id, Recette.version, Recette.updated_at).all()
+        carrousel = fragments.carrousel_top_recettes(revisions, top_recettes.all)
+        return render_template('landing.html', carrousel_top_recettes=carrousel)
 
 
 @bp.route('/about')
@@ -168,14 +174,142 @@ def complete_contextual_onboarding(section):
     return {'success': True}, 200
 
 
+# Nombre de recettes par page de /explore
+RECETTES_PAR_PAGE = 24
+
+
+def _encoder_curseur(valeurs):
+    """Curseur opaque à partir des valeurs de la clé de tri de la dernière recette"""
+    brut = json.dumps(valeurs, default=lambda v: v.isoformat())
+    return base64.urlsafe_b64encode(brut.encode()).decode()
+
+
+def _valeur_curseur(valeur, nature):
+    """Valide une valeur décodée du curseur selon la colonne de tri (ValueError si invalide)"""
+    if nature == 'date' and isinstance(valeur, str):
+        return datetime.fromisoformat(valeur)
+    if isinstance(valeur, bool):
+        raise ValueError(valeur)
+    if nature == 'entier' and isinstance(valeur, int):
+        return valeur
+    if nature == 'nombre' and isinstance(valeur, (int, float)):
+        return valeur
+    raise ValueError(valeur)
+
+
+def _decoder_curseur(curseur, natures):
+    """
+    Valeurs de la clé de tri depuis un curseur
+
+    Args:
+        natures: Nature attendue de chaque valeur ('nombre', 'entier', 'date')
+
+    Returns:
+        Liste de valeurs, ou None si le curseur est invalide (retour à la première page)
+    """
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur.encode()))
+        if not isinstance(valeurs, list) or len(valeurs) != len(natures):
+            return None
+        return [_valeur_curseur(valeur, nature) for valeur, nature in zip(valeurs, natures)]
+    except (ValueError, TypeError):
+        return None
+
+
+def _page_explorer(query_term, curseur=None):
+    """
+    Page de recettes publiques par pagination à clé (keyset) :
+    tri (evaluation, created_at, id) décroissant, ou (rang BM25, id) en recherche.
+    Le coût ne dépend que de la taille de la page, pas du catalogue.
+
+    Returns:
+        Tuple (recettes, sauvegardees, curseur_suivant)
+        sauvegardees : IDs des recettes de la page sauvegardées par l'utilisateur
+    """
+    from app.recherche import filtrer_plein_texte
+
+    requete = Recette.query.filter_by(is_public=True)
+    rang = None
+    if query_term:
+        requete, rang = filtrer_plein_texte(requete, query_term)
+
+    if rang is not None:
+        # Les plus pertinentes d'abord
+        cle = [rang, Recette.id]
+        natures = ['nombre', 'entier']
+        ordre = [colonne.asc() for colonne in cle]
+    else:
+        cle = [Recette.evaluation, Recette.created_at, Recette.id]
+        natures = ['entier', 'date', 'entier']
+        ordre = [colonne.desc() for colonne in cle]
+
+    valeurs = _decoder_curseur(curseur, natures) if curseur else None
+    if valeurs is not None:
+        if rang is not None:
+            requete = requete.filter(db.tuple_(*cle) > db.tuple_(*valeurs))
+        else:
+            requete = requete.filter(db.tuple_(*cle) < db.tuple_(*valeurs))
+
+    lignes = requete.add_columns(*cle).order_by(*ordre).limit(RECETTES_PAR_PAGE + 1).all()
+
+    curseur_suivant = None
+    if len(lignes) > RECETTES_PAR_PAGE:
+        lignes = lignes[:RECETTES_PAR_PAGE]
+        curseur_suivant = _encoder_curseur(list(lignes[-1][1:]))
+
+    recettes = [ligne[0] for ligne in lignes]
+
+    # Recettes de la page déjà sauvegardées (une requête)
+    sauvegardees = set()
+    if current_user.is_authenticated and recettes:
+        sauvegardees = set(db.session.execute(
+            db.select(recettes_favorites.c.recette_id)
+            .where(recettes_favorites.c.user_id == current_user.id,
+                   recettes_favorites.c.recette_id.in_([recette.id for recette in recettes]))
+        ).scalars())
+
+    return recettes, sauvegardees, curseur_suivant
+
+
 @bp.route('/explore')
 def explore_recipes():
-    """Page pour explorer toutes les recettes publiques de la communauté"""
-    # Récupérer toutes les recettes publiques
-    recettes = Recette.query.filter_by(is_public=True)\
-        .order_by(Recette.evaluation.desc(), Recette.created_at.desc()).all()
-
-    return render_template('explore_recipes.html', recettes=recettes)
+    """Page pour explorer les recettes publiques de la communauté (première page)"""
+    query_term = request.args.get('q', '').strip()
+
+    recettes, sauvegardees, curseur_suivant = _page_explorer(query_term)
+
+    return render_template('explore_recipes.html',
+                         recettes=recettes,
+                         sauvegardees=sauvegardees,
+                         curseur_suivant=curseur_suivant,
+                         query_term=query_term)
+
+
+@bp.route('/explore/api')
+def explore_recipes_api():
+    """Page suivante de /explore en JSON (défilement infini)"""
+    query_term = request.args.get('q', '').strip()
+    curseur = request.args.get('curseur', '')
+
+    recettes, sauvegardees, curseur_suivant = _page_explorer(query_term, curseur or None)
+
+    return jsonify({
+        'recettes': [{
+            'id': recette.id,
+            'nom': recette.nom,
+            'evaluation': recette.evaluation,
+            'portions': recette.portions,
+            'temps_preparation': recette.temps_preparation,
+            'type_repas': recette.type_repas,
+            'auteur_nom': recette.auteur_nom,
+            'nb_ingredients': recette.nb_ingredients,
+            'nb_instructions': recette.nb_instructions,
+            'sauvegardee': recette.id in sauvegardees,
+            'html': render_template('explore_recipe_card.html', recette=recette,
+                                    sauvegardees=sauvegardees)
+        } for recette in recettes],
+        'curseur_suivant': curseur_suivant
+    })
 
 
 @bp.route('/profile')
@@ -266,6 +400,48 @@ def profile_change_password():
     return redirect(url_for('main.profile'))
 
 
+@bp.route('/profile/export')
+@login_required
+def profile_export():
+    """Télécharger toutes ses données (NDJSON produit en flux)"""
+    from flask import Response, stream_with_context
+    from app import sauvegarde
+
+    nom_fichier = f'iovag-export-{datetime.utcnow():%Y-%m-%d}.ndjson'
+    return Response(
+        stream_with_context(sauvegarde.exporter(current_user.id)),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{nom_fichier}"'}
+    )
+
+
+@bp.route('/profile/import', methods=['POST'])
+@login_required
+def profile_import():
+    """Restaurer un export dans son compte (compte sans données uniquement)"""
+    from app import sauvegarde
+
+    fichier = request.files.get('fichier')
+    if not fichier or not fichier.filename:
+        flash('Veuillez choisir un fichier d\'export', 'danger')
+        return redirect(url_for('main.profile'))
+
+    restauration = sauvegarde.Restauration(current_user)
+    try:
+        restauration.restaurer(sauvegarde.lire(fichier.stream))
+    except sauvegarde.RestaurationImpossible as e:
+        flash(str(e), 'danger')
+        return redirect(url_for('main.profile'))
+
+    flash(f'Données restaurées : {restauration.inserees["recette"]} recette(s), '
+          f'{restauration.inserees["menu"]} menu(s), {restauration.inserees["liste_course"]} liste(s) de courses, '
+          f'{restauration.inserees["stock"]} article(s) en stock', 'success')
+    if restauration.recettes_introuvables:
+        flash(f'{restauration.recettes_introuvables} recette(s) d\'autres membres introuvable(s) '
+              'sur ce site : retirée(s) des menus et favoris', 'warning')
+    return redirect(url_for('main.profile'))
+
+
 @bp.route('/profile/delete', methods=['POST'])
 @login_required
 def profile_delete():
@@ -403,26 +579,30 @@ def my_activity():
     """Page d'activité : recettes reprises et commentaires reçus"""
     from app.models import RecetteCommentaire, User
 
-    # Mes recettes
-    mes_recettes = Recette.query.filter_by(created_by=current_user.id).all()
-    mes_recettes_ids = [r.id for r in mes_recettes]
-
-    # Utilisateurs qui ont sauvegardé mes recettes
-    recettes_reprises = []
-    for recette in mes_recettes:
-        nb_sauvegardes = recette.utilisateurs_sauvegardes.count()
-        if nb_sauvegardes > 0:
-            utilisateurs = recette.utilisateurs_sauvegardes.all()
-            recettes_reprises.append({
-                'recette': recette,
-                'nb_sauvegardes': nb_sauvegardes,
-                'utilisateurs': utilisateurs
-            })
-
-    # Trier par nombre de sauvegardes (décroissant)
-    recettes_reprises.sort(key=lambda x: x['nb_sauvegardes'], reverse=True)
+    # Mes recettes sauvegardées par d'autres, triées par nombre de sauvegardes (décroissant)
+    mes_recettes_reprises = Recette.query.filter_by(created_by=current_user.id)\
+        .filter(Recette.nb_sauvegardes > 0)\
+        .order_by(Recette.nb_sauvegardes.desc())\
+        .all()
+
+    # Utilisateurs qui ont sauvegardé ces recettes (une requête)
+    utilisateurs_par_recette = {}
+    if mes_recettes_reprises:
+        lignes = db.session.query(recettes_favorites.c.recette_id, User)\
+            .join(User, User.id == recettes_favorites.c.user_id)\
+            .filter(recettes_favorites.c.recette_id.in_([r.id for r in mes_recettes_reprises]))\
+            .all()
+        for recette_id, utilisateur in lignes:
+            utilisateurs_par_recette.setdefault(recette_id, []).append(utilisateur)
+
+    recettes_reprises = [{
+        'recette': recette,
+        'nb_sauvegardes': recette.nb_sauvegardes,
+        'utilisateurs': utilisateurs_par_recette.get(recette.id, [])
+    } for recette in mes_recettes_reprises]
 
     # Commentaires reçus sur mes recettes
+    mes_recettes_ids = db.select(Recette.id).where(Recette.created_by == current_user.id)
     commentaires_recus = RecetteCommentaire.query\
         .filter(RecetteCommentaire.recette_id.in_(mes_recettes_ids))\
         .filter(RecetteCommentaire.user_id != current_user.id)\
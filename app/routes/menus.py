@@ -2,9 +2,10 @@
 Routes pour la gestion des menus
 """
 from datetime import datetime
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort
 from flask_login import login_required, current_user
-from app import db
+from app import db, taches
+from app.decorators import conditionnel
 from app.models import Menu, MenuJour, MenuGateau, Recette
 
 bp = Blueprint('menus', __name__, url_prefix='/menus')
@@ -14,16 +15,17 @@ bp = Blueprint('menus', __name__, url_prefix='/menus')
 @login_required
 def index():
     """Liste des menus"""
-    menus = Menu.query.filter_by(created_by=current_user.id)\
+    menus = Menu.with_meal_counts().filter(Menu.created_by == current_user.id)\
         .order_by(Menu.date_debut.desc()).all()
     return render_template('menus/index.html', menus=menus)
 
 
 @bp.route('/<int:id>')
 @login_required
+@conditionnel(lambda id: Menu.revision(id))
 def detail(id):
     """Détail d'un menu"""
-    menu = Menu.query.get_or_404(id)
+    menu = Menu.with_full_week().get_or_404(id)
     return render_template('menus/detail.html', menu=menu)
 
 
@@ -172,6 +174,11 @@ def delete(id):
     menu = Menu.query.get_or_404(id)
     db.session.delete(menu)
     db.session.commit()
+
+    # Livre de recettes en cache devenu inutile
+    from app.pdf_cache import purger
+    purger(f'menu-{id}')
+
     flash('Menu supprimé avec succès', 'success')
     return redirect(url_for('menus.index'))
 
@@ -181,7 +188,39 @@ def delete(id):
 def generer_courses(id):
     """Générer la liste de courses pour un menu"""
     menu = Menu.query.get_or_404(id)
-    liste_course = menu.generer_liste_courses()
-    db.session.commit()
-    flash('Liste de courses générée avec succès', 'success')
-    return redirect(url_for('courses.detail', id=liste_course.id))
+
+    # Génération en tâche de fond : la page d'attente mène à la liste une fois prête
+    tache = taches.enfiler('generer_courses', created_by=current_user.id, menu_id=menu.id)
+    return taches.suivre(tache)
+
+
+@bp.route('/<int:id>/pdf')
+@login_required
+def telecharger_pdf(id):
+    """Télécharger le livre de recettes d'un menu en PDF"""
+    from flask import send_file
+    from app.pdf_cache import pdf_menu
+
+    menu = Menu.query.get_or_404(id)
+
+    # Le livre contient les recettes privées de l'auteur du menu
+    if menu.created_by != current_user.id:
+        abort(403)
+
+    # PDF en cache pour cette révision, envoyé par morceaux depuis le disque ;
+    # sinon mis en page en tâche de fond, la page d'attente revient ici une fois prêt
+    chemin_pdf = pdf_menu(menu, en_cache_seulement=True)
+    if chemin_pdf is None:
+        tache = taches.enfiler('pdf_menu', created_by=current_user.id, menu_id=menu.id)
+        if tache.statut != 'terminee':
+            return taches.suivre(tache)
+        chemin_pdf = pdf_menu(menu)
+
+    filename = f"menu_{menu.nom.replace(' ', '_')}.pdf"
+
+    return send_file(
+        chemin_pdf,
+        mimetype='application/pdf',
+        as_attachment=True,
+        download_name=filename
+    )
@@ -2,13 +2,18 @@
 Routes pour la gestion des recettes
 """
 from datetime import datetime
+import click
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
-from app import db
+from app import db, recherche
+from app.decorators import conditionnel
 from app.models import Recette, Ingredient, RecetteIngredient, Instruction, RecetteCommentaire
 
 bp = Blueprint('recettes', __name__, url_prefix='/recettes')
 
+# Portions acceptées pour l'export PDF
+PORTIONS_PDF_MAX = 50
+
 
 @bp.route('/')
 @login_required
@@ -32,88 +37,29 @@ def saved():
 @login_required
 def possibles():
     """Liste des recettes possibles avec le stock actuel"""
-    from app.models import Stock, UnitConverter
-    import math
-
-    # Récupérer toutes les recettes de l'utilisateur
-    recettes = Recette.query.filter_by(created_by=current_user.id).all()
-
-    recettes_possibles = []
-
-    for recette in recettes:
-        # Calculer combien de fois on peut faire cette recette
-        ratio_min = float('inf')
-        ingredients_manquants = []
-        tous_ingredients_disponibles = True
-
-        for ri in recette.ingredients:
-            # Chercher le stock pour cet ingrédient
-            stock_item = Stock.query.filter_by(
-                user_id=current_user.id,
-                ingredient_id=ri.ingredient.id
-            ).first()
-
-            if not stock_item or stock_item.quantite <= 0:
-                tous_ingredients_disponibles = False
-                ingredients_manquants.append(ri.ingredient.nom)
-                ratio_min = 0
-            else:
-                # Normaliser les unités pour comparer
-                stock_normalise, stock_unite = UnitConverter.normaliser(
-                    stock_item.quantite, stock_item.unite, ri.ingredient
-                )
-                ingredient_normalise, ingredient_unite = UnitConverter.normaliser(
-                    ri.quantite, ri.unite, ri.ingredient
-                )
+    from app.faisabilite import get_recettes_possibles
 
-                # Si les unités sont compatibles
-                if stock_unite == ingredient_unite:
-                    # Calculer combien de fois on peut faire la recette avec cet ingrédient
-                    ratio = stock_normalise / ingredient_normalise
-                    ratio_min = min(ratio_min, ratio)
-                else:
-                    # Unités incompatibles
-                    tous_ingredients_disponibles = False
-                    ingredients_manquants.append(ri.ingredient.nom)
-                    ratio_min = 0
-
-        # Si ratio_min est toujours infini, la recette n'a pas d'ingrédients
-        if ratio_min == float('inf'):
-            ratio_min = 0
-
-        # Calculer le nombre de portions max (arrondi à l'entier inférieur)
-        portions_max = int(math.floor(ratio_min * recette.portions))
-
-        # Ajouter à la liste si on peut faire au moins 1 portion
-        if portions_max > 0:
-            recettes_possibles.append({
-                'recette': recette,
-                'portions_max': portions_max,
-                'ratio': ratio_min,
-                'tous_ingredients': tous_ingredients_disponibles
-            })
-
-    # Trier par nombre de portions max (décroissant)
-    recettes_possibles.sort(key=lambda x: x['portions_max'], reverse=True)
+    recettes_possibles = get_recettes_possibles(current_user.id)
 
     return render_template('recettes/possibles.html', recettes_possibles=recettes_possibles)
 
 
 @bp.route('/<int:id>')
 @login_required
+@conditionnel(lambda id: Recette.revision(id, current_user.id))
 def detail(id):
     """Détail d'une recette"""
-    from app.models import Stock, UnitConverter
+    from app.models import StockSnapshot, UnitConverter
 
-    recette = Recette.query.get_or_404(id)
+    recette = Recette.with_details().get_or_404(id)
+
+    # Stock de l'utilisateur pour les ingrédients de la recette (une requête)
+    snapshot = StockSnapshot(current_user.id, {ri.ingredient_id for ri in recette.ingredients_charges})
 
     # Calculer le stock disponible pour chaque ingrédient
     stock_info = {}
-    for ri in recette.ingredients:
-        stock_item = Stock.query.filter_by(
-            user_id=current_user.id,
-            ingredient_id=ri.ingredient.id
-        ).first()
+    for ri in recette.ingredients_charges:
+        stock_item = snapshot.get_stock(ri.ingredient)
 
         if stock_item and stock_item.quantite > 0:
             # Normaliser pour comparer
@@ -137,7 +83,13 @@ def detail(id):
         else:
             stock_info[ri.id] = {'en_stock': False, 'quantite_stock': 0, 'unite_stock': ''}
 
-    return render_template('recettes/detail.html', recette=recette, stock_info=stock_info)
+    # Commentaires avec leur auteur (une requête)
+    commentaires = RecetteCommentaire.query.filter_by(recette_id=recette.id)\
+        .options(db.joinedload(RecetteCommentaire.utilisateur))\
+        .all()
+
+    return render_template('recettes/detail.html', recette=recette, stock_info=stock_info,
+                           commentaires=commentaires)
 
 
 @bp.route('/create', methods=['GET', 'POST'])
@@ -229,6 +181,7 @@ def create():
                 db.session.add(instruction)
 
         db.session.commit()
+        recherche.mettre_a_jour_recette(recette)
         flash('Recette créée avec succès', 'success')
         return redirect(url_for('recettes.detail', id=recette.id))
 
@@ -316,6 +269,7 @@ def edit(id):
                 db.session.add(instruction)
 
         db.session.commit()
+        recherche.mettre_a_jour_recette(recette)
         flash('Recette modifiée avec succès', 'success')
         return redirect(url_for('recettes.detail', id=recette.id))
 
@@ -337,6 +291,7 @@ def delete(id):
 
     db.session.delete(recette)
     db.session.commit()
+    recherche.retirer_recette(id)
     flash('Recette supprimée avec succès', 'success')
     return redirect(url_for('recettes.index'))
 
@@ -365,6 +320,7 @@ def save_recipe(id):
     # Ajouter aux favoris
     current_user.recettes_sauvegardees.append(recette)
     db.session.commit()
+    recherche.mettre_a_jour_sauvegarde(current_user.id, recette.id, True)
     flash(f'Recette "{recette.nom}" ajoutée à votre catalogue !', 'success')
     return redirect(url_for('recettes.detail', id=id))
 
@@ -381,6 +337,7 @@ def unsave_recipe(id):
 
     current_user.recettes_sauvegardees.remove(recette)
     db.session.commit()
+    recherche.mettre_a_jour_sauvegarde(current_user.id, recette.id, False)
     flash(f'Recette "{recette.nom}" retirée de votre catalogue.', 'success')
     return redirect(url_for('recettes.saved'))
 
@@ -414,30 +371,35 @@ def api_search():
         except ValueError:
             pass
 
-    # Récupérer toutes les recettes de l'utilisateur + recettes sauvegardées
-    recettes_perso = Recette.query.filter_by(created_by=current_user.id).all()
-    recettes_sauvegardees = current_user.recettes_sauvegardees.all()
-    recettes = recettes_perso + recettes_sauvegardees
+    # Récupérer les recettes du menu existant (une seule fois, pas par candidat)
+    if menu_id:
+        recettes_dans_menu |= recherche.get_recettes_menu(menu_id)
 
-    resultats = []
+    # Index en mémoire des recettes de l'utilisateur + recettes sauvegardées
+    index = recherche.get_index(current_user.id)
 
-    for recette in recettes:
-        # Filtrer par terme de recherche (nom ou ingrédient)
-        if query_term:
-            match_nom = query_term.lower() in recette.nom.lower()
-            match_ingredient = any(
-                query_term.lower() in ri.ingredient.nom.lower()
-                for ri in recette.ingredients
-            )
+    # Filtrer par terme de recherche (nom ou ingrédient)
+    recettes = index.rechercher(query_term)
 
-            if not (match_nom or match_ingredient):
-                continue
+    # Ingrédients des recettes du menu sous forme de bitset
+    ingredients_menu = index.bitset_ingredients(recettes_dans_menu) if recettes_dans_menu else 0
+
+    mois_noms = ['', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
+                 'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
+    mois_nom_actuel = mois_noms[mois_actuel]
+
+    type_repas_map = {
+        'petit_dejeuner': 'Petit-déjeuner',
+        'dejeuner': 'Déjeuner',
+        'gouter': 'Goûter',
+        'diner': 'Dîner'
+    }
+
+    resultats = []
 
+    for recette in recettes:
         # Déterminer le statut de saison
-        mois_saison_list = recette.get_mois_saison_list()
-        mois_noms = ['', 'Janvier', 'Février', 'Mars', 'Avril', 'Mai', 'Juin',
-                     'Juillet', 'Août', 'Septembre', 'Octobre', 'Novembre', 'Décembre']
-        mois_nom_actuel = mois_noms[mois_actuel]
+        mois_saison_list = recette.mois_saison
 
         if not mois_saison_list:
             statut_saison = 'toute_saison'
@@ -455,24 +417,8 @@ def api_search():
         # Calculer le score de pertinence et les raisons
         score_pertinence = 0
         raisons = []
-        ingredients_communs_noms = []
         nb_communs = 0
 
-        # Récupérer les recettes du menu (soit depuis menu_id, soit depuis recettes_menu)
-        if menu_id:
-            from app.models import Menu, Ingredient
-            menu = Menu.query.get(menu_id)
-            if menu:
-                for jour in menu.jours:
-                    if jour.petit_dejeuner_id:
-                        recettes_dans_menu.add(jour.petit_dejeuner_id)
-                    if jour.dejeuner_id:
-                        recettes_dans_menu.add(jour.dejeuner_id)
-                    if jour.gouter_id:
-                        recettes_dans_menu.add(jour.gouter_id)
-                    if jour.diner_id:
-                        recettes_dans_menu.add(jour.diner_id)
-
         # Si on a des recettes dans le menu (édition ou création)
         if recettes_dans_menu:
             # Recette déjà dans le menu = score élevé
@@ -480,24 +426,12 @@ def api_search():
                 score_pertinence += 1000  # Très haut score
                 raisons.append('Déjà dans le menu')
 
-            # Ingrédients en commun avec les recettes du menu
-            ingredients_menu = set()
-            ingredients_menu_dict = {}  # Pour récupérer les noms
-            for recette_id in recettes_dans_menu:
-                r = Recette.query.get(recette_id)
-                if r:
-                    for ri in r.ingredients:
-                        ingredients_menu.add(ri.ingredient_id)
-                        ingredients_menu_dict[ri.ingredient_id] = ri.ingredient.nom
-
-            ingredients_recette = set(ri.ingredient_id for ri in recette.ingredients)
-            ingredients_communs_ids = ingredients_menu.intersection(ingredients_recette)
-            nb_communs = len(ingredients_communs_ids)
+            # Ingrédients en commun avec les recettes du menu (ET binaire)
+            nb_communs = bin(recette.bitset & ingredients_menu).count('1')
 
             if nb_communs > 0:
                 score_pertinence += nb_communs * 10
-                # Récupérer les noms des ingrédients communs
-                ingredients_communs_noms = [ingredients_menu_dict[ing_id] for ing_id in ingredients_communs_ids]
+                ingredients_communs_noms = recette.ingredients_communs(ingredients_menu)
                 if nb_communs == 1:
                     raisons.append(f'1 ingrédient commun: {ingredients_communs_noms[0]}')
                 elif nb_communs <= 3:
@@ -512,15 +446,8 @@ def api_search():
             score_pertinence += 25
 
         # Bonus si correspond au type de repas
-        if type_repas:
-            type_repas_map = {
-                'petit_dejeuner': 'Petit-déjeuner',
-                'dejeuner': 'Déjeuner',
-                'gouter': 'Goûter',
-                'diner': 'Dîner'
-            }
-            if type_repas_map.get(type_repas) in recette.get_type_repas_list():
-                score_pertinence += 30
+        if type_repas and type_repas_map.get(type_repas) in recette.type_repas:
+            score_pertinence += 30
 
         resultats.append({
             'id': recette.id,
@@ -532,7 +459,7 @@ def api_search():
             'icone_saison': icone_saison,
             'couleur_saison': couleur_saison,
             'mois_saison': ', '.join(mois_saison_list) if mois_saison_list else 'Toute l\'année',
-            'nb_ingredients': recette.ingredients.count(),
+            'nb_ingredients': len(recette.ingredients),
             'score_pertinence': score_pertinence,
             'raisons': raisons,
             'est_recommandee': len(raisons) > 0,
@@ -691,7 +618,7 @@ def cuisiner(id):
 def telecharger_pdf(id):
     """Télécharger une recette en PDF"""
     from flask import send_file
-    from app.pdf_generator import generer_pdf_recette
+    from app.pdf_cache import pdf_recette
 
     recette = Recette.query.get_or_404(id)
 
@@ -700,17 +627,19 @@ def telecharger_pdf(id):
         flash('Vous n\'avez pas accès à cette recette', 'danger')
         return redirect(url_for('recettes.index'))
 
-    # Nombre de portions depuis les paramètres GET (optionnel)
+    # Nombre de portions depuis les paramètres GET (optionnel, borné : une entrée de cache par valeur)
     portions = request.args.get('portions', type=int)
+    if portions is not None and not 1 <= portions <= PORTIONS_PDF_MAX:
+        portions = None
 
-    # Générer le PDF
-    pdf_buffer = generer_pdf_recette(recette, portions)
+    # PDF en cache pour cette révision (mis en page seulement s'il n'existe pas encore)
+    chemin_pdf = pdf_recette(recette, portions)
 
     # Nom du fichier
     filename = f"recette_{recette.nom.replace(' ', '_')}.pdf"
 
     return send_file(
-        pdf_buffer,
+        chemin_pdf,
         mimetype='application/pdf',
         as_attachment=True,
         download_name=filename
@@ -779,3 +708,66 @@ def format_texte(id):
         texte += recette.notes + "\n"
 
     return jsonify({'texte': texte})
+
+
+@bp.cli.command('reindexer')
+def reindexer():
+    """Reconstruit l'index plein texte des recettes (FTS5)"""
+    connexion = db.session.connection()
+    if not recherche.plein_texte_disponible(connexion):
+        click.echo('Index plein texte indisponible (base non SQLite ou migration non appliquée)')
+        return
+
+    recherche.indexer_plein_texte(connexion)
+    db.session.commit()
+    click.echo(f'{Recette.query.count()} recettes indexées')
+
+
+@bp.cli.command('import')
+@click.argument('fichier', type=click.Path(exists=True, dir_okay=False))
+@click.option('--auteur', required=True, help='Email du propriétaire des recettes importées')
+@click.option('--format', 'format_fichier', type=click.Choice(['auto', 'jsonl', 'csv', 'texte']),
+              default='auto', show_default=True, help='Format du fichier (auto = selon l\'extension)')
+@click.option('--lot', 'taille_lot', type=click.IntRange(min=1), default=500, show_default=True,
+              help='Recettes insérées par transaction')
+@click.option('--prive', is_flag=True, help='Recettes privées (publiques par défaut)')
+def importer(fichier, auteur, format_fichier, taille_lot, prive):
+    """Importe des recettes en masse depuis un fichier JSONL, CSV ou texte"""
+    import os
+    import time
+    from app.import_recettes import FORMATS_PAR_EXTENSION, LECTEURS, Importeur
+    from app.models import User
+
+    user = User.query.filter_by(email=auteur).first()
+    if user is None:
+        raise click.ClickException(f'Utilisateur introuvable : {auteur}')
+
+    if format_fichier == 'auto':
+        format_fichier = FORMATS_PAR_EXTENSION.get(os.path.splitext(fichier)[1].lower())
+        if format_fichier is None:
+            raise click.ClickException('Format inconnu, préciser --format jsonl, csv ou texte')
+
+    importeur = Importeur(user.id, is_public=not prive)
+    debut = time.perf_counter()
+    with open(fichier, encoding='utf-8-sig', newline='') as flux:
+        try:
+            for numero, (importees, duree) in enumerate(importeur.importer(LECTEURS[format_fichier](flux),
+                                                                           taille_lot), start=1):
+                click.echo(f'Lot {numero} : {importees} recettes en {duree:.2f} s '
+                           f'({importees / duree if duree else 0:.0f} recettes/s)')
+        except Exception as e:
+            raise click.ClickException(f'Import interrompu ({importeur.importees} recettes déjà importées, '
+                                       f'relancer la commande pour reprendre) : {e}')
+    duree = time.perf_counter() - debut
+
+    resolveur = importeur.resolveur
+    click.echo(f'{importeur.importees} recettes importées en {duree:.1f} s '
+               f'({importeur.importees / duree if duree else 0:.0f} recettes/s)')
+    click.echo(f'{importeur.ignorees} déjà présentes, {importeur.invalides} invalides, '
+               f'{len(resolveur.crees)} ingrédients créés, {len(resolveur.approches)} noms rapprochés')
+    for nom, nom_catalogue in sorted(resolveur.approches.items()):
+        click.echo(f'  {nom} -> {nom_catalogue}')
+    if resolveur.crees:
+        click.echo(f'Ingrédients créés (catégorie Autre, à vérifier) : {", ".join(sorted(resolveur.crees))}')
+    for numero, message in importeur.erreurs:
+        click.echo(f'  ligne {numero} : {message}', err=True)
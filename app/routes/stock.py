@@ -52,8 +52,7 @@ def est_stock_bas(stock_item):
 def index():
     """Liste du stock avec filtres"""
     # Récupérer tous les stocks de l'utilisateur
-    stocks = Stock.query.filter_by(user_id=current_user.id)\
-        .join(Ingredient)\
+    stocks = Stock.for_user_with_ingredients(current_user.id)\
         .order_by(Ingredient.nom)\
         .all()
 
@@ -71,8 +70,7 @@ def index():
 def par_lieu():
     """Vue du stock organisée par lieu de rangement"""
     # Récupérer tous les stocks avec leurs ingrédients
-    stocks = Stock.query.filter_by(user_id=current_user.id)\
-        .join(Ingredient)\
+    stocks = Stock.for_user_with_ingredients(current_user.id)\
         .order_by(Ingredient.lieu_rangement, Ingredient.nom)\
         .all()
 
@@ -191,9 +189,7 @@ def delete(id):
 @login_required
 def nb_stock_bas():
     """Retourner le nombre d'articles en stock bas (pour le badge)"""
-    stocks = Stock.query.filter_by(user_id=current_user.id)\
-        .join(Ingredient)\
-        .all()
+    stocks = Stock.for_user_with_ingredients(current_user.id).all()
 
     nb = sum(1 for s in stocks if est_stock_bas(s))
     return jsonify({'nb_stock_bas': nb})
@@ -0,0 +1,43 @@
+"""
+Routes de suivi des tâches de fond (pages d'attente et état en JSON)
+"""
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from app import db, taches
+from app.models import Tache
+
+bp = Blueprint('taches', __name__, url_prefix='/taches')
+
+
+def _tache_de_l_utilisateur(id):
+    """Tâche de l'utilisateur connecté (None si elle n'existe pas ou appartient à un autre)"""
+    tache = db.session.get(Tache, id)
+    if tache is None or tache.created_by != current_user.id:
+        return None
+    return tache
+
+
+@bp.route('/<int:id>')
+@login_required
+def etat(id):
+    """État d'une tâche (AJAX, interrogé par la page d'attente)"""
+    tache = _tache_de_l_utilisateur(id)
+    if tache is None:
+        return jsonify({'success': False, 'error': 'Tâche introuvable'}), 404
+
+    return jsonify({'success': True, **tache.to_dict(), 'redirection': taches.redirection(tache)})
+
+
+@bp.route('/<int:id>/attente')
+@login_required
+def attente(id):
+    """Page d'attente d'une tâche, redirige vers le résultat une fois terminée"""
+    tache = _tache_de_l_utilisateur(id)
+    if tache is None:
+        flash('Tâche introuvable', 'danger')
+        return redirect(url_for('main.index'))
+
+    if taches.redirection(tache) is not None:
+        return taches.suivre(tache)
+
+    return render_template('taches/attente.html', tache=tache)
@@ -4,7 +4,7 @@ Routes pour la gestion des unités et conversions
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required
 from app import db
-from app.models import Unite, IngredientConversionUnite, Ingredient
+from app.models import Unite, IngredientConversionUnite, Ingredient, UnitConverter
 from app.decorators import admin_required
 
 bp = Blueprint('unites', __name__, url_prefix='/unites')
@@ -58,6 +58,7 @@ def create():
 
         db.session.add(nouvelle_unite)
         db.session.commit()
+        UnitConverter.signaler_modification(unites=[nouvelle_unite.id])
 
         flash(f'Unité "{nom}" créée avec succès', 'success')
         return redirect(url_for('unites.index'))
@@ -100,6 +101,7 @@ def edit(id):
         unite.description = description if description else None
 
         db.session.commit()
+        UnitConverter.signaler_modification(unites=[id])
 
         flash(f'Unité "{nom}" modifiée avec succès', 'success')
         return redirect(url_for('unites.index'))
@@ -125,6 +127,7 @@ def delete(id):
     nom = unite.nom
     db.session.delete(unite)
     db.session.commit()
+    UnitConverter.signaler_modification(unites=[id])
 
     flash(f'Unité "{nom}" supprimée avec succès', 'success')
     return redirect(url_for('unites.index'))
@@ -179,6 +182,7 @@ def conversion_create():
 
         db.session.add(nouvelle_conversion)
         db.session.commit()
+        UnitConverter.signaler_modification(conversions=[nouvelle_conversion.id])
 
         flash('Conversion créée avec succès', 'success')
         return redirect(url_for('unites.conversions'))
@@ -211,6 +215,7 @@ def conversion_edit(id):
         conversion.notes = notes if notes else None
 
         db.session.commit()
+        UnitConverter.signaler_modification(conversions=[id])
 
         flash('Conversion modifiée avec succès', 'success')
         return redirect(url_for('unites.conversions'))
@@ -228,6 +233,7 @@ def conversion_delete(id):
 
     db.session.delete(conversion)
     db.session.commit()
+    UnitConverter.signaler_modification(conversions=[id])
 
     flash('Conversion supprimée avec succès', 'success')
     return redirect(url_for('unites.conversions'))
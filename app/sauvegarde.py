@@ -0,0 +1,484 @@
+"""
+Sauvegarde et restauration des données d'un utilisateur (NDJSON)
+
+Un objet JSON par ligne : un en-tête, puis les lignes de chaque table
+(champ "_type") dans l'ordre de SECTIONS, puis une ligne de fin. Les IDs
+exportés ne servent qu'à relier les lignes entre elles : la restauration
+crée de nouveaux IDs, ce qui permet de passer d'une instance à une autre.
+Une référence à une ligne absente du fichier le rend invalide ; seules les
+recettes d'autres membres introuvables sur l'instance sont retirées.
+
+L'export est lu en flux (yield_per) dans une seule transaction de lecture
+(BEGIN explicite sous SQLite), donc cohérent même si l'utilisateur modifie
+ses données pendant le téléchargement ; la mémoire ne dépend pas du volume
+exporté.
+
+    flask --app run export moi@exemple.fr -o sauvegarde.ndjson
+    flask --app run restaurer sauvegarde.ndjson --email moi@exemple.fr
+"""
+import json
+from datetime import date, datetime
+from sqlalchemy.exc import StatementError
+from app import db, recherche
+from app.models import (Ingredient, Instruction, Inventaire, InventaireItem, ListeCourse, ListeCourseItem,
+                        Menu, MenuGateau, MenuJour, Recette, RecetteIngredient, Stock, User,
+                        inserer_lignes, recettes_favorites)
+
+
+FORMAT = 'iovag-ndjson'
+VERSION_FORMAT = 1
+
+# Lignes lues par requête à l'export, et insérées d'un coup à la restauration
+TAILLE_LOT = 500
+
+# Sections dans l'ordre du fichier (parents avant enfants) :
+# (type, modèle ou table, colonne propriétaire, références colonne -> type référencé)
+# Une section sans propriétaire appartient à l'utilisateur via sa première référence.
+SECTIONS = [
+    ('ingredient', Ingredient, None, {}),
+    ('recette_externe', Recette, None, {}),
+    ('recette', Recette, 'created_by', {}),
+    ('recette_ingredient', RecetteIngredient, None, {'recette_id': 'recette', 'ingredient_id': 'ingredient'}),
+    ('instruction', Instruction, None, {'recette_id': 'recette'}),
+    ('favori', recettes_favorites, 'user_id', {'recette_id': 'recette'}),
+    ('menu', Menu, 'created_by', {}),
+    ('menu_jour', MenuJour, None, {'menu_id': 'menu', 'petit_dejeuner_id': 'recette', 'dejeuner_id': 'recette',
+                                   'gouter_id': 'recette', 'diner_id': 'recette'}),
+    ('menu_gateau', MenuGateau, None, {'menu_id': 'menu', 'recette_id': 'recette'}),
+    ('liste_course', ListeCourse, 'created_by', {'menu_id': 'menu'}),
+    ('liste_course_item', ListeCourseItem, None, {'liste_id': 'liste_course', 'ingredient_id': 'ingredient'}),
+    ('stock', Stock, 'user_id', {'ingredient_id': 'ingredient'}),
+    ('inventaire', Inventaire, 'created_by', {}),
+    ('inventaire_item', InventaireItem, None, {'inventaire_id': 'inventaire', 'ingredient_id': 'ingredient'}),
+]
+_SECTIONS = {section[0]: section for section in SECTIONS}
+
+# Sections référencées par d'autres : leurs nouveaux IDs sont gardés à la restauration
+PARENTS = {reference for _, _, _, references in SECTIONS for reference in references.values()}
+
+# Compteurs dénormalisés, non exportés : comptés pendant la restauration
+# type enfant -> (colonne du parent, type parent, compteur -> colonne booléenne filtrante)
+COMPTEURS = {
+    'recette_ingredient': ('recette_id', 'recette', {'nb_ingredients': None}),
+    'instruction': ('recette_id', 'recette', {'nb_instructions': None}),
+    'favori': ('recette_id', 'recette', {'nb_sauvegardes': None}),
+    'liste_course_item': ('liste_id', 'liste_course', {'nb_items': None, 'nb_achetes': 'achete'}),
+}
+COLONNES_DERIVEES = {compteur for _, _, compteurs in COMPTEURS.values() for compteur in compteurs}
+
+
+class RestaurationImpossible(Exception):
+    """Fichier invalide ou compte cible déjà utilisé (rien n'est enregistré)"""
+
+
+def _table(modele):
+    return getattr(modele, '__table__', modele)
+
+
+def _valeur_json(valeur):
+    if isinstance(valeur, (datetime, date)):
+        return valeur.isoformat()
+    raise TypeError(f'Valeur non sérialisable : {valeur!r}')
+
+
+def _ligne(objet):
+    return json.dumps(objet, ensure_ascii=False, default=_valeur_json) + '\n'
+
+
+def _ids_possedes(type_section, user_id):
+    """Sous-requête des IDs d'une section appartenant à l'utilisateur"""
+    _, modele, proprietaire, references = _SECTIONS[type_section]
+    table = _table(modele)
+    if proprietaire is not None:
+        return db.select(table.c.id).where(table.c[proprietaire] == user_id)
+    colonne, parent = next(iter(references.items()))
+    return db.select(table.c.id).where(table.c[colonne].in_(_ids_possedes(parent, user_id)))
+
+
+def _filtre(type_section, user_id):
+    """Condition des lignes d'une section appartenant à l'utilisateur"""
+    _, modele, proprietaire, references = _SECTIONS[type_section]
+    table = _table(modele)
+    if proprietaire is not None:
+        return table.c[proprietaire] == user_id
+    colonne, parent = next(iter(references.items()))
+    return table.c[colonne].in_(_ids_possedes(parent, user_id))
+
+
+def _references_vers(type_reference, user_id):
+    """Union des valeurs des colonnes qui référencent `type_reference` dans les données de l'utilisateur"""
+    requetes = []
+    for type_section, modele, _, references in SECTIONS:
+        for colonne, reference in references.items():
+            if reference == type_reference and type_section != 'recette_externe':
+                table = _table(modele)
+                requetes.append(db.select(table.c[colonne].label('id'))
+                                .where(_filtre(type_section, user_id), table.c[colonne].isnot(None)))
+    return db.union(*requetes)
+
+
+def _requete(type_section, user_id):
+    """SELECT des lignes exportées d'une section"""
+    _, modele, proprietaire, _ = _SECTIONS[type_section]
+    table = _table(modele)
+
+    if type_section == 'ingredient':
+        condition = table.c.id.in_(_references_vers('ingredient', user_id))
+    elif type_section == 'recette_externe':
+        # Recettes d'autres membres planifiées ou sauvegardées : exportées par leur nom
+        return db.select(Recette.id, Recette.nom, User.username.label('auteur'))\
+            .join(User, User.id == Recette.created_by)\
+            .where(Recette.id.in_(_references_vers('recette', user_id)), Recette.created_by != user_id)\
+            .order_by(Recette.id)
+    else:
+        condition = _filtre(type_section, user_id)
+
+    colonnes = [colonne for colonne in table.columns
+                if colonne.name != proprietaire and colonne.name not in COLONNES_DERIVEES]
+    requete = db.select(*colonnes).where(condition)
+    if 'id' in table.c:
+        requete = requete.order_by(table.c.id)
+    return requete
+
+
+def _ouvrir_transaction_de_lecture():
+    """
+    Démarre une transaction dont toutes les lectures voient le même état de
+    la base (à terminer par db.session.rollback())
+    """
+    db.session.commit()  # Termine la transaction implicite de la requête
+    connexion = db.session.connection()
+    if connexion.dialect.name == 'sqlite':
+        # pysqlite n'ouvre une transaction qu'avant une écriture : sans BEGIN,
+        # chaque SELECT lirait un état différent de la base
+        connexion.exec_driver_sql('BEGIN')
+    else:
+        connexion.exec_driver_sql('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+
+def exporter(user_id):
+    """
+    Générateur des lignes NDJSON des données d'un utilisateur
+
+    Chaque section est lue par lots de TAILLE_LOT lignes : la mémoire reste
+    constante quel que soit le volume (réponse en flux ou fichier). Toutes
+    les sections sont lues dans la même transaction, jusqu'à la ligne de fin.
+    """
+    _ouvrir_transaction_de_lecture()
+    try:
+        user = db.session.get(User, user_id)
+        yield _ligne({
+            '_type': 'entete', 'format': FORMAT, 'version': VERSION_FORMAT,
+            'exporte_le': datetime.utcnow(), 'utilisateur': {'username': user.username, 'email': user.email}
+        })
+
+        lignes = 0
+        for type_section, _, _, _ in SECTIONS:
+            resultat = db.session.execute(_requete(type_section, user_id).execution_options(yield_per=TAILLE_LOT))
+            for ligne in resultat.mappings():
+                yield _ligne({'_type': type_section, **ligne})
+                lignes += 1
+
+        yield _ligne({'_type': 'fin', 'lignes': lignes})
+    finally:
+        # Libère l'instantané (en WAL, il empêche les checkpoints), y compris
+        # si le téléchargement est interrompu
+        db.session.rollback()
+
+
+def lire(flux):
+    """Couples (numéro de ligne, objet) d'un flux NDJSON (texte ou octets), lignes vides ignorées"""
+    for numero, ligne in enumerate(flux, 1):
+        if isinstance(ligne, bytes):
+            try:
+                ligne = ligne.decode('utf-8')
+            except UnicodeDecodeError:
+                raise RestaurationImpossible(f'Ligne {numero} : texte non UTF-8')
+        ligne = ligne.strip()
+        if not ligne:
+            continue
+        try:
+            objet = json.loads(ligne)
+        except ValueError as e:
+            raise RestaurationImpossible(f'Ligne {numero} : JSON invalide ({e})')
+        if not isinstance(objet, dict) or '_type' not in objet:
+            raise RestaurationImpossible(f'Ligne {numero} : objet sans _type')
+        yield numero, objet
+
+
+def _ligne_invalide(numero, type_section, erreur):
+    """Erreur de restauration pour une ligne du fichier mal formée"""
+    if isinstance(erreur, KeyError):
+        detail = f'champ {erreur} manquant'
+    else:
+        detail = str(erreur)
+    return RestaurationImpossible(f'Ligne {numero} ({type_section}) invalide : {detail}')
+
+
+def _identifiant(ligne, cle='id'):
+    """Valeur entière d'un champ d'identifiant (ValueError sinon)"""
+    valeur = ligne.get(cle)
+    if not isinstance(valeur, int) or isinstance(valeur, bool):
+        raise ValueError(f'{cle} doit être un entier')
+    return valeur
+
+
+def _nom(ligne):
+    """Nom d'un ingrédient ou d'une recette externe (ValueError sinon)"""
+    if not isinstance(ligne.get('nom'), str) or not ligne['nom']:
+        raise ValueError('nom manquant ou invalide')
+    return ligne['nom']
+
+
+def _convertisseurs(table):
+    """Colonne -> fonction de lecture des dates sérialisées en ISO 8601"""
+    convertisseurs = {}
+    for colonne in table.columns:
+        if isinstance(colonne.type, db.DateTime):
+            convertisseurs[colonne.name] = datetime.fromisoformat
+        elif isinstance(colonne.type, db.Date):
+            convertisseurs[colonne.name] = date.fromisoformat
+    return convertisseurs
+
+
+class Restauration:
+    """
+    Restaure un fichier d'export dans le compte d'un utilisateur sans données
+
+    Les lignes consécutives d'une même section sont insérées par lots
+    (bulk_insert_mappings) ; les IDs du fichier sont traduits vers les
+    nouveaux IDs au fil de l'eau. Tout est validé en une transaction.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.ids = {type_section: {} for type_section in _SECTIONS}  # type -> ID du fichier -> nouvel ID
+        self.inserees = {type_section: 0 for type_section in _SECTIONS}
+        self.ignorees = 0  # lignes liées à une recette externe introuvable
+        self.compteurs = {}  # type parent -> nouvel ID -> {compteur: valeur}
+        self.ingredients_crees = 0
+        self.recettes_introuvables = 0  # recettes externes absentes de cette instance
+        self._externes_perdues = set()  # leurs IDs dans le fichier
+        self._convertisseurs = {type_section: _convertisseurs(_table(modele))
+                                for type_section, modele, _, _ in SECTIONS}
+
+    def verifier_compte_vide(self):
+        for type_section, modele, proprietaire, _ in SECTIONS:
+            if proprietaire is not None and type_section != 'favori':
+                table = _table(modele)
+                if db.session.scalar(db.select(table.c.id).where(table.c[proprietaire] == self.user.id).limit(1)):
+                    raise RestaurationImpossible(
+                        'Le compte contient déjà des données : la restauration se fait dans un compte vide'
+                    )
+
+    def restaurer(self, objets):
+        """
+        Args:
+            objets: Itérable des couples (numéro de ligne, objet) du fichier (voir lire())
+
+        Raises:
+            RestaurationImpossible: En-tête, ligne, ordre des sections ou fin du fichier invalides
+        """
+        objets = iter(objets)
+        _, entete = next(objets, (None, None))
+        if entete is None or entete.get('_type') != 'entete' or entete.get('format') != FORMAT:
+            raise RestaurationImpossible('Ce fichier n\'est pas un export Iovag')
+        if entete.get('version') != VERSION_FORMAT:
+            raise RestaurationImpossible(f'Version d\'export non prise en charge : {entete.get("version")}')
+        self.verifier_compte_vide()
+
+        try:
+            termine = False
+            type_lot, lot = None, []
+            for numero, objet in objets:
+                type_objet = objet.pop('_type')
+                if type_objet != type_lot or len(lot) >= TAILLE_LOT:
+                    if lot:
+                        self._inserer_lot(type_lot, lot)
+                    type_lot, lot = type_objet, []
+                if type_objet == 'fin':
+                    termine = True
+                    break
+                if type_objet not in _SECTIONS:
+                    raise RestaurationImpossible(f'Ligne {numero} : type de ligne inconnu : {type_objet}')
+                lot.append((numero, objet))
+
+            if not termine:
+                raise RestaurationImpossible('Fichier incomplet (ligne de fin absente)')
+
+            self._enregistrer_compteurs()
+            connexion = db.session.connection()
+            recette_ids = [self.ids['recette'][i] for i in self.ids['recette']
+                           if i not in self.ids['recette_externe']]
+            if recette_ids and recherche.plein_texte_disponible(connexion):
+                recherche.indexer_plein_texte(connexion, recette_ids)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _inserer_lot(self, type_section, lignes):
+        """Insère un lot ; les valeurs refusées par la base sont signalées avec leurs lignes"""
+        try:
+            self._inserer(type_section, lignes)
+        except StatementError as e:
+            raise RestaurationImpossible(
+                f'Lignes {lignes[0][0]} à {lignes[-1][0]} ({type_section}) refusées par la base : {e.orig or e}'
+            ) from e
+
+    def _inserer(self, type_section, lignes):
+        """Insère un lot de couples (numéro de ligne, ligne) d'une même section"""
+        if type_section == 'ingredient':
+            return self._inserer_ingredients(lignes)
+        if type_section == 'recette_externe':
+            return self._resoudre_recettes_externes(lignes)
+
+        _, modele, proprietaire, references = _SECTIONS[type_section]
+        table = _table(modele)
+        convertisseurs = self._convertisseurs[type_section]
+
+        sources, valeurs = [], []
+        for numero, ligne in lignes:
+            try:
+                source = _identifiant(ligne) if type_section in PARENTS else None
+                donnees = {cle: valeur for cle, valeur in ligne.items()
+                           if cle in table.c and cle != 'id' and cle not in COLONNES_DERIVEES}
+                for colonne, convertir in convertisseurs.items():
+                    if donnees.get(colonne) is not None:
+                        donnees[colonne] = convertir(donnees[colonne])
+
+                valide = True
+                for colonne, reference in references.items():
+                    if donnees.get(colonne) is None:
+                        if not table.c[colonne].nullable:
+                            raise ValueError(f'{colonne} manquant')
+                        continue
+                    identifiant = _identifiant(donnees, colonne)
+                    donnees[colonne] = self.ids[reference].get(identifiant)
+                    if donnees[colonne] is not None:
+                        continue
+                    # Seule une recette externe introuvable peut manquer : la
+                    # référence est retirée (ligne ignorée si elle est obligatoire)
+                    if reference != 'recette' or identifiant not in self._externes_perdues:
+                        raise ValueError(f'{colonne} {identifiant} absent des lignes {reference} précédentes')
+                    if not table.c[colonne].nullable:
+                        valide = False
+            except (ValueError, KeyError, TypeError) as e:
+                raise _ligne_invalide(numero, type_section, e) from e
+            if not valide:
+                self.ignorees += 1
+                continue
+
+            if proprietaire is not None:
+                donnees[proprietaire] = self.user.id
+            sources.append(source)
+            valeurs.append(donnees)
+
+        if not valeurs:
+            return
+        if type_section in COMPTEURS:
+            self._compter(type_section, valeurs)
+        if modele is table:
+            db.session.execute(db.insert(table), valeurs)
+        else:
+            inserer_lignes(modele, valeurs)
+            if type_section in PARENTS:
+                self.ids[type_section].update(zip(sources, (donnees['id'] for donnees in valeurs)))
+        self.inserees[type_section] += len(valeurs)
+
+    def _compter(self, type_section, valeurs):
+        colonne, type_parent, compteurs = COMPTEURS[type_section]
+        tous = [compteur for _, parent, comptes in COMPTEURS.values() if parent == type_parent
+                for compteur in comptes]
+        parents = self.compteurs.setdefault(type_parent, {})
+        for donnees in valeurs:
+            parent = parents.setdefault(donnees[colonne], dict.fromkeys(tous, 0))
+            for compteur, filtre in compteurs.items():
+                if filtre is None or donnees.get(filtre):
+                    parent[compteur] += 1
+
+    def _enregistrer_compteurs(self):
+        """
+        Écrit les compteurs comptés pendant l'insertion (un executemany par
+        table, sans toucher à updated_at). Les recettes d'autres membres
+        mises en favori sont recalculées comme lors d'une sauvegarde.
+        """
+        externes = set(self.ids['recette_externe'].values())
+        for type_parent, parents in self.compteurs.items():
+            table = _table(_SECTIONS[type_parent][1])
+            valeurs = [dict(compteurs, id_parent=parent_id) for parent_id, compteurs in parents.items()
+                       if parent_id not in externes]
+            if valeurs:
+                colonnes = {compteur: db.bindparam(compteur) for compteur in valeurs[0] if compteur != 'id_parent'}
+                db.session.execute(
+                    db.update(table).where(table.c.id == db.bindparam('id_parent'))
+                    .values(updated_at=table.c.updated_at, **colonnes),
+                    valeurs
+                )
+        sauvegardees = externes.intersection(self.compteurs.get('recette', ()))
+        if sauvegardees:
+            Recette.recalculer_compteurs(db.session.connection(), sauvegardees)
+
+    def _inserer_ingredients(self, lignes):
+        """Ingrédients du catalogue : repris par nom, créés s'ils n'existent pas sur cette instance"""
+        for numero, ligne in lignes:
+            try:
+                _identifiant(ligne)
+                _nom(ligne)
+            except ValueError as e:
+                raise _ligne_invalide(numero, 'ingredient', e) from e
+
+        existants = dict(db.session.execute(
+            db.select(Ingredient.nom, Ingredient.id).where(Ingredient.nom.in_([ligne['nom'] for _, ligne in lignes]))
+        ).all())
+        a_creer, sources = [], []
+        for numero, ligne in lignes:
+            if ligne['nom'] in existants:
+                self.ids['ingredient'][ligne['id']] = existants[ligne['nom']]
+            else:
+                donnees = {cle: valeur for cle, valeur in ligne.items() if cle in Ingredient.__table__.c and cle != 'id'}
+                try:
+                    for colonne, convertir in self._convertisseurs['ingredient'].items():
+                        if donnees.get(colonne) is not None:
+                            donnees[colonne] = convertir(donnees[colonne])
+                except (ValueError, TypeError) as e:
+                    raise _ligne_invalide(numero, 'ingredient', e) from e
+                existants[ligne['nom']] = None  # doublon dans le fichier
+                a_creer.append(donnees)
+                sources.append(ligne['id'])
+        if a_creer:
+            inserer_lignes(Ingredient, a_creer)
+            self.ids['ingredient'].update(zip(sources, (donnees['id'] for donnees in a_creer)))
+            self.ingredients_crees += len(a_creer)
+        self.inserees['ingredient'] += len(lignes)
+
+    def _resoudre_recettes_externes(self, lignes):
+        """
+        Recettes d'autres membres : recette publique de même nom sur cette
+        instance (du même auteur de préférence), sinon la référence est perdue
+        """
+        for numero, ligne in lignes:
+            try:
+                _identifiant(ligne)
+                _nom(ligne)
+            except ValueError as e:
+                raise _ligne_invalide(numero, 'recette_externe', e) from e
+
+        candidates = {}
+        for recette_id, nom, auteur in db.session.execute(
+            db.select(Recette.id, Recette.nom, User.username)
+            .join(User, User.id == Recette.created_by)
+            .where(Recette.is_public.is_(True), Recette.nom.in_([ligne['nom'] for _, ligne in lignes]))
+            .order_by(Recette.id)
+        ):
+            candidates.setdefault(nom, {}).setdefault(auteur, recette_id)
+
+        for _, ligne in lignes:
+            par_auteur = candidates.get(ligne['nom'])
+            if not par_auteur:
+                self.recettes_introuvables += 1
+                self._externes_perdues.add(ligne['id'])
+                continue
+            recette_id = par_auteur.get(ligne.get('auteur'), next(iter(par_auteur.values())))
+            self.ids['recette_externe'][ligne['id']] = recette_id
+            self.ids['recette'][ligne['id']] = recette_id
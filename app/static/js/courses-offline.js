@@ -0,0 +1,207 @@
+/**
+ * Mode hors ligne des courses
+ *
+ * Pendant les courses (statut en_course), les cases cochées et les quantités
+ * achetées sont enregistrées dans IndexedDB puis envoyées en un seul lot à
+ * /courses/<id>/sync : au retour du réseau, en quittant la page ou avant de
+ * terminer les courses. Le serveur applique le « dernier qui écrit gagne »
+ * article par article et renvoie les articles modifiés depuis la dernière
+ * version connue (autre téléphone de la famille, par exemple).
+ */
+
+const CoursesHorsLigne = (function () {
+    const NOM_BASE = 'iovag-courses';
+    const VERSION_BASE = 1;
+
+    let options = null;
+    let base = null;
+    let synchronisationEnCours = null;
+
+    function ouvrirBase() {
+        if (base) {
+            return base;
+        }
+        base = new Promise((resolve, reject) => {
+            const requete = indexedDB.open(NOM_BASE, VERSION_BASE);
+            requete.onupgradeneeded = () => {
+                const idb = requete.result;
+                // Changements en attente : un par article (champs fusionnés)
+                idb.createObjectStore('changements', {keyPath: ['liste_id', 'item_id']})
+                    .createIndex('liste', 'liste_id');
+                // Dernier état connu de chaque liste (version + articles)
+                idb.createObjectStore('etats', {keyPath: 'liste_id'});
+            };
+            requete.onsuccess = () => resolve(requete.result);
+            requete.onerror = () => reject(requete.error);
+        });
+        return base;
+    }
+
+    function transaction(magasins, mode, action) {
+        return ouvrirBase().then(idb => new Promise((resolve, reject) => {
+            const tx = idb.transaction(magasins, mode);
+            let resultat;
+            Promise.resolve(action(tx)).then(valeur => { resultat = valeur; });
+            tx.oncomplete = () => resolve(resultat);
+            tx.onerror = () => reject(tx.error);
+            tx.onabort = () => reject(tx.error);
+        }));
+    }
+
+    function requeteIdb(requete) {
+        return new Promise((resolve, reject) => {
+            requete.onsuccess = () => resolve(requete.result);
+            requete.onerror = () => reject(requete.error);
+        });
+    }
+
+    function lireChangements() {
+        return transaction(['changements'], 'readonly', tx =>
+            requeteIdb(tx.objectStore('changements').index('liste').getAll(options.listeId)));
+    }
+
+    function lireEtat() {
+        return transaction(['etats'], 'readonly', tx =>
+            requeteIdb(tx.objectStore('etats').get(options.listeId)));
+    }
+
+    /**
+     * Enregistre localement la modification d'un article
+     * @param {number} itemId
+     * @param {object} valeurs {achete} et/ou {quantite_achetee}
+     */
+    function enregistrer(itemId, valeurs) {
+        return transaction(['changements'], 'readwrite', tx => {
+            const magasin = tx.objectStore('changements');
+            return requeteIdb(magasin.get([options.listeId, itemId])).then(existant => {
+                const changement = Object.assign(existant || {liste_id: options.listeId, item_id: itemId},
+                                                 valeurs, {modifie_le: Date.now()});
+                magasin.put(changement);
+            });
+        }).then(() => lireChangements()).then(changements => {
+            options.surAttente(changements.length);
+        });
+    }
+
+    function enregistrerEtat(donnees, envoyes) {
+        return transaction(['changements', 'etats'], 'readwrite', tx => {
+            const etats = tx.objectStore('etats');
+            const changements = tx.objectStore('changements');
+
+            // Retirer les changements envoyés qui n'ont pas été modifiés depuis
+            envoyes.forEach(envoye => {
+                requeteIdb(changements.get([options.listeId, envoye.item_id])).then(actuel => {
+                    if (actuel && (actuel.modifie_le === envoye.modifie_le || donnees.statut !== 'en_course')) {
+                        changements.delete([options.listeId, envoye.item_id]);
+                    }
+                });
+            });
+
+            return requeteIdb(etats.get(options.listeId)).then(etat => {
+                etat = etat || {liste_id: options.listeId, version: 0, items: {}};
+                donnees.items.forEach(item => { etat.items[item.id] = item; });
+                const ids = new Set(donnees.ids);
+                Object.keys(etat.items).forEach(id => {
+                    if (!ids.has(Number(id))) {
+                        delete etat.items[id];
+                    }
+                });
+                etat.version = donnees.version;
+                etats.put(etat);
+            });
+        });
+    }
+
+    /**
+     * Envoie les changements en attente et récupère les modifications du serveur
+     * (une requête ; rien n'est envoyé hors ligne ou sans changement, sauf si force)
+     */
+    function synchroniser(force = false) {
+        if (synchronisationEnCours) {
+            return synchronisationEnCours;
+        }
+        if (!navigator.onLine) {
+            return Promise.resolve(null);
+        }
+
+        synchronisationEnCours = Promise.all([lireChangements(), lireEtat()])
+            .then(([changements, etat]) => {
+                if (!changements.length && !force) {
+                    return null;
+                }
+                const envoyes = changements.map(c => ({
+                    item_id: c.item_id,
+                    modifie_le: c.modifie_le,
+                    ...('achete' in c ? {achete: c.achete} : {}),
+                    ...('quantite_achetee' in c ? {quantite_achetee: c.quantite_achetee} : {}),
+                }));
+                const depuis = etat ? etat.version : options.versionInitiale;
+
+                return fetch(options.urlSync, {
+                    method: 'POST',
+                    headers: {'Content-Type': 'application/json'},
+                    body: JSON.stringify({depuis: depuis, changements: envoyes}),
+                    keepalive: true
+                })
+                .then(response => response.json())
+                .then(donnees => {
+                    if (!('version' in donnees)) {
+                        throw new Error(donnees.error || 'Synchronisation refusée');
+                    }
+                    return enregistrerEtat(donnees, envoyes)
+                        .then(() => lireChangements())
+                        .then(restants => {
+                            options.surAttente(restants.length);
+                            options.surEtat(donnees, restants);
+                            return donnees;
+                        });
+                });
+            })
+            .catch(error => {
+                // Réseau du magasin indisponible : les changements restent en attente
+                console.error('Error:', error);
+                return null;
+            })
+            .finally(() => {
+                synchronisationEnCours = null;
+            });
+        return synchronisationEnCours;
+    }
+
+    /**
+     * Réaffiche l'état local (page servie depuis le cache hors ligne)
+     * puis met en cache la page et son état dans le service worker
+     */
+    function init(opts) {
+        options = opts;
+
+        Promise.all([lireEtat(), lireChangements()]).then(([etat, changements]) => {
+            if (etat && etat.version > options.versionInitiale) {
+                Object.values(etat.items).forEach(item => options.surArticle(item.id, item));
+            }
+            changements.forEach(c => options.surArticle(c.item_id, c));
+            options.surAttente(changements.length);
+        }).catch(error => console.error('Error:', error));
+
+        if ('serviceWorker' in navigator) {
+            navigator.serviceWorker.register(options.urlServiceWorker, {scope: options.portee})
+                .then(() => navigator.serviceWorker.ready)
+                .then(enregistrement => {
+                    enregistrement.active.postMessage({
+                        type: 'mettre-en-cache',
+                        urls: [window.location.pathname, options.urlSync]
+                    });
+                })
+                .catch(error => console.error('Error:', error));
+        }
+
+        window.addEventListener('online', () => synchroniser());
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'hidden') {
+                synchroniser();
+            }
+        });
+    }
+
+    return {init: init, enregistrer: enregistrer, synchroniser: synchroniser};
+})();
@@ -0,0 +1,93 @@
+/**
+ * Service worker du mode hors ligne des courses (portée /courses/)
+ *
+ * - Page d'une liste et état de synchronisation : réseau d'abord, cache en repli
+ * - Ressources statiques (CSS, JS, polices, icônes) : cache d'abord, revalidé
+ *   en arrière-plan (leurs URL ne sont pas versionnées : une mise en production
+ *   est prise en compte au chargement suivant)
+ *
+ * Les requêtes POST ne sont jamais interceptées : les changements faits hors
+ * ligne sont conservés par la page dans IndexedDB puis synchronisés en un envoi.
+ */
+
+const CACHE = 'iovag-courses-v2';
+const RE_PAGE_LISTE = /^\/courses\/\d+\/?$/;
+const RE_SYNC = /^\/courses\/\d+\/sync$/;
+const DESTINATIONS_STATIQUES = ['style', 'script', 'font', 'image'];
+
+self.addEventListener('install', () => {
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', event => {
+    // Supprimer les caches des versions précédentes du service worker
+    event.waitUntil(
+        caches.keys()
+            .then(cles => Promise.all(
+                cles.filter(cle => cle.startsWith('iovag-courses-') && cle !== CACHE)
+                    .map(cle => caches.delete(cle))
+            ))
+            .then(() => self.clients.claim())
+    );
+});
+
+// La page d'une liste en cours de courses demande la mise en cache de ses ressources
+self.addEventListener('message', event => {
+    if (!event.data || event.data.type !== 'mettre-en-cache') {
+        return;
+    }
+    event.waitUntil(caches.open(CACHE).then(cache => Promise.all(
+        event.data.urls.map(url => fetch(url, {credentials: 'same-origin'})
+            .then(response => {
+                if (response.ok && !response.redirected) {
+                    return cache.put(cleCache(new URL(url, self.location.origin)), response);
+                }
+            })
+            .catch(() => {}))
+    )));
+});
+
+self.addEventListener('fetch', event => {
+    const requete = event.request;
+    if (requete.method !== 'GET') {
+        return;
+    }
+
+    const url = new URL(requete.url);
+    if (url.origin === self.location.origin && (RE_PAGE_LISTE.test(url.pathname) || RE_SYNC.test(url.pathname))) {
+        event.respondWith(reseauPuisCache(requete, url));
+    } else if (DESTINATIONS_STATIQUES.includes(requete.destination)) {
+        event.respondWith(cachePuisRevalidation(event));
+    }
+});
+
+function cleCache(url) {
+    // Un seul état de synchronisation par liste, quel que soit ?depuis=
+    return RE_SYNC.test(url.pathname) ? url.origin + url.pathname : url.href;
+}
+
+function reseauPuisCache(requete, url) {
+    return fetch(requete)
+        .then(response => {
+            if (response.ok && !response.redirected) {
+                const copie = response.clone();
+                caches.open(CACHE).then(cache => cache.put(cleCache(url), copie));
+            }
+            return response;
+        })
+        .catch(() => caches.match(cleCache(url)).then(response => response || Response.error()));
+}
+
+function cachePuisRevalidation(event) {
+    const requete = event.request;
+    const reseau = fetch(requete).then(response => {
+        if (response.ok || response.type === 'opaque') {
+            const copie = response.clone();
+            return caches.open(CACHE).then(cache => cache.put(requete, copie)).then(() => response);
+        }
+        return response;
+    });
+    // La mise à jour du cache continue après la réponse servie depuis le cache
+    event.waitUntil(reseau.catch(() => {}));
+    return caches.match(requete).then(enCache => enCache || reseau);
+}
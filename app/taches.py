@@ -0,0 +1,242 @@
+"""
+File de tâches de fond persistée dans SQLite (table taches)
+
+Les routes enregistrent le travail lourd (génération d'une liste de courses,
+vérification du stock, livre de recettes PDF...) et rendent la main tout de
+suite : un processus lancé à côté de Gunicorn l'exécute, sans Redis.
+
+    flask --app run taches-worker
+
+Une tâche en échec est retentée après un délai croissant, jusqu'à
+max_tentatives. Avec TACHES_SYNCHRONES (tests, banc, développement sans
+worker), la tâche est exécutée dès son enregistrement, dans la requête.
+"""
+import signal
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from flask import current_app, flash, redirect, url_for
+from app import db
+from app.models import ListeCourse, Menu, Tache, UnitConverter
+
+
+# Gestionnaires enregistrés par @gestionnaire : type -> (fonction(tache) -> résultat, max_tentatives)
+_gestionnaires = {}
+
+# Délai avant le premier nouvel essai, doublé à chaque échec
+DELAI_NOUVEL_ESSAI_S = 5
+
+# Maintenance du worker (tâches abandonnées, purge) toutes les N secondes
+MAINTENANCE_S = 60
+
+
+class TacheImpossible(Exception):
+    """Échec définitif (objet supprimé, paramètres invalides...) : pas de nouvel essai"""
+
+
+def gestionnaire(nom, max_tentatives=3):
+    """
+    Décorateur enregistrant la fonction qui exécute les tâches `nom`
+
+    La fonction reçoit la Tache (paramètres dans tache.parametres) et renvoie
+    un résultat sérialisable en JSON. Clés reconnues par les pages d'attente :
+    'redirection' ([endpoint, valeurs]) et 'message' (affiché en flash).
+    Son travail est validé dans la même transaction que le statut de la tâche.
+    """
+    def decorator(f):
+        _gestionnaires[nom] = (f, max_tentatives)
+        return f
+    return decorator
+
+
+def enfiler(type_tache, created_by=None, **parametres):
+    """
+    Enregistre une tâche et la valide aussitôt
+
+    Une tâche identique (même type, auteur et paramètres) encore en attente
+    ou en cours est réutilisée : un double clic ne lance pas deux générations.
+
+    Returns:
+        Tache (déjà exécutée si TACHES_SYNCHRONES)
+    """
+    if current_app.config.get('TACHES_SYNCHRONES'):
+        return _executer_dans_la_requete(type_tache, created_by, parametres)
+
+    actives = Tache.query.filter(
+        Tache.type == type_tache,
+        Tache.created_by == created_by,
+        Tache.statut.in_(Tache.STATUTS_ACTIFS)
+    )
+    for tache in actives:
+        if tache.parametres == parametres:
+            return tache
+
+    tache = Tache(type=type_tache, parametres=parametres, created_by=created_by,
+                  max_tentatives=_gestionnaires[type_tache][1])
+    db.session.add(tache)
+    db.session.commit()
+    return tache
+
+
+def _executer_dans_la_requete(type_tache, created_by, parametres):
+    """
+    TACHES_SYNCHRONES : exécute la tâche tout de suite, sans l'enregistrer
+    dans la table ni la retenter (une erreur remonte comme dans une route)
+    """
+    maintenant = datetime.utcnow()
+    tache = Tache(type=type_tache, parametres=parametres, created_by=created_by,
+                  statut='en_cours', tentatives=1, demarree_le=maintenant)
+    tache.resultat = _gestionnaires[type_tache][0](tache)
+    tache.statut = 'terminee'
+    tache.terminee_le = datetime.utcnow()
+    db.session.commit()
+    return tache
+
+
+def enfiler_hors_session(type_tache, **parametres):
+    """
+    Enregistre une tâche sur sa propre connexion, sans toucher à la session
+    (utilisable depuis un événement after_commit)
+    """
+    with db.engine.begin() as connexion:
+        connexion.execute(db.insert(Tache).values(
+            type=type_tache, parametres=parametres,
+            max_tentatives=_gestionnaires[type_tache][1]
+        ))
+
+
+def executer(tache):
+    """
+    Exécute une tâche réservée, puis enregistre son résultat ou son échec
+    (nouvel essai différé tant qu'il reste des tentatives)
+
+    Si la tâche a été reprise entre-temps (exécution plus longue que
+    TACHES_DELAI_ABANDON_S), son travail est annulé : seul le worker qui
+    détient la réservation valide le sien.
+    """
+    tache_id, type_tache, jeton = tache.id, tache.type, tache.jeton
+    try:
+        # Hors requête, pas de before_request : relire le journal des unités
+        # pour appliquer les modifications faites depuis les workers Gunicorn
+        UnitConverter.synchroniser()
+
+        fonction, _ = _gestionnaires.get(type_tache, (None, 0))
+        if fonction is None:
+            raise TacheImpossible(f'Type de tâche inconnu : {type_tache}')
+        resultat = fonction(tache)
+
+        if Tache.finir(tache_id, jeton, statut='terminee', resultat=resultat, erreur=None,
+                       terminee_le=datetime.utcnow()):
+            db.session.commit()
+        else:
+            db.session.rollback()
+            current_app.logger.warning('Tâche %s (%s) reprise par un autre worker : résultat abandonné',
+                                       tache_id, type_tache)
+    except Exception as e:
+        db.session.rollback()
+        current_app.logger.exception('Tâche %s (%s) en échec', tache_id, type_tache)
+
+        tache = db.session.get(Tache, tache_id)
+        valeurs = {'erreur': f'{type(e).__name__}: {e}'}
+        if isinstance(e, TacheImpossible) or tache.tentatives >= tache.max_tentatives:
+            valeurs.update(statut='echec', terminee_le=datetime.utcnow())
+        else:
+            delai = DELAI_NOUVEL_ESSAI_S * 2 ** (tache.tentatives - 1)
+            valeurs.update(statut='en_attente', executer_apres=datetime.utcnow() + timedelta(seconds=delai))
+        Tache.finir(tache_id, jeton, **valeurs)
+        db.session.commit()
+
+    db.session.expire_all()
+    return db.session.get(Tache, tache_id)
+
+
+def redirection(tache):
+    """URL où continuer une fois la tâche terminée (None si elle n'en propose pas)"""
+    if tache.statut != 'terminee' or not tache.resultat or 'redirection' not in tache.resultat:
+        return None
+    endpoint, valeurs = tache.resultat['redirection']
+    return url_for(endpoint, **valeurs)
+
+
+def suivre(tache):
+    """
+    Réponse d'une route qui vient d'enregistrer une tâche : la page de
+    destination si elle est déjà terminée, la page d'attente sinon
+    """
+    url = redirection(tache)
+    if url is None:
+        return redirect(url_for('taches.attente', id=tache.id))
+    if tache.resultat.get('message'):
+        flash(tache.resultat['message'], 'success')
+    return redirect(url)
+
+
+def maintenance(app):
+    """Reprend les tâches abandonnées et purge les anciennes tâches terminées"""
+    reprises = Tache.reprendre_abandonnees(timedelta(seconds=app.config['TACHES_DELAI_ABANDON_S']))
+    if reprises:
+        app.logger.warning('%s tâche(s) abandonnée(s) remise(s) en attente', reprises)
+    Tache.purger(timedelta(days=app.config['TACHES_CONSERVATION_JOURS']))
+
+
+def travailler(app, une_fois=False):
+    """
+    Boucle du worker : exécute les tâches une à une jusqu'à SIGTERM/SIGINT
+    (la tâche en cours est terminée avant l'arrêt)
+
+    Args:
+        app: Application Flask
+        une_fois: Vider la file puis s'arrêter (cron, tests manuels)
+    """
+    arret = threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda signum, frame: arret.set())
+        signal.signal(signal.SIGINT, lambda signum, frame: arret.set())
+
+    derniere_maintenance = None
+    while not arret.is_set():
+        tache = None
+        with app.app_context():
+            try:
+                if derniere_maintenance is None or time.monotonic() - derniere_maintenance > MAINTENANCE_S:
+                    maintenance(app)
+                    derniere_maintenance = time.monotonic()
+
+                tache = Tache.reserver(uuid.uuid4().hex)
+                if tache is not None:
+                    executer(tache)
+            except Exception:
+                app.logger.exception('Erreur du worker de tâches')
+            finally:
+                db.session.remove()
+
+        if tache is None:
+            if une_fois:
+                break
+            arret.wait(app.config['TACHES_INTERVALLE_S'])
+
+
+# Tâches de l'application
+
+@gestionnaire('generer_courses')
+def _generer_courses(tache):
+    """Liste de courses d'un menu"""
+    menu = db.session.get(Menu, tache.parametres['menu_id'])
+    if menu is None:
+        raise TacheImpossible('Menu supprimé')
+    liste = menu.generer_liste_courses()
+    return {
+        'redirection': ['courses.detail', {'id': liste.id}],
+        'message': 'Liste de courses générée avec succès'
+    }
+
+
+@gestionnaire('verifier_stock')
+def _verifier_stock(tache):
+    """Vérification du stock d'une liste avant sa révision"""
+    liste = db.session.get(ListeCourse, tache.parametres['liste_id'])
+    if liste is None:
+        raise TacheImpossible('Liste de courses supprimée')
+    liste.verifier_stock()
+    return {'redirection': ['courses.reviser', {'id': liste.id, 'verifie': tache.id}]}
@@ -0,0 +1,12 @@
+"""
+Banc de performance d'Iovag
+
+Génère un jeu de données synthétique paramétrable puis exécute les routes
+critiques via le client de test Flask (latences, nombre de requêtes SQL,
+mémoire) et compare les résultats à une référence JSON.
+
+Usage :
+    python -m bench.run                          # comparer à bench/baseline.json
+    python -m bench.run --recettes 2000 --iterations 50
+    python -m bench.run --save-baseline          # enregistrer la référence
+"""
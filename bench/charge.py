@@ -0,0 +1,158 @@
+"""
+Test de charge : cases cochées en magasin pendant le rendu de pages lourdes
+
+Simule plusieurs téléphones qui cochent les articles d'une liste de courses
+(POST /courses/<id>/toggle-ingredient) d'abord seuls, puis pendant que
+d'autres clients chargent en boucle des pages lourdes (recettes possibles,
+explore...). Avec des workers sync, les cases attendent la fin du rendu ;
+avec le profil gthread leur latence doit rester stable.
+
+Usage (serveur lancé sur la base du banc) :
+    python -m bench.run --save-baseline          # ou tout autre run : crée la base
+    FLASK_ENV=bench gunicorn -c gunicorn_config.py --error-logfile - --access-logfile /dev/null run:app
+    python -m bench.charge --url http://127.0.0.1:8000 --liste 1
+"""
+import argparse
+import http.cookiejar
+import json
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from bench.dataset import MOT_DE_PASSE
+from bench.run import percentile
+
+
+RE_ITEMS = re.compile(r'id="label_(\d+)"')
+
+
+class Client:
+    """Client HTTP minimal avec cookies de session (partagé entre threads)"""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def requete(self, chemin, donnees=None, json_data=None):
+        """Exécute une requête et renvoie (statut, corps, durée en ms)"""
+        headers = {}
+        if json_data is not None:
+            donnees = json.dumps(json_data).encode()
+            headers['Content-Type'] = 'application/json'
+        elif donnees is not None:
+            donnees = urllib.parse.urlencode(donnees).encode()
+        requete = urllib.request.Request(self.url + chemin, data=donnees, headers=headers)
+
+        debut = time.perf_counter()
+        try:
+            with self.opener.open(requete, timeout=120) as response:
+                corps = response.read()
+                statut = response.status
+        except urllib.error.HTTPError as erreur:
+            corps = erreur.read()
+            statut = erreur.code
+        return statut, corps, (time.perf_counter() - debut) * 1000
+
+
+def _boucle(client, arret, mesures, action):
+    """Répète `action` jusqu'à l'arrêt et accumule (statut, durée)"""
+    while not arret.is_set():
+        statut, _, duree_ms = action(client)
+        mesures.append((statut, duree_ms))
+
+
+def phase(client, items, liste_id, nb_toggles, pages_lourdes, nb_lourds, duree):
+    """
+    Exécute une phase de charge
+
+    Returns:
+        tuple (mesures des cases cochées, mesures des pages lourdes)
+    """
+    arret = threading.Event()
+    mesures_toggles, mesures_lourdes = [], []
+    threads = []
+
+    for numero in range(nb_toggles):
+        compteur = iter(range(numero, 10 ** 9, nb_toggles))
+
+        def cocher(client, compteur=compteur):
+            n = next(compteur)
+            return client.requete(f'/courses/{liste_id}/toggle-ingredient', json_data={
+                'item_id': items[n % len(items)], 'achete': (n // len(items)) % 2 == 0
+            })
+        threads.append(threading.Thread(target=_boucle, args=(client, arret, mesures_toggles, cocher)))
+
+    for numero in range(nb_lourds):
+        chemin = pages_lourdes[numero % len(pages_lourdes)]
+        threads.append(threading.Thread(
+            target=_boucle, args=(client, arret, mesures_lourdes, lambda c, chemin=chemin: c.requete(chemin))
+        ))
+
+    for thread in threads:
+        thread.start()
+    time.sleep(duree)
+    arret.set()
+    for thread in threads:
+        thread.join()
+
+    return mesures_toggles, mesures_lourdes
+
+
+def resume(nom, mesures, duree):
+    """Ligne récapitulative d'une série de mesures"""
+    if not mesures:
+        return f'{nom:<28} aucune requête'
+    durees = sorted(d for _, d in mesures)
+    erreurs = sum(1 for statut, _ in mesures if statut >= 400)
+    return (f'{nom:<28}{len(mesures):>7}{len(mesures) / duree:>8.1f}/s'
+            f'{percentile(durees, 50):>10.1f}{percentile(durees, 95):>10.1f}{durees[-1]:>10.1f}'
+            f'{erreurs:>8}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Test de charge Iovag (cases cochées + pages lourdes)')
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--email', default='bench0@iovag.test')
+    parser.add_argument('--password', default=MOT_DE_PASSE)
+    parser.add_argument('--liste', type=int, default=1, help='ID de la liste de courses à cocher')
+    parser.add_argument('--lourde', action='append', help='Page lourde (défaut : possibles et explore)')
+    parser.add_argument('--toggles', type=int, default=4, help='Clients qui cochent en parallèle')
+    parser.add_argument('--lourds', type=int, default=2, help='Clients qui chargent les pages lourdes')
+    parser.add_argument('--duree', type=float, default=10, help='Durée de chaque phase (s)')
+    args = parser.parse_args(argv)
+
+    pages_lourdes = args.lourde or ['/recettes/possibles', '/explore']
+    client = Client(args.url)
+
+    client.requete('/auth/login', {'email': args.email, 'password': args.password})
+    statut, corps, _ = client.requete(f'/courses/{args.liste}')
+    items = [int(i) for i in RE_ITEMS.findall(corps.decode('utf-8', 'replace'))]
+    if statut != 200 or not items:
+        print(f'❌ Liste {args.liste} inaccessible ou vide (statut {statut}) : vérifier la connexion')
+        return 1
+
+    print(f'⏳ {len(items)} articles, {args.toggles} clients qui cochent, '
+          f'{args.lourds} clients sur {", ".join(pages_lourdes)}, {args.duree:.0f} s par phase')
+
+    seuls, _ = phase(client, items, args.liste, args.toggles, pages_lourdes, 0, args.duree)
+    charges, lourdes = phase(client, items, args.liste, args.toggles, pages_lourdes, args.lourds, args.duree)
+
+    print(f"\n{'':<28}{'requêtes':>7}{'débit':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'erreurs':>8}")
+    print(resume('cases cochées (seules)', seuls, args.duree))
+    print(resume('cases cochées (sous charge)', charges, args.duree))
+    print(resume('pages lourdes', lourdes, args.duree))
+
+    if seuls and charges:
+        p95_seuls = percentile(sorted(d for _, d in seuls), 95)
+        p95_charges = percentile(sorted(d for _, d in charges), 95)
+        print(f'\nDégradation p95 des cases cochées sous charge : x{p95_charges / p95_seuls:.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+Générateur de jeu de données synthétique pour le banc de performance
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from app import db
+from app.models import (User, Ingredient, Recette, RecetteIngredient, Instruction, Menu, MenuJour,
+                        MenuGateau, ListeCourse, Stock, Unite,
+                        IngredientConversionUnite, recettes_favorites)
+from app import recherche
+
+
+MOT_DE_PASSE = 'bench-password'
+
+# Noms réalistes (accents, pluriels) pour exercer la recherche plein texte
+BASES_INGREDIENTS = [
+    'Tomate', 'Œuf', 'Farine', 'Beurre', 'Lait', 'Crème fraîche', 'Pomme de terre', 'Carotte',
+    'Oignon', 'Ail', 'Poulet', 'Bœuf', 'Saumon', 'Riz', 'Pâtes', 'Courgette', 'Aubergine',
+    'Poivron', 'Champignon', 'Fromage râpé', 'Sucre', 'Chocolat noir', 'Citron', 'Pomme',
+    'Poire', 'Fraise', 'Épinard', 'Lentilles', 'Pois chiches', 'Basilic',
+]
+PLATS = ['Tarte', 'Gratin', 'Soupe', 'Salade', 'Curry', 'Quiche', 'Risotto', 'Poêlée', 'Cake', 'Velouté']
+UNITES_RECETTE = ['g', 'kg', 'ml', 'L', 'pièce', 'cuillère à soupe']
+
+
+@dataclass
+class Dataset:
+    """Identifiants utiles aux scénarios du banc"""
+    email: str
+    user_id: int
+    menu_id: int
+    liste_id: int
+    recette_id: int
+    recettes_menu: list
+
+
+def _creer_unites():
+    """Unités de base et dérivées (comme init_unites.py)"""
+    g = Unite(nom='gramme', symbole='g', type_unite='masse', facteur_vers_base=1.0)
+    ml = Unite(nom='millilitre', symbole='ml', type_unite='volume', facteur_vers_base=1.0)
+    piece = Unite(nom='pièce', symbole='pièce', type_unite='unitaire', facteur_vers_base=1.0)
+    db.session.add_all([g, ml, piece])
+    db.session.flush()
+    db.session.add_all([
+        Unite(nom='kilogramme', symbole='kg', type_unite='masse', unite_base_id=g.id, facteur_vers_base=1000.0),
+        Unite(nom='litre', symbole='L', type_unite='volume', unite_base_id=ml.id, facteur_vers_base=1000.0),
+        Unite(nom='cuillère à soupe', symbole='cuillère à soupe', type_unite='volume',
+              unite_base_id=ml.id, facteur_vers_base=15.0),
+    ])
+    db.session.flush()
+    return g, piece
+
+
+def generer_dataset(nb_users=5, nb_recettes=500, nb_ingredients=300, nb_menus=10,
+                    nb_listes=5, stock_par_user=80, graine=42):
+    """
+    Remplit la base (vide) avec un jeu de données reproductible
+
+    Args:
+        nb_users: Nombre d'utilisateurs (le premier est l'utilisateur du banc)
+        nb_recettes: Nombre total de recettes, réparties entre les utilisateurs
+        nb_ingredients: Nombre d'ingrédients
+        nb_menus: Nombre de menus par utilisateur
+        nb_listes: Nombre de listes de courses générées pour l'utilisateur du banc
+        stock_par_user: Nombre d'ingrédients en stock par utilisateur
+        graine: Graine du générateur aléatoire
+
+    Returns:
+        Dataset
+    """
+    rnd = random.Random(graine)
+    unite_g, unite_piece = _creer_unites()
+
+    # Utilisateurs
+    users = []
+    for i in range(nb_users):
+        user = User(username=f'bench{i}', email=f'bench{i}@iovag.test', onboarding_completed=True)
+        user.set_password(MOT_DE_PASSE)
+        users.append(user)
+    db.session.add_all(users)
+    db.session.flush()
+
+    # Ingrédients (insertion en masse)
+    db.session.execute(db.insert(Ingredient), [{
+        'nom': BASES_INGREDIENTS[i] if i < len(BASES_INGREDIENTS)
+        else f'{BASES_INGREDIENTS[i % len(BASES_INGREDIENTS)]} {i // len(BASES_INGREDIENTS)}',
+        'categorie': Ingredient.CATEGORIES[i % len(Ingredient.CATEGORIES)],
+        'lieu_rangement': Ingredient.LIEUX_RANGEMENT[i % len(Ingredient.LIEUX_RANGEMENT)],
+        'poids_estime_g': 100.0 if i % 4 == 0 else None,
+    } for i in range(nb_ingredients)])
+    ingredient_ids = list(db.session.execute(db.select(Ingredient.id)).scalars())
+
+    db.session.add(IngredientConversionUnite(
+        ingredient_id=ingredient_ids[1], unite_source_id=unite_piece.id,
+        unite_cible_id=unite_g.id, facteur_conversion=60
+    ))
+
+    # Recettes, lignes d'ingrédients et instructions
+    debut = datetime(2025, 1, 1)
+    db.session.execute(db.insert(Recette), [{
+        'nom': f'{rnd.choice(PLATS)} {rnd.choice(BASES_INGREDIENTS).lower()}s {i}',
+        'portions': rnd.choice([2, 4, 6]),
+        'evaluation': rnd.randint(0, 5),
+        'temps_preparation': f'{rnd.randint(5, 60)} min',
+        'temps_cuisson': f'{rnd.randint(0, 90)} min',
+        'type_repas': rnd.choice(Recette.TYPES_REPAS),
+        'mois_saison': ','.join(rnd.sample(Ingredient.MOIS, 3)) if i % 3 else None,
+        'is_public': i % 5 != 0,
+        'note': 'Recette générée pour le banc de performance',
+        'created_at': debut + timedelta(hours=i),
+        'created_by': users[i % nb_users].id,
+    } for i in range(nb_recettes)])
+    recette_ids = list(db.session.execute(db.select(Recette.id).order_by(Recette.id)).scalars())
+
+    db.session.execute(db.insert(RecetteIngredient), [{
+        'recette_id': recette_id,
+        'ingredient_id': ingredient_id,
+        'quantite': rnd.choice([1, 2, 3, 100, 250, 500]),
+        'unite': rnd.choice(UNITES_RECETTE),
+    } for recette_id in recette_ids for ingredient_id in rnd.sample(ingredient_ids, rnd.randint(4, 10))])
+
+    db.session.execute(db.insert(Instruction), [{
+        'recette_id': recette_id,
+        'ordre': ordre,
+        'texte': f'Étape {ordre} : mélanger, cuire puis servir les ingrédients',
+    } for recette_id in recette_ids for ordre in range(1, rnd.randint(3, 7))])
+
+    # Recettes sauvegardées (celles des autres membres : aucune avec un seul utilisateur)
+    favoris = [
+        {'user_id': user.id, 'recette_id': recette_id}
+        for user in users for recette_id in rnd.sample(recette_ids, min(20, len(recette_ids)))
+        if recette_id % nb_users != (user.id - users[0].id) % nb_users
+    ]
+    if favoris:
+        db.session.execute(recettes_favorites.insert(), favoris)
+
+    # Stock
+    db.session.execute(db.insert(Stock), [{
+        'user_id': user.id,
+        'ingredient_id': ingredient_id,
+        'quantite': rnd.choice([0, 1, 5, 200, 1000, 3000]),
+        'unite': rnd.choice(['g', 'kg', 'pièce', 'ml']),
+    } for user in users for ingredient_id in rnd.sample(ingredient_ids, min(stock_par_user, nb_ingredients))])
+
+    # Menus de la semaine (recettes de l'utilisateur)
+    menu_ids = []
+    for user in users:
+        recettes_user = recette_ids[user.id - users[0].id::nb_users]
+        for m in range(nb_menus):
+            menu = Menu(nom=f'Semaine {m}', date_debut=date(2025, 1, 6) + timedelta(weeks=m),
+                        nb_personnes=rnd.choice([2, 4, 6]), created_by=user.id)
+            db.session.add(menu)
+            db.session.flush()
+            menu_ids.append(menu.id)
+            db.session.execute(db.insert(MenuJour), [{
+                'menu_id': menu.id,
+                'jour_semaine': jour,
+                'petit_dejeuner_id': rnd.choice(recettes_user),
+                'dejeuner_id': rnd.choice(recettes_user),
+                'gouter_id': rnd.choice(recettes_user),
+                'diner_id': rnd.choice(recettes_user),
+            } for jour in range(7)])
+            db.session.add(MenuGateau(menu_id=menu.id, recette_id=rnd.choice(recettes_user), ordre=0))
+
+    db.session.commit()
+
+    # Listes de courses de l'utilisateur du banc
+    menu_bench = db.session.get(Menu, menu_ids[0])
+    listes = [menu_bench.generer_liste_courses() for _ in range(nb_listes)]
+    db.session.commit()
+
+    # Les insertions en masse contournent le flush : compteurs et index plein texte
+    connexion = db.session.connection()
+    Recette.recalculer_compteurs(connexion)
+    ListeCourse.recalculer_compteurs(connexion)
+    if recherche.plein_texte_disponible(connexion):
+        recherche.indexer_plein_texte(connexion)
+    db.session.commit()
+
+    recettes_menu = sorted({
+        recette_id for jour in menu_bench.jours for recette_id in
+        (jour.petit_dejeuner_id, jour.dejeuner_id, jour.gouter_id, jour.diner_id)
+    })
+
+    return Dataset(
+        email=users[0].email,
+        user_id=users[0].id,
+        menu_id=menu_bench.id,
+        liste_id=listes[0].id,
+        recette_id=recettes_menu[0],
+        recettes_menu=recettes_menu,
+    )
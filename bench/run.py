@@ -0,0 +1,227 @@
+"""
+Exécution du banc de performance
+
+Crée une base SQLite temporaire, la remplit avec bench.dataset, rejoue les
+scénarios via le client de test Flask puis compare à la référence JSON.
+Code de sortie 1 en cas de régression.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from app import create_app, db
+from bench.dataset import MOT_DE_PASSE, generer_dataset
+
+
+BASELINE_DEFAUT = Path(__file__).parent / 'baseline.json'
+
+# Nombre de requêtes SQL exposé par app/instrumentation.py
+RE_SERVER_TIMING = re.compile(r'sql;dur=[\d.]+;desc="(\d+) requetes"')
+
+
+def scenarios(dataset):
+    """Scénarios rejoués : (nom, URL)"""
+    return [
+        ('explore', '/explore'),
+        ('explore_recherche', '/explore?q=tomates'),
+        ('api_search', '/recettes/api/search?q=poulet'),
+        ('api_search_menu', f'/recettes/api/search?menu_id={dataset.menu_id}'
+                            f'&recettes_menu={",".join(map(str, dataset.recettes_menu))}'),
+        ('possibles', '/recettes/possibles'),
+        ('generer_courses', f'/menus/{dataset.menu_id}/generer-courses'),
+        ('reviser', f'/courses/{dataset.liste_id}/reviser'),
+        ('courses_pdf', f'/courses/{dataset.liste_id}/export-pdf'),
+        ('recette_pdf', f'/recettes/{dataset.recette_id}/pdf'),
+    ]
+
+
+def percentile(valeurs, p):
+    """Percentile par interpolation linéaire (valeurs triées)"""
+    if len(valeurs) == 1:
+        return valeurs[0]
+    rang = (len(valeurs) - 1) * p / 100
+    bas = int(rang)
+    haut = min(bas + 1, len(valeurs) - 1)
+    return valeurs[bas] + (valeurs[haut] - valeurs[bas]) * (rang - bas)
+
+
+def _requete(client, url):
+    """Exécute une requête GET et renvoie (statut, durée en ms, nombre de requêtes SQL)"""
+    debut = time.perf_counter()
+    response = client.get(url)
+    response.get_data()  # Consommer les réponses en flux (PDF)
+    duree_ms = (time.perf_counter() - debut) * 1000
+
+    correspondance = RE_SERVER_TIMING.search(response.headers.get('Server-Timing', ''))
+    nb_requetes = int(correspondance.group(1)) if correspondance else None
+    return response.status_code, duree_ms, nb_requetes
+
+
+def mesurer(client, url, iterations, echauffement):
+    """
+    Mesure un scénario : latences, requêtes SQL et pic mémoire Python
+
+    Le pic mémoire est mesuré lors d'une passe séparée, tracemalloc
+    ralentissant fortement l'exécution.
+    """
+    for _ in range(echauffement):
+        _requete(client, url)
+
+    durees = []
+    statuts = set()
+    nb_requetes = None
+    for _ in range(iterations):
+        statut, duree_ms, nb_requetes = _requete(client, url)
+        statuts.add(statut)
+        durees.append(duree_ms)
+    durees.sort()
+
+    tracemalloc.start()
+    try:
+        _requete(client, url)
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    statut = max(statuts)
+    return {
+        'statut': statut,
+        'erreur': statut >= 400,
+        'p50_ms': round(percentile(durees, 50), 2),
+        'p90_ms': round(percentile(durees, 90), 2),
+        'p99_ms': round(percentile(durees, 99), 2),
+        'max_ms': round(durees[-1], 2),
+        'requetes_sql': nb_requetes,
+        'memoire_pic_ko': round(pic / 1024, 1),
+    }
+
+
+def comparer(resultats, reference, tolerance):
+    """
+    Compare les résultats à la référence
+
+    Returns:
+        Liste des régressions (messages)
+    """
+    regressions = []
+    for nom, mesure in resultats.items():
+        ref = reference.get(nom)
+        if ref is None:
+            continue
+        if mesure['erreur'] and not ref.get('erreur'):
+            regressions.append(f"{nom} : statut HTTP {mesure['statut']} (référence {ref['statut']})")
+            continue
+        if mesure['requetes_sql'] is not None and ref.get('requetes_sql') is not None \
+                and mesure['requetes_sql'] > ref['requetes_sql']:
+            regressions.append(f"{nom} : {mesure['requetes_sql']} requêtes SQL (référence {ref['requetes_sql']})")
+        for cle in ('p90_ms', 'memoire_pic_ko'):
+            if mesure[cle] > ref[cle] * (1 + tolerance):
+                regressions.append(f"{nom} : {cle} = {mesure[cle]} (référence {ref[cle]}, "
+                                   f"+{(mesure[cle] / ref[cle] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def afficher(resultats, reference):
+    """Tableau récapitulatif"""
+    print(f"{'scénario':<20}{'statut':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+          f"{'SQL':>6}{'mém ko':>10}{'réf p90':>10}")
+    for nom, m in resultats.items():
+        ref = reference.get(nom, {}).get('p90_ms', '-')
+        print(f"{nom:<20}{m['statut']:>7}{m['p50_ms']:>10}{m['p90_ms']:>10}{m['p99_ms']:>10}"
+              f"{m['requetes_sql'] if m['requetes_sql'] is not None else '-':>6}"
+              f"{m['memoire_pic_ko']:>10}{ref:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Banc de performance Iovag')
+    parser.add_argument('--users', type=int, default=5)
+    parser.add_argument('--recettes', type=int, default=500)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--menus', type=int, default=10, help='Menus par utilisateur')
+    parser.add_argument('--listes', type=int, default=5)
+    parser.add_argument('--stock', type=int, default=80, help='Ingrédients en stock par utilisateur')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--echauffement', type=int, default=2)
+    parser.add_argument('--scenario', action='append', help='Limiter à certains scénarios')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_DEFAUT)
+    parser.add_argument('--save-baseline', action='store_true', help='Enregistrer les résultats comme référence')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Dégradation tolérée (0.25 = +25%%)')
+    parser.add_argument('--json', type=Path, help='Écrire les résultats dans ce fichier')
+    args = parser.parse_args(argv)
+
+    app = create_app('bench')
+    with app.app_context():
+        chemin_base = db.engine.url.database
+        db.session.remove()
+        db.engine.dispose()
+    for suffixe in ('', '-wal', '-shm'):
+        if chemin_base and os.path.exists(chemin_base + suffixe):
+            os.remove(chemin_base + suffixe)
+
+    print(f"⏳ Génération du jeu de données ({args.users} utilisateurs, {args.recettes} recettes, "
+          f"{args.ingredients} ingrédients)...")
+    debut = time.perf_counter()
+    with app.app_context():
+        db.create_all()
+        dataset = generer_dataset(
+            nb_users=args.users, nb_recettes=args.recettes, nb_ingredients=args.ingredients,
+            nb_menus=args.menus, nb_listes=args.listes, stock_par_user=args.stock
+        )
+        db.session.remove()
+    print(f"✅ Jeu de données prêt en {time.perf_counter() - debut:.1f} s")
+
+    client = app.test_client()
+    response = client.post('/auth/login', data={'email': dataset.email, 'password': MOT_DE_PASSE})
+    if response.status_code != 302:
+        print('❌ Connexion impossible')
+        return 1
+
+    resultats = {}
+    for nom, url in scenarios(dataset):
+        if args.scenario and nom not in args.scenario:
+            continue
+        resultats[nom] = mesurer(client, url, args.iterations, args.echauffement)
+
+    rapport = {
+        'parametres': {
+            'users': args.users, 'recettes': args.recettes, 'ingredients': args.ingredients,
+            'menus': args.menus, 'listes': args.listes, 'stock': args.stock,
+            'iterations': args.iterations,
+        },
+        'scenarios': resultats,
+    }
+
+    reference = {}
+    if args.baseline.exists() and not args.save_baseline:
+        contenu = json.loads(args.baseline.read_text())
+        if contenu.get('parametres') != rapport['parametres']:
+            print('⚠️  Paramètres différents de la référence : comparaison indicative')
+        reference = contenu.get('scenarios', {})
+
+    afficher(resultats, reference)
+
+    if args.json:
+        args.json.write_text(json.dumps(rapport, indent=2, ensure_ascii=False) + '\n')
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(rapport, indent=2, ensure_ascii=False) + '\n')
+        print(f"✅ Référence enregistrée dans {args.baseline}")
+        return 0
+
+    regressions = comparer(resultats, reference, args.tolerance)
+    if regressions:
+        print('\n❌ Régressions détectées :')
+        for message in regressions:
+            print(f'   - {message}')
+        return 1
+
+    print('\n✅ Aucune régression')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
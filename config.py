@@ -2,6 +2,7 @@
 Configuration pour l'application Iovag
 """
 import os
+import tempfile
 from pathlib import Path
 
 basedir = Path(__file__).parent.absolute()
@@ -17,6 +18,24 @@ class Config:
         f'sqlite:///{basedir / "instance" / "iovag.db"}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Pool de connexions : quelques connexions par worker, réutilisées
+    # (le cache de pages et le mmap SQLite sont propres à chaque connexion)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': 4,
+        'max_overflow': 4,
+        'pool_timeout': 10,  # secondes
+    }
+
+    # Pragmas SQLite appliqués à chaque connexion (app/pragmas.py)
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # Les lectures ne sont plus bloquées par les écritures
+        'synchronous': 'NORMAL',  # Un fsync par checkpoint plutôt qu'à chaque commit (sûr en WAL)
+        'busy_timeout': 5000,  # ms d'attente d'un verrou avant "database is locked"
+        'cache_size': -16000,  # 16 Mo de cache de pages (valeur négative = Kio)
+        'mmap_size': 64 * 1024 * 1024,  # 64 Mo lus via mmap
+        'temp_store': 'MEMORY',  # Tris et tables temporaires en mémoire
+    }
+
     # Upload
     UPLOAD_FOLDER = basedir / 'app' / 'static' / 'uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max
@@ -25,13 +44,53 @@ class Config:
     ITEMS_PER_PAGE = 12
 
     # PDF
-    PDF_OUTPUT_DIR = basedir / 'app' / 'static' / 'pdfs'
+    PDF_OUTPUT_DIR = basedir / 'app' / 'static' / 'pdfs'  # Cache des PDF rendus (app/pdf_cache.py)
+    PDF_PRERENDU = True  # Pré-rendre le PDF d'une recette après sa modification (tâche de fond, ignoré avec TACHES_SYNCHRONES)
+
+    # File de tâches de fond (app/taches.py), exécutées par : flask taches-worker
+    TACHES_SYNCHRONES = os.environ.get('TACHES_SYNCHRONES', '0') == '1'  # Exécuter dans la requête (sans worker)
+    TACHES_INTERVALLE_S = 1.0  # Attente du worker quand la file est vide
+    TACHES_DELAI_ABANDON_S = 600  # Tâche en cours depuis plus longtemps : worker interrompu, tâche reprise
+    TACHES_CONSERVATION_JOURS = 7  # Tâches terminées gardées pour les pages d'attente
+
+    # Ordre des rayons sur le parcours du magasin (export de la liste de courses)
+    COURSES_ORDRE_RAYONS = [
+        'Fruits & Légumes',
+        'Pain & Viennoiseries',
+        'Viandes & Poissons',
+        'Produits laitiers',
+        'Pâtes & Riz',
+        'Conserves',
+        'Épicerie salée',
+        'Huiles & Vinaigres',
+        'Condiments & Sauces',
+        'Herbes & Épices',
+        'Épicerie sucrée',
+        'Boissons',
+        'Surgelés',
+    ]
+
+    # Journal des modifications d'unités partagé entre les workers Gunicorn
+    UNITES_JOURNAL_PATH = str(basedir / 'instance' / 'unites.journal')
+
+    # Cache des fragments HTML publics (app/fragments.py) : LRU en mémoire par worker,
+    # doublé d'un dossier partagé entre les workers (None = mémoire seule)
+    FRAGMENTS_CACHE_OCTETS = 4 * 1024 * 1024
+    FRAGMENTS_CACHE_DIR = str(basedir / 'instance' / 'fragments')
+    FRAGMENTS_CACHE_DISQUE_OCTETS = 32 * 1024 * 1024
+
+    # Instrumentation SQL (en-tête Server-Timing, journal des requêtes lentes et N+1)
+    SQL_INSTRUMENTATION = os.environ.get('SQL_INSTRUMENTATION', '1') != '0'
+    SQL_SEUIL_LENT_MS = float(os.environ.get('SQL_SEUIL_LENT_MS', 100))
+    SQL_SEUIL_N_PLUS_1 = int(os.environ.get('SQL_SEUIL_N_PLUS_1', 5))  # Répétitions d'une même requête
 
 
 class DevelopmentConfig(Config):
     """Configuration pour le développement"""
     DEBUG = True
     TESTING = False
+    # Sans worker par défaut (TACHES_SYNCHRONES=0 pour tester la file avec flask taches-worker)
+    TACHES_SYNCHRONES = os.environ.get('TACHES_SYNCHRONES', '1') == '1'
 
 
 class ProductionConfig(Config):
@@ -45,12 +104,33 @@ class TestingConfig(Config):
     """Configuration pour les tests"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # Base en mémoire : StaticPool, sans options de pool
+    WTF_CSRF_ENABLED = False
+    UNITES_JOURNAL_PATH = None  # Un seul processus : invalidation locale
+    FRAGMENTS_CACHE_DIR = None
+    PDF_PRERENDU = False
+    TACHES_SYNCHRONES = True
+
+
+class BenchConfig(ProductionConfig):
+    """Configuration pour le banc de performance (python -m bench.run)"""
+    SECRET_KEY = 'bench-secret-key'
+    # Base SQLite sur disque, recréée à chaque exécution du banc
+    SQLALCHEMY_DATABASE_URI = os.environ.get('BENCH_DATABASE_URL') or \
+        f'sqlite:///{Path(tempfile.gettempdir()) / "iovag-bench.db"}'
     WTF_CSRF_ENABLED = False
+    UNITES_JOURNAL_PATH = None  # Un seul processus : invalidation locale
+    FRAGMENTS_CACHE_DIR = None  # Base recréée à chaque exécution : pas de rendus d'un run précédent
+    PDF_OUTPUT_DIR = Path(tempfile.gettempdir()) / 'iovag-bench-pdfs'
+    PDF_PRERENDU = False  # Le banc mesure le rendu dans la requête
+    TACHES_SYNCHRONES = True  # Idem pour le travail des tâches de fond (génération, vérification du stock)
+    SQL_INSTRUMENTATION = True  # Le banc lit le nombre de requêtes dans Server-Timing
 
 
 config = {
     'development': DevelopmentConfig,
     'production': ProductionConfig,
     'testing': TestingConfig,
+    'bench': BenchConfig,
     'default': DevelopmentConfig
 }
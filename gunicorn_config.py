@@ -1,9 +1,74 @@
 # Configuration Gunicorn pour Iovag
-bind = "127.0.0.1:8000"
-workers = 2
-worker_class = "sync"
-timeout = 60
+#
+# Profil gthread : chaque worker sert plusieurs requêtes en parallèle, un
+# rendu PDF ou un calcul des recettes possibles ne bloque plus les cases
+# cochées en magasin. Dimensionné d'après les CPU et la mémoire disponibles,
+# surchargeable par variables d'environnement :
+#   GUNICORN_WORKER_CLASS (gthread | sync), GUNICORN_WORKERS, GUNICORN_THREADS,
+#   GUNICORN_TIMEOUT, GUNICORN_BIND, GUNICORN_LOG_DIR
+import multiprocessing
+import os
+
+# Mémoire résidente approximative d'un worker (Flask + SQLAlchemy + ReportLab)
+MEMOIRE_PAR_WORKER_MO = 120
+# Part de la mémoire du Pi laissée à Gunicorn (nginx, système...)
+PART_MEMOIRE = 0.5
+
+
+def _memoire_totale_mo():
+    """Mémoire physique en Mo (None si inconnue)"""
+    try:
+        with open('/proc/meminfo') as meminfo:
+            for ligne in meminfo:
+                if ligne.startswith('MemTotal:'):
+                    return int(ligne.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def _nombre_workers():
+    """Un worker par CPU (2 minimum), dans la limite de la mémoire disponible"""
+    workers = max(2, multiprocessing.cpu_count())
+    memoire = _memoire_totale_mo()
+    if memoire:
+        workers = min(workers, max(1, int(memoire * PART_MEMOIRE) // MEMOIRE_PAR_WORKER_MO))
+    return workers
+
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('GUNICORN_WORKERS', 0)) or _nombre_workers()
+# SQLite n'accepte qu'un écrivain à la fois : quelques threads suffisent
+threads = int(os.environ.get('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = 30
 keepalive = 5
-errorlog = "/home/mathurinchampemont/iovag/logs/gunicorn_error.log"
-accesslog = "/home/mathurinchampemont/iovag/logs/gunicorn_access.log"
+
+# Recycler les workers pour contenir la fragmentation mémoire
+max_requests = 1000
+max_requests_jitter = 100
+
+# Charger l'application une fois dans le maître (mémoire partagée entre workers)
+preload_app = True
+
+_log_dir = os.environ.get('GUNICORN_LOG_DIR', '/home/mathurinchampemont/iovag/logs')
+errorlog = os.path.join(_log_dir, 'gunicorn_error.log')
+accesslog = os.path.join(_log_dir, 'gunicorn_access.log')
 loglevel = "info"
+
+
+def post_fork(server, worker):
+    """
+    Ferme les connexions SQLite héritées du maître (preload_app) :
+    un descripteur SQLite ne doit jamais être partagé entre processus
+    """
+    from app import db
+
+    app = worker.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
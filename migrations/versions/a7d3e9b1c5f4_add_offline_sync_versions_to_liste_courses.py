@@ -0,0 +1,36 @@
+"""Add offline sync versions to liste_courses and liste_course_items
+
+Revision ID: a7d3e9b1c5f4
+Revises: f1c6a8e3b5d2
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e9b1c5f4'
+down_revision = 'f1c6a8e3b5d2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('liste_courses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('liste_course_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('modifie_le', sa.BigInteger(), nullable=True))
+        batch_op.create_index('ix_liste_course_items_liste_version', ['liste_id', 'version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('liste_course_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_liste_course_items_liste_version')
+        batch_op.drop_column('modifie_le')
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('liste_courses', schema=None) as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,30 @@
+"""Make recettes.evaluation NOT NULL DEFAULT 0
+
+Revision ID: b5d1e7a3c9f2
+Revises: e0bed3405347
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5d1e7a3c9f2'
+down_revision = 'e0bed3405347'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Clé de la pagination d'/explore : les insertions hors ORM (Core,
+    # restauration) ne doivent pas pouvoir y introduire de NULL
+    op.execute("UPDATE recettes SET evaluation = 0 WHERE evaluation IS NULL")
+
+    with op.batch_alter_table('recettes', schema=None) as batch_op:
+        batch_op.alter_column('evaluation', existing_type=sa.Integer(), nullable=False, server_default='0')
+
+
+def downgrade():
+    with op.batch_alter_table('recettes', schema=None) as batch_op:
+        batch_op.alter_column('evaluation', existing_type=sa.Integer(), nullable=True, server_default=None)
@@ -0,0 +1,41 @@
+"""Add ingredient_id to liste_course_items
+
+Revision ID: b8e1c4d2f7a3
+Revises: 9da57683960b
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e1c4d2f7a3'
+down_revision = '9da57683960b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('liste_course_items', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ingredient_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_liste_course_items_ingredient_id'), ['ingredient_id'], unique=False)
+        batch_op.create_foreign_key('fk_liste_course_items_ingredient_id', 'ingredients',
+                                    ['ingredient_id'], ['id'], ondelete='SET NULL')
+
+    # Rattacher les items existants à leur ingrédient via le nom
+    op.execute("""
+        UPDATE liste_course_items
+        SET ingredient_id = (
+            SELECT ingredients.id FROM ingredients
+            WHERE ingredients.nom = liste_course_items.nom_ingredient
+        )
+        WHERE ingredient_id IS NULL
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('liste_course_items', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_liste_course_items_ingredient_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_liste_course_items_ingredient_id'))
+        batch_op.drop_column('ingredient_id')
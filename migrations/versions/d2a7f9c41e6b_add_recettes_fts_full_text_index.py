@@ -0,0 +1,34 @@
+"""Add recettes_fts full-text index (SQLite FTS5)
+
+Revision ID: d2a7f9c41e6b
+Revises: b8e1c4d2f7a3
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7f9c41e6b'
+down_revision = 'b8e1c4d2f7a3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    if bind.dialect.name != 'sqlite':
+        # Hors SQLite, la recherche utilise le repli LIKE
+        return
+
+    from app.recherche import SQL_CREATION_PLEIN_TEXTE, indexer_plein_texte
+
+    op.execute(SQL_CREATION_PLEIN_TEXTE)
+    indexer_plein_texte(bind)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    op.execute('DROP TABLE IF EXISTS recettes_fts')
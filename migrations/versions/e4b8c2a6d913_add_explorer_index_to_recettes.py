@@ -0,0 +1,29 @@
+"""Add explorer keyset index to recettes
+
+Revision ID: e4b8c2a6d913
+Revises: d2a7f9c41e6b
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8c2a6d913'
+down_revision = 'd2a7f9c41e6b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # La pagination par clé compare (evaluation, created_at, id) : pas de NULL
+    op.execute("UPDATE recettes SET evaluation = 0 WHERE evaluation IS NULL")
+    op.execute("UPDATE recettes SET created_at = CURRENT_TIMESTAMP WHERE created_at IS NULL")
+
+    with op.batch_alter_table('recettes', schema=None) as batch_op:
+        batch_op.create_index('ix_recettes_explorer', ['is_public', 'evaluation', 'created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('recettes', schema=None) as batch_op:
+        batch_op.drop_index('ix_recettes_explorer')
@@ -0,0 +1,51 @@
+"""Add denormalised counters to recettes and liste_courses
+
+Revision ID: f1c6a8e3b5d2
+Revises: e4b8c2a6d913
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6a8e3b5d2'
+down_revision = 'e4b8c2a6d913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recettes', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nb_ingredients', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('nb_instructions', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('nb_sauvegardes', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('liste_courses', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('nb_items', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('nb_achetes', sa.Integer(), nullable=False, server_default='0'))
+
+    # Initialiser les compteurs depuis les données existantes
+    op.execute("""
+        UPDATE recettes SET
+            nb_ingredients = (SELECT COUNT(*) FROM recette_ingredients WHERE recette_id = recettes.id),
+            nb_instructions = (SELECT COUNT(*) FROM instructions WHERE recette_id = recettes.id),
+            nb_sauvegardes = (SELECT COUNT(*) FROM recettes_favorites WHERE recette_id = recettes.id)
+    """)
+    op.execute("""
+        UPDATE liste_courses SET
+            nb_items = (SELECT COUNT(*) FROM liste_course_items WHERE liste_id = liste_courses.id),
+            nb_achetes = (SELECT COUNT(*) FROM liste_course_items WHERE liste_id = liste_courses.id AND achete)
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('liste_courses', schema=None) as batch_op:
+        batch_op.drop_column('nb_achetes')
+        batch_op.drop_column('nb_items')
+
+    with op.batch_alter_table('recettes', schema=None) as batch_op:
+        batch_op.drop_column('nb_sauvegardes')
+        batch_op.drop_column('nb_instructions')
+        batch_op.drop_column('nb_ingredients')
@@ -0,0 +1,24 @@
+"""
+Fixtures communes : application de test sur une base SQLite en mémoire
+"""
+import pytest
+from app import create_app, db, recherche
+from app.models import UnitConverter
+
+
+@pytest.fixture
+def app():
+    """Application 'testing' avec un schéma vierge (caches de classe remis à zéro)"""
+    app = create_app('testing')
+    with app.app_context():
+        UnitConverter.invalider_cache()
+        recherche._index.clear()
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
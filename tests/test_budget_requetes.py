@@ -0,0 +1,58 @@
+"""
+Budget de requêtes SQL par page (garde-fou contre les N+1)
+
+Le nombre de requêtes est lu dans l'en-tête Server-Timing ajouté par
+app/instrumentation.py, comme le fait le banc de performance.
+"""
+import re
+import pytest
+from app import db
+from app.models import Ingredient, Inventaire, InventaireItem
+from bench.dataset import MOT_DE_PASSE, generer_dataset
+
+
+RE_SERVER_TIMING = re.compile(r'sql;dur=[\d.]+;desc="(\d+) requetes"')
+
+# Nombre maximal de requêtes SQL par page, quel que soit le nombre de lignes affichées
+BUDGET_REQUETES = 5
+
+
+@pytest.fixture
+def connecte(app, client):
+    """Utilisateur du banc connecté, avec un inventaire de quelques lignes"""
+    dataset = generer_dataset(nb_users=2, nb_recettes=100, nb_ingredients=60)
+
+    inventaire = Inventaire(created_by=dataset.user_id)
+    db.session.add(inventaire)
+    db.session.flush()
+    db.session.add_all([
+        InventaireItem(inventaire_id=inventaire.id, ingredient_id=ingredient.id, quantite_theorique=100,
+                       quantite_reelle=80, ecart=-20, unite='g')
+        for ingredient in Ingredient.query.limit(15)
+    ])
+    db.session.commit()
+
+    client.post('/auth/login', data={'email': dataset.email, 'password': MOT_DE_PASSE})
+    return {'menu': dataset.menu_id, 'liste': dataset.liste_id, 'inventaire': inventaire.id}
+
+
+def _nombre_requetes(response):
+    correspondance = RE_SERVER_TIMING.search(response.headers.get('Server-Timing', ''))
+    assert correspondance, 'en-tête Server-Timing absent (SQL_INSTRUMENTATION désactivée ?)'
+    return int(correspondance.group(1))
+
+
+@pytest.mark.parametrize('url', [
+    '/menus/',
+    '/menus/{menu}',
+    '/courses/',
+    '/courses/{liste}',
+    '/stock/',
+    '/stock/par-lieu',
+    '/inventaires/',
+    '/inventaires/{inventaire}',
+])
+def test_budget_requetes(client, connecte, url):
+    response = client.get(url.format(**connecte))
+    assert response.status_code == 200
+    assert _nombre_requetes(response) <= BUDGET_REQUETES
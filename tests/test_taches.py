@@ -0,0 +1,54 @@
+"""
+File de tâches : exécution par le worker (hors requête HTTP)
+"""
+from app import db, taches
+from app.models import Tache, Unite, UnitConverter
+
+
+def test_worker_applique_les_modifications_d_unites(app, monkeypatch, tmp_path):
+    """Une unité modifiée par un worker Gunicorn est prise en compte par la tâche suivante"""
+    monkeypatch.setattr(UnitConverter, '_journal_path', str(tmp_path / 'unites.journal'))
+    monkeypatch.setitem(taches._gestionnaires, 'conversion_kg',
+                        (lambda tache: list(UnitConverter.normaliser(1, 'kg')), 1))
+
+    gramme = Unite(nom='gramme', symbole='g', type_unite='masse')
+    db.session.add(gramme)
+    db.session.flush()
+    kilo = Unite(nom='kilogramme', symbole='kg', type_unite='masse',
+                 unite_base_id=gramme.id, facteur_vers_base=1000)
+    db.session.add(kilo)
+    db.session.commit()
+    assert UnitConverter.normaliser(1, 'kg') == (1000.0, 'g')
+
+    # Modification par un autre processus : seul le journal partagé en informe le worker
+    db.session.execute(db.update(Unite).where(Unite.id == kilo.id).values(facteur_vers_base=999))
+    db.session.commit()
+    UnitConverter.signaler_modification(unites=[kilo.id])
+
+    db.session.add(Tache(type='conversion_kg', parametres={}, max_tentatives=1))
+    db.session.commit()
+    tache = taches.executer(Tache.reserver('test'))
+
+    assert tache.statut == 'terminee'
+    assert tache.resultat == [999.0, 'g']
+
+
+def test_tache_reprise_n_est_pas_validee_par_l_ancien_worker(app, monkeypatch):
+    """Un worker dont la tâche a été reprise (abandon présumé) n'enregistre ni son travail ni le statut"""
+    def creer_unite(tache):
+        # Pendant l'exécution, la tâche est jugée abandonnée puis réservée par un autre worker
+        db.session.execute(db.update(Tache).where(Tache.id == tache.id).values(jeton='autre'))
+        db.session.commit()
+        db.session.add(Unite(nom='pincée', symbole='pincée', type_unite='autre'))
+        db.session.flush()
+        return 'fait'
+
+    monkeypatch.setitem(taches._gestionnaires, 'creer_unite', (creer_unite, 1))
+    db.session.add(Tache(type='creer_unite', parametres={}, max_tentatives=1))
+    db.session.commit()
+
+    tache = taches.executer(Tache.reserver('lent'))
+
+    assert tache.statut == 'en_cours'
+    assert tache.jeton == 'autre'
+    assert Unite.query.filter_by(nom='pincée').count() == 0
@@ -33,6 +33,11 @@ if pgrep -f gunicorn > /dev/null; then
 else
     echo "   ℹ️  Gunicorn n'était pas en cours d'exécution"
 fi
+if pgrep -f taches-worker > /dev/null; then
+    echo "   Arrêt du worker de tâches (la tâche en cours se termine)..."
+    pkill -TERM -f taches-worker || true
+    sleep 2
+fi
 
 # 2. Git pull
 echo ""
@@ -84,12 +89,19 @@ if systemctl list-units --type=service | grep -q iovag; then
     echo "   Redémarrage via systemd..."
     sudo systemctl restart iovag
     sudo systemctl status iovag --no-pager -l
+    if systemctl list-units --type=service | grep -q iovag-taches; then
+        sudo systemctl restart iovag-taches
+    else
+        nohup flask --app run taches-worker > /tmp/iovag_taches.log 2>&1 &
+    fi
 else
     echo "   Démarrage de Gunicorn en arrière-plan..."
     nohup gunicorn --config gunicorn_config.py run:app > /tmp/iovag_gunicorn.log 2>&1 &
     sleep 2
     if pgrep -f gunicorn > /dev/null; then
         echo -e "${GREEN}   ✅ Gunicorn démarré (PID: $(pgrep -f gunicorn | head -1))${NC}"
+        nohup flask --app run taches-worker > /tmp/iovag_taches.log 2>&1 &
+        echo -e "${GREEN}   ✅ Worker de tâches démarré (logs: /tmp/iovag_taches.log)${NC}"
     else
         echo -e "${RED}   ❌ Erreur au démarrage de Gunicorn${NC}"
         echo "   Voir les logs: tail -f /tmp/iovag_gunicorn.log"